@@ -0,0 +1,163 @@
+"""
+Headless batch runner: renders every row of a JSONL/CSV manifest through the
+same pipeline the bot uses.
+
+    python batch.py lineup.csv --out output/lineup --downloads 3 --captions 2 --renders 1
+
+Manifest rows need `url` and `title`; `body` and `layout` ('lower' or
+'standard', default 'lower') are optional. Results are appended to
+`<out>/results.jsonl` with per-stage timings, and rows already finished there
+are skipped when the command is run again.
+"""
+import os
+import sys
+import csv
+import json
+import time
+import asyncio
+import hashlib
+import argparse
+
+import PIL.Image
+
+# Monkey patch ANTIALIAS for older libraries (moviepy, pilmoji)
+if not hasattr(PIL.Image, 'ANTIALIAS'):
+    PIL.Image.ANTIALIAS = PIL.Image.Resampling.LANCZOS
+
+from config import Config
+from services.jobs import Job, JobManager, LAYOUTS
+from services.render_cache import RenderCache
+
+# Batch jobs all run under one pseudo user
+BATCH_USER_ID = 0
+
+
+def read_manifest(path: str) -> list[dict]:
+    """Rows as dicts with url/title/body/layout; blank lines and rows without a url are ignored."""
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        if path.lower().endswith('.csv'):
+            raw_rows = list(csv.DictReader(f))
+        else:
+            raw_rows = [json.loads(line) for line in f if line.strip()]
+
+    rows = []
+    for raw in raw_rows:
+        url = (raw.get('url') or '').strip()
+        if not url:
+            continue
+        layout = (raw.get('layout') or 'lower').strip().lower()
+        if layout not in LAYOUTS:
+            raise ValueError(f"Unknown layout {layout!r} for {url} (expected one of {', '.join(LAYOUTS)})")
+        rows.append({
+            'url': url,
+            'title': (raw.get('title') or '').strip(),
+            'body': (raw.get('body') or '').strip(),
+            'layout': layout,
+        })
+    return rows
+
+
+def row_key(row: dict) -> str:
+    raw = json.dumps([row['url'], row['title'], row['body'], row['layout']], ensure_ascii=False)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()[:16]
+
+
+def finished_keys(results_path: str) -> set[str]:
+    """Keys of rows whose output is recorded as done and still exists."""
+    done = set()
+    try:
+        with open(results_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                result = json.loads(line)
+                if result.get('status') == 'done' and os.path.exists(result.get('output') or ''):
+                    done.add(result['key'])
+    except FileNotFoundError:
+        pass
+    return done
+
+
+async def run_batch(rows: list[dict], pipeline, out_dir: str, parallel_jobs: int = 2) -> list[dict]:
+    """Runs every unfinished row and appends one result line per row to <out_dir>/results.jsonl."""
+    os.makedirs(out_dir, exist_ok=True)
+    results_path = os.path.join(out_dir, 'results.jsonl')
+    skip = finished_keys(results_path)
+    pending = [row for row in rows if row_key(row) not in skip]
+    print(f"📋 {len(rows)} rows, {len(rows) - len(pending)} already done, {len(pending)} to run")
+
+    manager = JobManager(pipeline.run, default_limit=parallel_jobs, user_limits={})
+    results = []
+
+    def on_done_for(row, started):
+        async def on_done(job):
+            key = row_key(row)
+            result = {
+                'key': key,
+                'url': row['url'],
+                'title': row['title'],
+                'layout': row['layout'],
+                'status': job.status,
+                'output': None,
+                'caption': None,
+                'error': job.error,
+                'timings': job.stats.get('timings', {}),
+                'total_seconds': round((job.finished_at or time.time()) - started, 3),
+            }
+            if job.status == 'done':
+                # The workspace is removed after this hook, so keep the files outside it
+                final_path, description = job.result
+                result['output'] = RenderCache.materialize(final_path, os.path.join(out_dir, f"{key}.mp4"))
+                result['caption'] = os.path.join(out_dir, f"{key}.txt")
+                with open(result['caption'], 'w', encoding='utf-8') as f:
+                    f.write(description)
+            with open(results_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(result, ensure_ascii=False) + "\n")
+            results.append(result)
+            icon = "✅" if job.status == 'done' else "❌"
+            print(f"{icon} [{len(results)}/{len(pending)}] {row['url']} -> {job.status} in {result['total_seconds']:.1f}s")
+        return on_done
+
+    tasks = []
+    for row in pending:
+        job = Job(BATCH_USER_ID, BATCH_USER_ID, row['url'], row['title'], row['body'], row['layout'])
+        tasks.append(manager.submit(job, on_done=on_done_for(row, time.time())))
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return results
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Render every row of a JSONL/CSV manifest.")
+    parser.add_argument('manifest', help="JSONL or CSV file with url, title, body, layout")
+    parser.add_argument('--out', default=os.path.join(Config.OUTPUT_DIR, 'batch'), help="Output directory")
+    parser.add_argument('--jobs', type=int, default=4, help="Rows in flight at once")
+    parser.add_argument('--downloads', type=int, default=3, help="Concurrent downloads")
+    parser.add_argument('--captions', type=int, default=Config.AI_CONCURRENCY, help="Concurrent Gemini calls")
+    parser.add_argument('--renders', type=int, default=Config.RENDER_WORKERS, help="Concurrent encodes (0 = auto)")
+    args = parser.parse_args(argv)
+
+    from services.ai_generator import AIGenerator
+    from services.graphics import GraphicsEngine
+    from services.pipeline import JobPipeline
+    from services.render_pool import RenderScheduler
+    from services.browser_pool import BrowserPool
+
+    Config.ensure_dirs()
+    rows = read_manifest(args.manifest)
+    pipeline = JobPipeline(
+        GraphicsEngine(scheduler=RenderScheduler(workers=args.renders or None)),
+        AIGenerator(concurrency=args.captions),
+        stage_limits={'download': args.downloads},
+    )
+    try:
+        results = asyncio.run(run_batch(rows, pipeline, args.out, args.jobs))
+    finally:
+        BrowserPool.shutdown_shared()
+
+    failed = [r for r in results if r['status'] != 'done']
+    print(f"🏁 {len(results) - len(failed)} done, {len(failed)} failed. Results: {os.path.join(args.out, 'results.jsonl')}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -12,23 +12,51 @@ class Config:
         TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
     else:
         TELEGRAM_TOKEN = os.getenv("TELEGRAM_INT_TOKEN") or os.getenv("TELEGRAM_TOKEN")
+    # Self-hosted Bot API server running with --local (e.g. http://localhost:8081); empty = api.telegram.org.
+    # Videos are then handed over as paths, so the server must see the same filesystem.
+    TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "").strip().rstrip("/")
 
+    # ALLOWED_USER_ID accepts a single id or a comma-separated list
     _raw_allowed_user_id = os.getenv("ALLOWED_USER_ID")
     if not _raw_allowed_user_id:
-        ALLOWED_USER_ID = None
+        ALLOWED_USER_IDS = frozenset()
     else:
         try:
-            ALLOWED_USER_ID = int(_raw_allowed_user_id)
+            ALLOWED_USER_IDS = frozenset(
+                int(part) for part in _raw_allowed_user_id.split(",") if part.strip()
+            )
         except ValueError as exc:
-            raise ValueError("ALLOWED_USER_ID must be an integer.") from exc
+            raise ValueError("ALLOWED_USER_ID must be an integer or a comma-separated list of integers.") from exc
+    # Kept for single-user deployments and older call sites
+    ALLOWED_USER_ID = min(ALLOWED_USER_IDS) if len(ALLOWED_USER_IDS) == 1 else None
+
+    # Concurrent jobs per user; USER_JOB_LIMITS overrides per id, e.g. "123:4,456:1"
+    MAX_JOBS_PER_USER = int(os.getenv("MAX_JOBS_PER_USER", "2"))
+    _raw_user_job_limits = os.getenv("USER_JOB_LIMITS", "")
+    try:
+        USER_JOB_LIMITS = {
+            int(uid): int(limit)
+            for uid, limit in (item.split(":", 1) for item in _raw_user_job_limits.split(",") if item.strip())
+        }
+    except ValueError as exc:
+        raise ValueError("USER_JOB_LIMITS must look like '<user_id>:<limit>,...'.") from exc
     GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
+    # Caption service: seconds before falling back to the plain caption, retries on
+    # transient errors, concurrent Gemini calls, and in-memory cache entries
+    AI_DEADLINE_SECONDS = float(os.getenv("AI_DEADLINE_SECONDS", "25"))
+    AI_RETRIES = int(os.getenv("AI_RETRIES", "2"))
+    AI_CONCURRENCY = int(os.getenv("AI_CONCURRENCY", "2"))
+    AI_CACHE_SIZE = int(os.getenv("AI_CACHE_SIZE", "256"))
+
     # Paths
     # Use the assets directory relative to this config file (inside auto_content)
     BASE_DIR = os.path.dirname(os.path.abspath(__file__))
     ASSETS_DIR = os.path.join(BASE_DIR, "assets")
     OUTPUT_DIR = os.path.join(BASE_DIR, "output")
     TEMP_DIR = os.path.join(BASE_DIR, "temp")
+    # Per-job scratch directories (overlay, download, render output)
+    JOBS_DIR = os.path.join(TEMP_DIR, "jobs")
     WOOD_IMAGE_PATH = os.path.join(ASSETS_DIR, "wood_sign.png")
     # Ready-to-use overlay template (User provided)
     READY_OVERLAY_PATH = os.path.join(ASSETS_DIR, "overlay_template.png")
@@ -38,10 +66,87 @@ class Config:
     FONT_BOLD = os.path.join(ASSETS_DIR, "fonts", "Rubik-ExtraBold.ttf")
     FONT_REGULAR = os.path.join(ASSETS_DIR, "fonts", "Rubik-ExtraBold.ttf")
 
+    # Loaded (path, size) font faces kept in memory before LRU eviction
+    FONT_CACHE_SIZE = int(os.getenv("FONT_CACHE_SIZE", "64"))
+
+    # Emoji sprites (<style>/<codepoints>.png), filled by `python -m services.emoji_store`
+    EMOJI_DIR = os.getenv("EMOJI_DIR", os.path.join(ASSETS_DIR, "emoji"))
+    # Emojis that prefetch downloads by default (the ones captions actually use)
+    EMOJI_PREFETCH_LIST = os.path.join(ASSETS_DIR, "emoji_prefetch.txt")
+    # Sprites kept in memory before LRU eviction
+    EMOJI_CACHE_SIZE = int(os.getenv("EMOJI_CACHE_SIZE", "512"))
+    # Fetch sprites missing from EMOJI_DIR from the emoji CDN (and save them) instead of drawing plain text
+    EMOJI_REMOTE_FILL = os.getenv("EMOJI_REMOTE_FILL", "0").strip().lower() in {"1", "true", "yes", "on"}
+
     # Video Settings
     VIDEO_SIZE = (1080, 1920)
+
+    # Pooled Chromium for the TikTok downloader: concurrent pages and contexts per browser before relaunch
+    BROWSER_MAX_PAGES = int(os.getenv("BROWSER_MAX_PAGES", "2"))
+    BROWSER_MAX_USES = int(os.getenv("BROWSER_MAX_USES", "50"))
+
+    # Direct-URL fetcher: parallel Range connections, bytes per range, retries per request,
+    # and the smallest file worth splitting
+    FETCH_WORKERS = int(os.getenv("FETCH_WORKERS", "4"))
+    FETCH_PART_SIZE = int(os.getenv("FETCH_PART_SIZE", str(4 * 1024 * 1024)))
+    FETCH_RETRIES = int(os.getenv("FETCH_RETRIES", "4"))
+    FETCH_MIN_PARALLEL_SIZE = int(os.getenv("FETCH_MIN_PARALLEL_SIZE", str(8 * 1024 * 1024)))
+
+    # Extra seconds fetched on each side of a partial (segment-only) download,
+    # so keyframe-aligned cuts still cover the wanted window
+    SEGMENT_PADDING_SECONDS = float(os.getenv("SEGMENT_PADDING_SECONDS", "2"))
+
+    # Render pool: concurrent ffmpeg encodes (0 = one per 4 cores), CPU pinning and niceness
+    RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", "0"))
+    RENDER_PIN_CPUS = os.getenv("RENDER_PIN_CPUS", "0").strip().lower() in {"1", "true", "yes", "on"}
+    RENDER_NICE = int(os.getenv("RENDER_NICE", "0"))
+
+    # Render cache (content-addressed overlays and final videos)
+    RENDER_CACHE_ENABLED = os.getenv("RENDER_CACHE_ENABLED", "1").strip().lower() in {"1", "true", "yes", "on"}
+    RENDER_CACHE_DIR = os.path.join(OUTPUT_DIR, "cache")
+    OVERLAY_CACHE_BYTES = int(os.getenv("OVERLAY_CACHE_BYTES", str(64 * 1024 * 1024)))
+    VIDEO_CACHE_BYTES = int(os.getenv("VIDEO_CACHE_BYTES", str(2 * 1024 * 1024 * 1024)))
+
+    # Captions cached on disk by prompt + metadata, entry lifetime in seconds and byte budget
+    AI_CACHE_DIR = os.path.join(TEMP_DIR, "cache", "captions")
+    AI_CACHE_TTL = float(os.getenv("AI_CACHE_TTL", str(30 * 24 * 3600)))
+    AI_CACHE_BYTES = int(os.getenv("AI_CACHE_BYTES", str(32 * 1024 * 1024)))
+
+    # Telegram file_ids of sent videos by content hash; identical videos are re-sent without uploading
+    TELEGRAM_FILE_ID_CACHE = os.path.join(TEMP_DIR, "cache", "telegram_file_ids.json")
+
+    # Decoded/resized overlay template, built into the Docker image and rebuilt when the template or fonts change
+    ASSET_BUNDLE_PATH = os.path.join(TEMP_DIR, "cache", "asset_bundle.bin")
+
+    # Download cache (sources keyed on the platform video id), entry lifetime in seconds and byte budget
+    DOWNLOAD_CACHE_ENABLED = os.getenv("DOWNLOAD_CACHE_ENABLED", "1").strip().lower() in {"1", "true", "yes", "on"}
+    DOWNLOAD_CACHE_DIR = os.path.join(TEMP_DIR, "cache", "downloads")
+    DOWNLOAD_CACHE_TTL = float(os.getenv("DOWNLOAD_CACHE_TTL", str(24 * 3600)))
+    DOWNLOAD_CACHE_BYTES = int(os.getenv("DOWNLOAD_CACHE_BYTES", str(4 * 1024 * 1024 * 1024)))
     
+    # Memory admission: limit in bytes (0 = detect from cgroups), fraction kept free,
+    # and per-stage RSS estimates in MB overriding the defaults, e.g. "encode:600,browser:400"
+    MEMORY_LIMIT_BYTES = int(os.getenv("MEMORY_LIMIT_BYTES", "0"))
+    MEMORY_HEADROOM = float(os.getenv("MEMORY_HEADROOM", "0.15"))
+    _raw_stage_memory = os.getenv("STAGE_MEMORY_MB", "")
+    try:
+        STAGE_MEMORY_ESTIMATES = {
+            stage.strip(): int(mb) * 1024 * 1024
+            for stage, mb in (item.split(":", 1) for item in _raw_stage_memory.split(",") if item.strip())
+        }
+    except ValueError as exc:
+        raise ValueError("STAGE_MEMORY_MB must look like '<stage>:<megabytes>,...'.") from exc
+
+    # HTTP job API on the keep_alive server (/jobs): off unless enabled; with a token,
+    # requests need "Authorization: Bearer <token>", without one it is only served on a loopback KEEP_ALIVE_HOST.
+    # Finished videos are kept for JOB_API_OUTPUT_TTL seconds.
+    JOB_API_ENABLED = os.getenv("JOB_API_ENABLED", "0").strip().lower() in {"1", "true", "yes", "on"}
+    JOB_API_TOKEN = os.getenv("JOB_API_TOKEN", "").strip()
+    JOB_API_OUTPUT_DIR = os.path.join(OUTPUT_DIR, "api")
+    JOB_API_OUTPUT_TTL = float(os.getenv("JOB_API_OUTPUT_TTL", str(24 * 3600)))
+
     @staticmethod
     def ensure_dirs():
         os.makedirs(Config.OUTPUT_DIR, exist_ok=True)
         os.makedirs(Config.TEMP_DIR, exist_ok=True)
+        os.makedirs(Config.JOBS_DIR, exist_ok=True)
@@ -1,21 +1,177 @@
 import os
+import re
+import json
 import threading
-from http.server import BaseHTTPRequestHandler, HTTPServer
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from services.job_api import JobApiError
+from services.metrics import MetricsRegistry
+
+# Largest accepted POST body
+MAX_REQUEST_BYTES = 64 * 1024
+STREAM_CHUNK = 256 * 1024
+
+_JOB_ROUTE = re.compile(r'^/jobs/([^/]+)(/video)?$')
+_RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def _byte_range(header: str | None, size: int) -> tuple[int, int] | None:
+    """
+    (first, last) byte of a single-range `Range` header, None for the whole file.
+    Raises ValueError when the range can't be satisfied.
+    """
+    match = _RANGE.match((header or '').strip())
+    if not match:
+        # Absent, multi-range or another unit: answer with the whole file
+        return None
+    first, last = match.groups()
+    if not first:
+        if not last or int(last) == 0:
+            raise ValueError(header)
+        # Suffix range: the last N bytes
+        return max(0, size - int(last)), size - 1
+    first = int(first)
+    last = min(int(last), size - 1) if last else size - 1
+    if first >= size or last < first:
+        raise ValueError(header)
+    return first, last
 
 
 class _HealthHandler(BaseHTTPRequestHandler):
+    """
+    `ok` on any path, Prometheus text on /metrics and, when a JobApi is attached
+    to the server, the job routes:
+    POST /jobs, GET /jobs/<id> and GET /jobs/<id>/video (Range requests supported).
+    """
+
     def do_GET(self):  # noqa: N802 - http.server expects this name
-        self.send_response(200)
-        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        path = self.path.split("?", 1)[0]
+        if path == "/metrics":
+            body = MetricsRegistry.shared().render().encode("utf-8")
+            self._send(200, body, "text/plain; version=0.0.4; charset=utf-8")
+            return
+        match = _JOB_ROUTE.match(path)
+        api = getattr(self.server, "job_api", None)
+        if match and api:
+            if not self._authorized(api):
+                return
+            job_id, video = match.groups()
+            if video:
+                self._send_video(job_id)
+            else:
+                self._call(lambda api: api.status(job_id), 200)
+            return
+        self._send(200, b"ok", "text/plain; charset=utf-8")
+
+    def do_HEAD(self):  # noqa: N802 - http.server expects this name
+        match = _JOB_ROUTE.match(self.path.split("?", 1)[0])
+        api = getattr(self.server, "job_api", None)
+        if match and match.group(2) and api:
+            if self._authorized(api):
+                self._send_video(match.group(1), head=True)
+            return
+        self._send(200, b"", "text/plain; charset=utf-8")
+
+    def do_POST(self):  # noqa: N802 - http.server expects this name
+        api = getattr(self.server, "job_api", None)
+        if self.path.split("?", 1)[0] != "/jobs" or api is None:
+            self._send_json(404, {"error": "Not found"})
+            return
+        if not self._authorized(api):
+            return
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        if not 0 <= length <= MAX_REQUEST_BYTES:
+            self._send_json(413, {"error": "Request too large"})
+            return
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_json(400, {"error": "Body must be JSON"})
+            return
+        self._call(lambda api: api.submit(payload), 202)
+
+    def _authorized(self, api) -> bool:
+        """Checks the bearer token, answering 401 when it is missing or wrong."""
+        if api.authorized(self.headers.get("Authorization")):
+            return True
+        self._send_json(401, {"error": "Missing or wrong bearer token"})
+        return False
+
+    def _call(self, action, status: int) -> None:
+        try:
+            self._send_json(status, action(self.server.job_api))
+        except JobApiError as e:
+            self._send_json(e.status, {"error": str(e)})
+        except Exception as e:
+            print(f"⚠️ Job API error: {e}")
+            self._send_json(500, {"error": "Internal error"})
+
+    def _send_video(self, job_id: str, head: bool = False) -> None:
+        path = self.server.job_api.output_path(job_id)
+        try:
+            f = open(path, "rb") if path else None
+        except FileNotFoundError:
+            f = None
+        if f is None:
+            self._send_json(404, {"error": "No video for this job (not finished or expired)"})
+            return
+
+        with f:
+            size = os.fstat(f.fileno()).st_size
+            try:
+                byte_range = _byte_range(self.headers.get("Range"), size)
+            except ValueError:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{size}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+
+            first, last = byte_range or (0, size - 1)
+            self.send_response(206 if byte_range else 200)
+            self.send_header("Content-Type", "video/mp4")
+            self.send_header("Accept-Ranges", "bytes")
+            self.send_header("Content-Length", str(last - first + 1))
+            if byte_range:
+                self.send_header("Content-Range", f"bytes {first}-{last}/{size}")
+            self.send_header("Content-Disposition", f'attachment; filename="{job_id}.mp4"')
+            self.end_headers()
+            if head:
+                return
+
+            f.seek(first)
+            remaining = last - first + 1
+            try:
+                while remaining > 0:
+                    chunk = f.read(min(STREAM_CHUNK, remaining))
+                    if not chunk:
+                        break
+                    self.wfile.write(chunk)
+                    remaining -= len(chunk)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # Client went away mid-download
+
+    def _send_json(self, status: int, payload: dict) -> None:
+        self._send(status, json.dumps(payload, ensure_ascii=False).encode("utf-8"), "application/json; charset=utf-8")
+
+    def _send(self, status: int, body: bytes, content_type: str) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
         self.end_headers()
-        self.wfile.write(b"ok")
+        self.wfile.write(body)
 
     def log_message(self, format, *args):  # noqa: A003 - match base signature
         return
 
 
-def _serve(host: str, port: int) -> None:
-    server = HTTPServer((host, port), _HealthHandler)
+def _serve(host: str, port: int, job_api=None) -> None:
+    # One thread per request: a slow video download never blocks health checks
+    server = ThreadingHTTPServer((host, port), _HealthHandler)
+    server.job_api = job_api
     server.serve_forever()
 
 
@@ -25,9 +181,14 @@ def _is_enabled(value: str | None) -> bool:
     return value.strip().lower() in {"1", "true", "yes", "on"}
 
 
-def keep_alive() -> None:
-    """Start a lightweight healthcheck server when ENABLE_KEEP_ALIVE is truthy."""
+def keep_alive(job_api=None) -> None:
+    """
+    Start a lightweight healthcheck server (with Prometheus metrics on /metrics) when
+    ENABLE_KEEP_ALIVE is truthy. Passing a services.job_api.JobApi also serves the /jobs API.
+    """
     if not _is_enabled(os.getenv("ENABLE_KEEP_ALIVE")):
+        if job_api is not None:
+            print("⚠️ The job API needs ENABLE_KEEP_ALIVE=1; it is not served.")
         return
 
     host = os.getenv("KEEP_ALIVE_HOST", "0.0.0.0")
@@ -37,5 +198,8 @@ def keep_alive() -> None:
     except ValueError:
         print(f"⚠️ KEEP_ALIVE_PORT must be an integer (got {raw_port!r}).")
         return
-    thread = threading.Thread(target=_serve, args=(host, port), daemon=True)
+    if job_api is not None and not job_api.servable_on(host):
+        print(f"⚠️ The job API is not served: set JOB_API_TOKEN or bind KEEP_ALIVE_HOST to 127.0.0.1 (got {host!r}).")
+        job_api = None
+    thread = threading.Thread(target=_serve, args=(host, port, job_api), daemon=True)
     thread.start()
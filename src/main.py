@@ -1,4 +1,24 @@
 import os
+from time import perf_counter
+
+# Startup timing breakdown (printed once the bot is ready)
+_startup_marks = [("start", perf_counter())]
+
+
+def mark_startup(label: str) -> None:
+    _startup_marks.append((label, perf_counter()))
+
+
+def startup_report() -> str:
+    steps = [
+        f"{label} {end - begin:.2f}s"
+        for (_, begin), (label, end) in zip(_startup_marks, _startup_marks[1:])
+    ]
+    total = _startup_marks[-1][1] - _startup_marks[0][1]
+    return f"⏱️ Startup {total:.2f}s: " + ", ".join(steps)
+
+
+import threading
 import PIL.Image
 
 # Monkey patch ANTIALIAS for older libraries (moviepy, pilmoji)
@@ -8,35 +28,60 @@ if not hasattr(PIL.Image, 'ANTIALIAS'):
 import asyncio
 import subprocess
 from time import time
-from telegram import Update, ReplyKeyboardRemove, ReplyKeyboardMarkup
+from telegram import Update, ReplyKeyboardRemove, ReplyKeyboardMarkup, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import (
     ApplicationBuilder, 
     ContextTypes, 
     MessageHandler, 
     filters, 
     ConversationHandler,
-    CommandHandler
+    CommandHandler,
+    CallbackQueryHandler
 )
 from telegram.request import HTTPXRequest
 
 from config import Config
 from keep_alive import keep_alive
-from services.downloader import VideoDownloader
+from services.download_cache import DownloadCache
 from services.graphics import GraphicsEngine
 from services.ai_generator import AIGenerator
-
-from time import sleep
+from services.jobs import Job, JobManager
+from services.job_api import JobApi
+from services.pipeline import JobPipeline
+from services.browser_pool import BrowserPool
+from services.metrics import STAGE_SECONDS
+from services.telegram_uploads import VideoUploader
+mark_startup("imports")
 
 # Initialize Services
 graphics_engine = GraphicsEngine()
+mark_startup("graphics")
 ai_generator = AIGenerator()
+download_cache = DownloadCache.shared()
+video_uploader = VideoUploader.shared()
+pipeline = JobPipeline(graphics_engine, ai_generator, download_cache)
+job_manager = JobManager(pipeline.run)
+# HTTP submissions (POST /jobs on the keep_alive server) run through the same job manager
+job_api = JobApi(job_manager) if Config.JOB_API_ENABLED else None
+mark_startup("services")
+
+
+def warm_up():
+    """Loads the lazily imported SDKs in the background so the first job doesn't pay for them."""
+    started = perf_counter()
+    try:
+        import yt_dlp  # noqa: F401
+        ai_generator.get_backend()
+    except Exception as e:
+        print(f"⚠️ Warm-up failed: {e}")
+    print(f"🔥 Background warm-up done in {perf_counter() - started:.2f}s")
 
 # States
 LINK, TITLE, BODY, LAYOUT_CHOICE = range(4)
 
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_user.id
-    if user_id != Config.ALLOWED_USER_ID:
+    if user_id not in Config.ALLOWED_USER_IDS:
         await update.message.reply_text("⛔ גישה נדחתה.")
         return ConversationHandler.END
 
@@ -50,15 +95,16 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def receive_link(update: Update, context: ContextTypes.DEFAULT_TYPE):
     link = update.message.text.strip()
     context.user_data['link'] = link
+
+    # The job (and its private workspace) exists from here so the download can land in it
+    job = Job(update.effective_user.id, update.effective_chat.id, link)
+    job.create_workspace()
     
     # --- EARLY DOWNLOAD START ---
-    async def download_task_wrapper(url):
-        print(f"🚀 Starting background download for: {url}")
-        return await asyncio.to_thread(VideoDownloader.download_video, url)
-
-    # Start the task and store it
-    task = asyncio.create_task(download_task_wrapper(link))
-    context.user_data['download_task'] = task
+    print(f"🚀 Starting background download for: {link}")
+    # Same link twice (or already cached) -> one download shared by both jobs
+    pipeline.start_download(job)
+    context.user_data['job'] = job
     
     await update.message.reply_text(
         "✅ לינק התקבל (ההורדה מתחילה ברקע... ⏳)\n"
@@ -102,113 +148,199 @@ async def receive_layout_choice(update: Update, context: ContextTypes.DEFAULT_TY
     context.user_data['layout'] = layout_mode
     
     # Retrieve all data
-    url = context.user_data['link']
-    headline = context.user_data['title']
-    body_text = context.user_data['body']
-    
+    job = context.user_data.get('job')
+    if job is None:
+        job = Job(update.effective_user.id, update.effective_chat.id, context.user_data['link'])
+    job.headline = context.user_data['title']
+    job.body = context.user_data['body']
+    job.layout_mode = layout_mode
+    job.want_draft = True
+    job.on_draft = lambda drafted, path: deliver_draft(context.bot, drafted, path)
+
+    queued = not job_manager.has_free_slot(job.user_id)
+    job_manager.submit(job, on_done=lambda finished: deliver_job(context.bot, finished))
+
+    status = "⏳ בתור - יתחיל כשאחד הסרטונים הקודמים יסתיים." if queued else "⏳ מתחיל לעבד..."
+    render_depth = graphics_engine.scheduler.queue_depth()
+    if render_depth:
+        eta_minutes = int(graphics_engine.scheduler.estimate_start() // 60) + 1
+        status += f"\n🎬 ממתינים לרינדור: {render_depth} (התחלה משוערת בעוד ~{eta_minutes} דק')"
     await update.message.reply_text(
         f"✅ נבחר: {choice}\n"
-        "⏳ מסים לעבד... (ממתין להורדה אם טרם הסתיימה)",
+        f"{status}\n"
+        "אשלח את הסרטון כשיהיה מוכן. אפשר להתחיל סרטון נוסף עם /start",
         reply_markup=ReplyKeyboardRemove()
     )
 
-    try:
-        # 1. Retrieve the Pre-started Download Task (returns path, metadata)
-        download_task = context.user_data.get('download_task')
-        if not download_task:
-            print("⚠️ Download task missing, starting now...")
-            video_path, video_info = await asyncio.to_thread(VideoDownloader.download_video, url)
-        else:
-            print("⏳ Awaiting background download task...")
-            video_path, video_info = await download_task
-            
-        print(f"✅ Video ready at: {os.path.basename(video_path)}")
-
-        # Add URL to info so it can be passed to AI
-        video_info['url'] = url
-
-        # 2. Sequential Execution (AI then Render) to save memory
-        description = "סרטון חדש! 🎥" # Default
+    # One status message per job, edited as the encode progresses
+    status_message = await context.bot.send_message(chat_id=job.chat_id, text="⏳ ממתין לרינדור...")
+    job.on_progress = progress_updater(status_message)
+
+    # Reset state; the job now lives in the job manager
+    context.user_data.clear()
+    return ConversationHandler.END
+
+def format_progress(progress: dict) -> str:
+    label = "טיוטה" if progress.get('profile') == 'draft' else "רינדור סופי"
+    if progress.get('percent') is None:
+        text = f"🎬 {label}: {progress.get('out_time') or 0:.0f} שנ' עובדו"
+    else:
+        text = f"🎬 {label}: {progress['percent']:.0f}%"
+    if progress.get('eta') is not None and not progress.get('ended'):
+        text += f" | נותרו ~{progress['eta']:.0f} שנ'"
+    if progress.get('speed'):
+        text += f" | מהירות {progress['speed']:.2f}x"
+    return text
+
+def progress_updater(message, interval: float = 3.0):
+    """Returns an on_progress hook that edits `message` at most once per `interval` seconds."""
+    state = {'last': 0.0, 'text': None}
+
+    async def safe_edit(text):
         try:
-            print("🧠 Generating AI description...")
-            context_prompt = f"Video Title (User): {headline}\nVideo Body (User): {body_text}"
-            # Run AI in thread
-            description = await asyncio.to_thread(ai_generator.generate_description, context_prompt, video_info)
-            print("✅ AI Description generated.")
-        except Exception as ai_e:
-            print(f"⚠️ AI Generation failed (skipping): {ai_e}")
-            description = f"{headline}\n\n{body_text}"
-
-        print("🎨 Starting video render...")
-        final_video_path = await asyncio.to_thread(
-            graphics_engine.render_video, 
-            video_path, 
-            headline, 
-            body_text,
-            layout_mode 
+            await message.edit_text(text)
+        except Exception as e:
+            print(f"⚠️ Status edit failed: {e}")
+
+    def on_progress(job, progress):
+        now = time()
+        if not progress.get('ended') and now - state['last'] < interval:
+            return
+        text = format_progress(progress)
+        if text == state['text']:
+            return
+        state['last'] = now
+        state['text'] = text
+        asyncio.create_task(safe_edit(text))
+
+    return on_progress
+
+async def deliver_draft(bot, job: Job, draft_path: str):
+    """Sends the low-res preview while the final encode keeps running."""
+    keyboard = InlineKeyboardMarkup([[InlineKeyboardButton("✏️ תיקון טקסט", callback_data=f"redo:{job.id}")]])
+    with STAGE_SECONDS.time(stage='upload_draft'):
+        await video_uploader.send_video(
+            bot,
+            job.chat_id,
+            draft_path,
+            caption="👀 טיוטה - הגרסה הסופית בדרך. לא טוב? לחץ לתיקון הטקסט.",
+            width=540,
+            height=960,
+            supports_streaming=True,
+            reply_markup=keyboard,
+            read_timeout=120,
+            write_timeout=120
         )
-        print(f"✅ Rendering complete: {os.path.basename(final_video_path)}")
-        
-        # 4. Send back
-        await update.message.reply_text("🚀 מוכן! מעלה אליך...")
-        
-        with open(final_video_path, 'rb') as video_file:
-            await update.message.reply_video(
-                video=video_file,
-                caption=description,
-                width=1080,
-                height=1920,
-                supports_streaming=True,
-                read_timeout=300,
-                write_timeout=300 
-            )
-        
-        # 5. Cleanup
-        files_to_remove = [video_path, final_video_path, os.path.join(Config.TEMP_DIR, "overlay.png")]
-        for f in files_to_remove:
-            if os.path.exists(f):
-                try:
-                    os.remove(f)
-                except Exception as e:
-                    print(f"⚠️ Cleanup warning: Could not remove {f}: {e}")
-        
-        print("✨ Task completed successfully and cleaned up.")
-        
-        # Reset state
-        context.user_data.clear()
 
-    except Exception as e:
-        print(f"❌ Error during processing: {e}")
-        await update.message.reply_text(f"❌ שגיאה: {str(e)}")
-        # Partial Cleanup
-        if 'video_path' in locals() and os.path.exists(video_path):
-            os.remove(video_path)
-        overlay_tmp = os.path.join(Config.TEMP_DIR, "overlay.png")
-        if os.path.exists(overlay_tmp):
-            os.remove(overlay_tmp)
+async def redo(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Rejects a draft: cancels its final encode and asks for new text on the same source."""
+    query = update.callback_query
+    await query.answer()
 
-    return ConversationHandler.END
+    old_job = job_manager.get(query.data.split(':', 1)[1])
+    if old_job is None or old_job.user_id != update.effective_user.id:
+        await query.message.reply_text("⚠️ העבודה הזו כבר לא זמינה. התחל מחדש עם /start")
+        return ConversationHandler.END
+
+    job = Job(old_job.user_id, old_job.chat_id, old_job.url)
+    job.create_workspace()
+
+    # Take over the already downloaded source before the old workspace is removed
+    source = old_job.source
+    reused = None
+    if source and os.path.exists(source[0]):
+        reused_path = os.path.join(job.workspace, os.path.basename(source[0]))
+        try:
+            os.link(source[0], reused_path)
+            reused = (reused_path, dict(source[1]))
+        except OSError as e:
+            print(f"⚠️ Could not reuse source of job {old_job.id}: {e}")
+
+    if reused:
+        async def reuse_source():
+            return reused
+        job.download_task = asyncio.create_task(reuse_source())
+    else:
+        pipeline.start_download(job)
+
+    if job_manager.cancel(old_job.id):
+        print(f"🛑 Job {old_job.id} cancelled for re-render.")
+
+    context.user_data.clear()
+    context.user_data['link'] = job.url
+    context.user_data['job'] = job
+
+    await query.message.reply_text(
+        "✏️ בוא נתקן. הרינדור הקודם בוטל.\n"
+        "שלח את הכותרת החדשה (שתופיע בגדול):",
+        reply_markup=ReplyKeyboardRemove()
+    )
+    return TITLE
+
+async def deliver_job(bot, job: Job):
+    """Sends a finished job back to the chat it came from."""
+    if job.status == 'failed':
+        await bot.send_message(chat_id=job.chat_id, text=f"❌ שגיאה: {job.error}")
+        return
+    if job.status != 'done':
+        return
+
+    final_video_path, description = job.result
+    await bot.send_message(chat_id=job.chat_id, text="🚀 מוכן! מעלה אליך...")
+    
+    # Identical output sent before goes out by file_id, without another upload
+    with STAGE_SECONDS.time(stage='upload'):
+        await video_uploader.send_video(
+            bot,
+            job.chat_id,
+            final_video_path,
+            caption=description,
+            width=1080,
+            height=1920,
+            supports_streaming=True,
+            read_timeout=300,
+            write_timeout=300 
+        )
+    
+    print(f"✨ Job {job.id} completed successfully.")
 
 async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text("❌ הפעולה בוטלה.", reply_markup=ReplyKeyboardRemove())
+    job = context.user_data.get('job')
+    if job:
+        job.cleanup()
     context.user_data.clear()
     return ConversationHandler.END
 
 if __name__ == '__main__':
     Config.ensure_dirs()
 
-    keep_alive()
-
-    sleep(3)
+    keep_alive(job_api)
+    mark_startup("health server")
     
     print("🤖 Bot is starting...")
     
     trequest = HTTPXRequest(connection_pool_size=8, read_timeout=300, write_timeout=300, connect_timeout=60)
     
-    application = ApplicationBuilder().token(Config.TELEGRAM_TOKEN).request(trequest).build()
+    async def attach_job_api(app):
+        # The API hands its jobs to the loop the bot runs on
+        if job_api:
+            job_api.attach(asyncio.get_running_loop())
+
+    builder = ApplicationBuilder().token(Config.TELEGRAM_TOKEN).request(trequest).post_init(attach_job_api)
+    if Config.TELEGRAM_API_URL:
+        # Local Bot API server: no 50 MB upload cap, and videos are read from disk by the server
+        builder = (builder.base_url(f"{Config.TELEGRAM_API_URL}/bot")
+                   .base_file_url(f"{Config.TELEGRAM_API_URL}/file/bot")
+                   .local_mode(True))
+        print(f"🛰️ Using local Bot API server at {Config.TELEGRAM_API_URL}")
+    application = builder.build()
     
     conv_handler = ConversationHandler(
-        entry_points=[CommandHandler('start', start)],
+        entry_points=[
+            CommandHandler('start', start),
+            CallbackQueryHandler(redo, pattern=r'^redo:'),
+        ],
         states={
             LINK: [MessageHandler(filters.TEXT & ~filters.COMMAND, receive_link)],
             TITLE: [MessageHandler(filters.TEXT & ~filters.COMMAND, receive_title)],
@@ -219,5 +351,12 @@ if __name__ == '__main__':
     )
     
     application.add_handler(conv_handler)
+    mark_startup("telegram app")
+    print(startup_report())
+
+    threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
     
-    application.run_polling()
\ No newline at end of file
+    try:
+        application.run_polling()
+    finally:
+        BrowserPool.shutdown_shared()
\ No newline at end of file
@@ -1,33 +1,102 @@
-import google.generativeai as genai
+import os
+import json
+import time
+import random
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+
 from config import Config
+from services.metrics import CACHE_LOOKUPS, FALLBACKS
+
+
+class EmptyResponse(Exception):
+    """The model answered without any caption text."""
+
+
+class GeminiBackend:
+    """Gemini through the async client; any object with `async generate(prompt) -> str` can replace it."""
+
+    def __init__(self, api_key: str, model_name: str = 'gemini-2.5-flash'):
+        # The Gemini SDK takes most of a second to import, so it is loaded on first use
+        import google.generativeai as genai
+        from google.api_core import exceptions as api_exceptions
+
+        genai.configure(api_key=api_key)
+        self.model = genai.GenerativeModel(model_name)
+        # Worth another attempt: overload, rate limits and dropped connections
+        self.transient_errors = (
+            api_exceptions.ServiceUnavailable,
+            api_exceptions.ResourceExhausted,
+            api_exceptions.InternalServerError,
+            api_exceptions.DeadlineExceeded,
+            ConnectionError,
+        )
+
+    async def generate(self, prompt: str) -> str:
+        response = await self.model.generate_content_async(prompt)
+        try:
+            return response.text.strip() if response else ""
+        except ValueError:
+            # Blocked or empty candidates
+            return ""
+
 
 class AIGenerator:
-    def __init__(self):
-        # Initialize Gemini
-        self.gemini_available = False
-        if Config.GEMINI_API_KEY:
-            try:
-                genai.configure(api_key=Config.GEMINI_API_KEY)
-                self.model = genai.GenerativeModel('gemini-2.5-flash')
-                self.gemini_available = True
-                print("✨ Gemini AI engine initialized.")
-            except Exception as e:
-                print(f"⚠️ Failed to initialize Gemini: {e}")
-        else:
-            print("⚠️ No GEMINI_API_KEY found in config.")
+    """
+    Async caption service.
+    Each call has a deadline, transient errors are retried with jittered backoff,
+    concurrent calls are capped, and captions are cached in memory (LRU) and on
+    disk by normalized prompt + metadata. Disk entries expire after `cache_ttl`
+    seconds and are evicted LRU-first beyond `cache_bytes`. Any failure or a
+    missed deadline returns the caller's fallback caption right away.
+    """
 
-    def generate_description(self, user_prompt: str, video_info: dict) -> str:
+    def __init__(self, backend=None, deadline: float | None = None, retries: int | None = None,
+                 concurrency: int | None = None, cache_size: int | None = None, cache_dir: str | None = None,
+                 cache_ttl: float | None = None, cache_bytes: int | None = None):
+        # Without an explicit backend, Gemini is created on first use (see get_backend)
+        self.backend = backend
+        self.gemini_available = backend is not None or bool(Config.GEMINI_API_KEY)
         if not self.gemini_available:
-            return "AI Description Unavailable (Missing API Key)."
+            print("⚠️ No GEMINI_API_KEY found in config.")
+        self._backend_lock = threading.Lock()
 
+        self.deadline = deadline or Config.AI_DEADLINE_SECONDS
+        self.retries = Config.AI_RETRIES if retries is None else retries
+        self.concurrency = concurrency or Config.AI_CONCURRENCY
+        self.cache_size = Config.AI_CACHE_SIZE if cache_size is None else cache_size
+        self.cache_dir = cache_dir or Config.AI_CACHE_DIR
+        self.cache_ttl = Config.AI_CACHE_TTL if cache_ttl is None else cache_ttl
+        self.cache_bytes = Config.AI_CACHE_BYTES if cache_bytes is None else cache_bytes
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._slots = {}
+
+    def get_backend(self):
+        """The caption backend, creating the Gemini client on first call (thread-safe)."""
+        with self._backend_lock:
+            if self.backend is None and self.gemini_available:
+                try:
+                    self.backend = GeminiBackend(Config.GEMINI_API_KEY)
+                    print("✨ Gemini AI engine initialized.")
+                except Exception as e:
+                    print(f"⚠️ Failed to initialize Gemini: {e}")
+                    self.gemini_available = False
+            return self.backend
+
+    @staticmethod
+    def build_prompt(user_prompt: str, video_info: dict) -> str:
         # Construct context
         context = f"""
         VIDEO METADATA:
         - Title: {video_info.get('title', 'N/A')}
         - URL: {video_info.get('url', 'N/A')}
         - Uploader: {video_info.get('uploader', 'N/A')}
-        - Tags: {', '.join(video_info.get('tags', []))}
-        - Original Description: {video_info.get('description', 'N/A')[:1000]}
+        - Tags: {', '.join(video_info.get('tags') or [])}
+        - Original Description: {(video_info.get('description') or 'N/A')[:1000]}
         
         USER'S TEXT FOR VIDEO:
         {user_prompt}
@@ -56,12 +125,146 @@ class AIGenerator:
         {context}
         """
         
+        return prompt
+
+    @staticmethod
+    def cache_key(user_prompt: str, video_info: dict) -> str:
+        """Whitespace-insensitive key over the user text and the metadata the prompt uses."""
+        normalized = {
+            'prompt': ' '.join(user_prompt.split()),
+            'title': video_info.get('title'),
+            'url': video_info.get('url'),
+            'uploader': video_info.get('uploader'),
+            'tags': list(video_info.get('tags') or []),
+            'description': (video_info.get('description') or '')[:1000],
+        }
+        raw = json.dumps(normalized, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def _cache_get(self, key: str) -> str | None:
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+        path = os.path.join(self.cache_dir, key + '.json')
+        try:
+            if time.time() - os.stat(path).st_mtime > self.cache_ttl:
+                os.remove(path)
+                return None
+            with open(path, 'r', encoding='utf-8') as f:
+                caption = json.load(f)['caption']
+            # Recently used entries are evicted last
+            os.utime(path, None)
+        except (OSError, ValueError, KeyError):
+            return None
+        self._remember(key, caption)
+        return caption
+
+    def _remember(self, key: str, caption: str) -> None:
+        with self._lock:
+            self._memory[key] = caption
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.cache_size:
+                self._memory.popitem(last=False)
+
+    def _cache_put(self, key: str, caption: str) -> None:
+        self._remember(key, caption)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path = os.path.join(self.cache_dir, key + '.json')
+            with open(path + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump({'caption': caption}, f, ensure_ascii=False)
+            os.replace(path + '.tmp', path)
+            self._evict()
+        except OSError as e:
+            print(f"⚠️ Could not write caption cache: {e}")
+
+    def _evict(self) -> None:
+        """Drops expired captions, then the least recently used ones beyond the byte budget."""
+        cutoff = time.time() - self.cache_ttl
+        with self._lock:
+            entries = []
+            total = 0
+            for entry in os.scandir(self.cache_dir):
+                if not entry.name.endswith('.json'):
+                    continue
+                try:
+                    st = entry.stat()
+                    if st.st_mtime < cutoff:
+                        os.remove(entry.path)
+                        continue
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, entry.path))
+                total += st.st_size
+
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.cache_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except FileNotFoundError:
+                    pass
+
+    def _slots_for_loop(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if loop not in self._slots:
+            self._slots = {loop: asyncio.Semaphore(self.concurrency)}
+        return self._slots[loop]
+
+    async def _generate(self, prompt: str) -> str:
+        backend = await asyncio.to_thread(self.get_backend)
+        if backend is None:
+            raise RuntimeError("AI backend unavailable")
+        transient = getattr(backend, 'transient_errors', (Exception,)) + (EmptyResponse,)
+        async with self._slots_for_loop():
+            attempt = 0
+            while True:
+                try:
+                    text = await backend.generate(prompt)
+                    if not text:
+                        raise EmptyResponse("AI returned empty response.")
+                    return text
+                except transient as e:
+                    if attempt >= self.retries:
+                        raise
+                    delay = min(4.0, 0.5 * 2 ** attempt) * random.uniform(0.5, 1.5)
+                    print(f"⚠️ Gemini error ({e}); retrying in {delay:.1f}s...")
+                    await asyncio.sleep(delay)
+                    attempt += 1
+
+    async def caption(self, user_prompt: str, video_info: dict, fallback: str) -> str:
+        """Caption for the video, or `fallback` if the model is unavailable, fails or misses the deadline."""
+        key = self.cache_key(user_prompt, video_info)
+        cached = self._cache_get(key)
+        if cached:
+            print("♻️ Caption cache hit.")
+            CACHE_LOOKUPS.inc(cache='caption', result='hit')
+            return cached
+        CACHE_LOOKUPS.inc(cache='caption', result='miss')
+        if not self.gemini_available:
+            FALLBACKS.inc(kind='gemini_unavailable')
+            return fallback
+
         try:
             print("🧠 Asking Gemini for description...")
-            response = self.model.generate_content(prompt)
-            if response and response.text:
-                return response.text.strip()
-            return "AI returned empty response."
+            text = await asyncio.wait_for(self._generate(self.build_prompt(user_prompt, video_info)), self.deadline)
+        except asyncio.TimeoutError:
+            print(f"⚠️ Gemini missed the {self.deadline:.0f}s deadline; using the plain caption.")
+            FALLBACKS.inc(kind='gemini_timeout')
+            return fallback
         except Exception as e:
             print(f"⚠️ Gemini error: {e}")
-            return "Error generating description with AI."
+            FALLBACKS.inc(kind='gemini_error')
+            return fallback
+
+        self._cache_put(key, text)
+        return text
+
+    def generate_description(self, user_prompt: str, video_info: dict) -> str:
+        """Blocking wrapper for callers outside an event loop."""
+        if not self.gemini_available:
+            return "AI Description Unavailable (Missing API Key)."
+        return asyncio.run(self.caption(user_prompt, video_info, "Error generating description with AI."))
@@ -0,0 +1,166 @@
+import asyncio
+import threading
+
+from config import Config
+
+LAUNCH_ARGS = [
+    "--disable-blink-features=AutomationControlled",
+    "--no-sandbox",
+    "--disable-setuid-sandbox"
+]
+
+MOBILE_CONTEXT = {
+    'user_agent': 'Mozilla/5.0 (iPhone; CPU iPhone OS 14_8 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/14.1.2 Mobile/15E148 Safari/604.1',
+    'viewport': {'width': 375, 'height': 812},
+}
+
+
+class BrowserPool:
+    """
+    Long-lived headless Chromium owned by a dedicated worker thread.
+    Jobs borrow a fresh browser context (isolated cookies/storage) instead of
+    launching Chromium themselves. Open pages are bounded, and the browser is
+    relaunched after `max_uses` contexts or as soon as it disconnects.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, max_pages: int | None = None, max_uses: int | None = None):
+        self.max_pages = max_pages or Config.BROWSER_MAX_PAGES
+        self.max_uses = max_uses or Config.BROWSER_MAX_USES
+
+        self._loop = None
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+        # Owned by the worker loop
+        self._playwright = None
+        self._browser = None
+        self._uses = 0
+        self._active = {}
+        self._pages = None
+        self._launch_lock = None
+
+    @classmethod
+    def shared(cls) -> 'BrowserPool':
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    @classmethod
+    def shutdown_shared(cls) -> None:
+        with cls._shared_lock:
+            pool, cls._shared = cls._shared, None
+        if pool:
+            pool.shutdown()
+
+    def _ensure_started(self) -> asyncio.AbstractEventLoop:
+        with self._start_lock:
+            if self._loop is None:
+                ready = threading.Event()
+                self._thread = threading.Thread(target=self._serve, args=(ready,), name="browser-pool", daemon=True)
+                self._thread.start()
+                ready.wait()
+            return self._loop
+
+    def _serve(self, ready: threading.Event) -> None:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._pages = asyncio.Semaphore(self.max_pages)
+        self._launch_lock = asyncio.Lock()
+        self._loop = loop
+        ready.set()
+        loop.run_forever()
+        loop.close()
+
+    async def _launch(self):
+        if self._playwright is None:
+            from playwright.async_api import async_playwright
+            self._playwright = await async_playwright().start()
+        print("🌐 Launching pooled Chromium...")
+        return await self._playwright.chromium.launch(headless=True, args=LAUNCH_ARGS)
+
+    async def _acquire_browser(self):
+        async with self._launch_lock:
+            browser = self._browser
+            if browser is None or not browser.is_connected() or self._uses >= self.max_uses:
+                self._browser = await self._launch()
+                self._uses = 0
+                if browser is not None:
+                    await self._retire(browser)
+            self._uses += 1
+            browser = self._browser
+            self._active[browser] = self._active.get(browser, 0) + 1
+            return browser
+
+    async def _release_browser(self, browser) -> None:
+        self._active[browser] -= 1
+        if browser is not self._browser:
+            await self._retire(browser)
+
+    async def _retire(self, browser) -> None:
+        # Old browsers stay up until their last context is done
+        if self._active.get(browser, 0) > 0:
+            return
+        self._active.pop(browser, None)
+        try:
+            await browser.close()
+        except Exception as e:
+            print(f"⚠️ Closing retired browser failed: {e}")
+
+    async def _with_context(self, fn, context_options: dict):
+        async with self._pages:
+            browser = await self._acquire_browser()
+            try:
+                context = await browser.new_context(**context_options)
+                try:
+                    return await fn(context)
+                finally:
+                    try:
+                        await context.close()
+                    except Exception:
+                        pass
+            finally:
+                await self._release_browser(browser)
+
+    def run(self, fn, context_options: dict | None = None, timeout: float | None = None):
+        """
+        Runs `await fn(context)` on the pool thread with a fresh browser context
+        and blocks until it returns. Call from a worker thread, not the event loop.
+        """
+        loop = self._ensure_started()
+        future = asyncio.run_coroutine_threadsafe(
+            self._with_context(fn, context_options or MOBILE_CONTEXT), loop
+        )
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            future.cancel()
+            raise
+
+    async def _close(self) -> None:
+        for browser in list(self._active) + ([self._browser] if self._browser else []):
+            try:
+                await browser.close()
+            except Exception:
+                pass
+        self._active.clear()
+        self._browser = None
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+    def shutdown(self, timeout: float = 30) -> None:
+        """Closes the browser, stops Playwright and joins the worker thread."""
+        with self._start_lock:
+            loop, self._loop = self._loop, None
+        if loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._close(), loop).result(timeout)
+        except Exception as e:
+            print(f"⚠️ Browser pool shutdown: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+        self._thread.join(timeout)
@@ -0,0 +1,226 @@
+import os
+import re
+import json
+import time
+import asyncio
+import hashlib
+import threading
+from urllib.parse import urlparse, parse_qs
+
+import requests
+
+from config import Config
+from services.downloader import VideoDownloader
+from services.render_cache import RenderCache
+from services.metrics import CACHE_LOOKUPS
+
+# Short links that only reveal the video id after following redirects
+SHORT_LINK_HOSTS = ('vm.tiktok.com', 'vt.tiktok.com')
+
+_TIKTOK_ID = re.compile(r'/video/(\d+)')
+_INSTAGRAM_CODE = re.compile(r'/(?:p|reel|reels|tv)/([A-Za-z0-9_-]+)')
+_YOUTUBE_PATH_ID = re.compile(r'/(?:shorts|embed|live|v)/([A-Za-z0-9_-]{11})')
+
+
+def canonical_video_id(url: str) -> str | None:
+    """
+    Maps a link to '<platform>:<id>' without network access.
+    Returns None for links whose id isn't visible in the URL (e.g. TikTok short links).
+    """
+    parsed = urlparse(url.strip())
+    host = (parsed.hostname or '').lower()
+    if host.startswith('www.') or host.startswith('m.'):
+        host = host.split('.', 1)[1]
+
+    if host.endswith('tiktok.com'):
+        match = _TIKTOK_ID.search(parsed.path)
+        return f"tiktok:{match.group(1)}" if match else None
+    if host.endswith('instagram.com'):
+        match = _INSTAGRAM_CODE.search(parsed.path)
+        return f"instagram:{match.group(1)}" if match else None
+    if host == 'youtu.be':
+        video_id = parsed.path.strip('/').split('/')[0]
+        return f"youtube:{video_id}" if video_id else None
+    if host.endswith('youtube.com'):
+        video_id = parse_qs(parsed.query).get('v', [None])[0]
+        if not video_id:
+            match = _YOUTUBE_PATH_ID.search(parsed.path)
+            video_id = match.group(1) if match else None
+        return f"youtube:{video_id}" if video_id else None
+    return None
+
+
+class DownloadCache:
+    """
+    Disk cache of downloaded sources keyed on the canonical video id.
+    Entries expire after Config.DOWNLOAD_CACHE_TTL and are evicted LRU-first
+    beyond Config.DOWNLOAD_CACHE_BYTES. Concurrent requests for the same id
+    share one in-flight download (single-flight). Callers get a hard link in
+    their own directory, so cache eviction never touches a running job.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, root: str | None = None, ttl: float | None = None, budget: int | None = None,
+                 enabled: bool | None = None, downloader=None, metadata_fetcher=None):
+        self.root = root or Config.DOWNLOAD_CACHE_DIR
+        self.ttl = Config.DOWNLOAD_CACHE_TTL if ttl is None else ttl
+        self.budget = Config.DOWNLOAD_CACHE_BYTES if budget is None else budget
+        self.enabled = Config.DOWNLOAD_CACHE_ENABLED if enabled is None else enabled
+        self.downloader = downloader or VideoDownloader.download_video
+        self.metadata_fetcher = metadata_fetcher or VideoDownloader.fetch_metadata
+        self._inflight = {}
+        self._resolved = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls) -> 'DownloadCache':
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def resolve_id(self, url: str) -> str:
+        """Canonical id, following short-link redirects once per URL (blocking)."""
+        video_id = canonical_video_id(url)
+        if video_id:
+            return video_id
+        if url in self._resolved:
+            return self._resolved[url]
+
+        if (urlparse(url).hostname or '').lower() in SHORT_LINK_HOSTS or '/t/' in urlparse(url).path:
+            try:
+                r = requests.head(url, allow_redirects=True, timeout=15)
+                video_id = canonical_video_id(r.url)
+            except requests.RequestException as e:
+                print(f"⚠️ Could not resolve short link {url}: {e}")
+        if not video_id:
+            normalized = url.strip().split('#', 1)[0]
+            video_id = "url:" + hashlib.sha256(normalized.encode('utf-8')).hexdigest()[:32]
+        self._resolved[url] = video_id
+        return video_id
+
+    @staticmethod
+    def _variant(middle_seconds: float | None) -> str:
+        return 'full' if middle_seconds is None else f'mid{middle_seconds:g}'
+
+    def _entry_paths(self, video_id: str, variant: str) -> tuple[str, str]:
+        name = hashlib.sha256(f"{video_id}|{variant}".encode('utf-8')).hexdigest()[:40]
+        return os.path.join(self.root, name), os.path.join(self.root, name + '.json')
+
+    def lookup(self, video_id: str, variant: str) -> tuple[str, dict] | None:
+        if not self.enabled:
+            return None
+        base, meta_path = self._entry_paths(video_id, variant)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+        path = os.path.join(self.root, entry['file'])
+        if time.time() - entry['created_at'] > self.ttl or not os.path.exists(path):
+            self._remove(meta_path, path)
+            return None
+        os.utime(path, None)
+        return path, entry['metadata']
+
+    def _store(self, video_id: str, variant: str, src_path: str, metadata: dict) -> str:
+        os.makedirs(self.root, exist_ok=True)
+        base, meta_path = self._entry_paths(video_id, variant)
+        path = base + os.path.splitext(src_path)[1]
+        RenderCache.materialize(src_path, path)
+        entry = {'file': os.path.basename(path), 'created_at': time.time(), 'video_id': video_id, 'metadata': metadata}
+        tmp_meta = meta_path + '.tmp'
+        with open(tmp_meta, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_meta, meta_path)
+        self._evict()
+        return path
+
+    @staticmethod
+    def _remove(*paths) -> None:
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _evict(self) -> None:
+        with self._lock:
+            media = []
+            total = 0
+            for entry in os.scandir(self.root):
+                if not entry.is_file() or entry.name.endswith(('.json', '.tmp')):
+                    continue
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    continue
+                media.append((st.st_mtime, st.st_size, entry.path))
+                total += st.st_size
+
+            media.sort()
+            for _, size, path in media:
+                if total <= self.budget:
+                    break
+                self._remove(path, os.path.splitext(path)[0] + '.json')
+                total -= size
+
+    def _download_into_cache(self, url: str, video_id: str, variant: str, middle_seconds: float | None) -> tuple[str, dict]:
+        staging = os.path.join(self.root, 'staging')
+        os.makedirs(staging, exist_ok=True)
+        path, metadata = self.downloader(url, staging, None, middle_seconds)
+        try:
+            cached = self._store(video_id, variant, path, metadata)
+        finally:
+            self._remove(path)
+        return cached, metadata
+
+    async def fetch(self, url: str, output_dir: str, middle_seconds: float | None = None) -> tuple[str, dict]:
+        """
+        Returns (path inside `output_dir`, metadata) for `url`, downloading at most once
+        per canonical id no matter how many callers ask concurrently.
+        """
+        if not self.enabled:
+            return await asyncio.to_thread(self.downloader, url, output_dir, None, middle_seconds)
+
+        video_id = await asyncio.to_thread(self.resolve_id, url)
+        variant = self._variant(middle_seconds)
+
+        # A full download also serves any partial request
+        hit = self.lookup(video_id, 'full') or self.lookup(video_id, variant)
+        if hit:
+            print(f"♻️ Download cache hit for {video_id}")
+            CACHE_LOOKUPS.inc(cache='download', result='hit')
+        else:
+            key = (video_id, variant)
+            task = self._inflight.get(key)
+            if task is None:
+                task = asyncio.create_task(
+                    asyncio.to_thread(self._download_into_cache, url, video_id, variant, middle_seconds)
+                )
+                self._inflight[key] = task
+                task.add_done_callback(lambda _: self._inflight.pop(key, None))
+                CACHE_LOOKUPS.inc(cache='download', result='miss')
+            else:
+                print(f"🔗 Joining in-flight download for {video_id}")
+                CACHE_LOOKUPS.inc(cache='download', result='joined')
+            # Shielded: a cancelled caller must not abort the download others are waiting on
+            hit = await asyncio.shield(task)
+
+        path, metadata = hit
+        os.makedirs(output_dir, exist_ok=True)
+        local_path = os.path.join(output_dir, os.path.basename(path))
+        RenderCache.materialize(path, local_path)
+        return local_path, dict(metadata)
+
+    async def metadata(self, url: str) -> dict:
+        """Metadata for `url`: taken from a cached download when there is one, otherwise fetched without the media."""
+        if self.enabled:
+            video_id = await asyncio.to_thread(self.resolve_id, url)
+            hit = self.lookup(video_id, 'full')
+            if hit:
+                return dict(hit[1])
+        return await asyncio.to_thread(self.metadata_fetcher, url)
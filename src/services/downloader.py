@@ -1,33 +1,128 @@
 import os
+import re
 import uuid
-import requests
-import yt_dlp
-from playwright.sync_api import sync_playwright
+from urllib.parse import urlparse
 from config import Config
+from services.browser_pool import BrowserPool, MOBILE_CONTEXT
+from services.http_fetch import HttpFetcher
+from services.metrics import FALLBACKS
+
+# Links that point straight at a media file skip yt-dlp/Playwright
+DIRECT_MEDIA_EXTENSIONS = ('.mp4', '.mov', '.m4v', '.webm', '.mkv')
 
 import imageio_ffmpeg
 
 class VideoDownloader:
             @staticmethod
-            def download_video(url: str) -> tuple[str, dict]:
+            def download_video(url: str, output_dir: str | None = None, window: tuple[float, float] | None = None,
+                               middle_seconds: float | None = None) -> tuple[str, dict]:
                 """
                 Downloads a video and returns (path, metadata).
+                Only part of the source is fetched when `window` (start, end in seconds) is given,
+                or when `middle_seconds` asks for the middle N seconds (the duration is probed first).
+                metadata['duration'] is always the original length; metadata['segment'] is the
+                fetched (start, end) range when only part was downloaded.
                 """
                 output_filename = f"{uuid.uuid4()}.mp4"
-                output_path = os.path.join(Config.TEMP_DIR, output_filename)
+                output_path = os.path.join(output_dir or Config.TEMP_DIR, output_filename)
                 
-                if "tiktok.com" in url:
+                if VideoDownloader.is_direct_media(url):
+                    return VideoDownloader._download_direct(url, output_path)
+                elif "tiktok.com" in url:
+                    # TikTok clips are short; the direct stream is always fetched whole
                     try:
                         return VideoDownloader._download_with_playwright(url, output_path)
                     except Exception as e:
                         print(f"⚠️ Playwright failed: {e}. Falling back to yt-dlp...")
-                        return VideoDownloader._download_with_ytdlp(url, output_path)
+                        FALLBACKS.inc(kind='playwright_ytdlp')
+                        return VideoDownloader._download_with_ytdlp(url, output_path, window, middle_seconds)
                 else:
-                    return VideoDownloader._download_with_ytdlp(url, output_path)
+                    return VideoDownloader._download_with_ytdlp(url, output_path, window, middle_seconds)
+
+            @staticmethod
+            def is_direct_media(url: str) -> bool:
+                return urlparse(url).path.lower().endswith(DIRECT_MEDIA_EXTENSIONS)
+
+            @staticmethod
+            def can_fetch_segment(url: str) -> bool:
+                """Whether `middle_seconds` can cut the download (yt-dlp links; TikTok and direct files come whole)."""
+                return not VideoDownloader.is_direct_media(url) and "tiktok.com" not in url
+
+            @staticmethod
+            def _download_direct(url: str, output_path: str) -> tuple[str, dict]:
+                print(f"⬇️ Downloading direct media URL...")
+                HttpFetcher.shared().fetch(url, output_path)
+                name = os.path.basename(urlparse(url).path)
+                metadata = {'title': name, 'description': 'N/A', 'uploader': 'N/A', 'tags': [], 'duration': None}
+                return output_path, metadata
+
+            @staticmethod
+            def middle_window(duration: float | None, seconds: float) -> tuple[float, float] | None:
+                """The middle `seconds` of a `duration`-long source, padded for keyframe-aligned cuts."""
+                if not duration:
+                    return None
+                padding = Config.SEGMENT_PADDING_SECONDS
+                if duration <= seconds + 2 * padding:
+                    return None
+                start = max(0.0, duration / 2 - seconds / 2 - padding)
+                return start, min(duration, start + seconds + 2 * padding)
         
             @staticmethod
-            def _download_with_ytdlp(url: str, output_path: str) -> tuple[str, dict]:
+            def fetch_metadata(url: str) -> dict:
+                """
+                Title/description/uploader/tags/duration without downloading the media.
+                Much faster than a download, so captioning can start while the file is still transferring.
+                """
+                if VideoDownloader.is_direct_media(url):
+                    name = os.path.basename(urlparse(url).path)
+                    return {'title': name, 'description': 'N/A', 'uploader': 'N/A', 'tags': [], 'duration': None}
+
+                # Imported on first use: yt-dlp's extractor registry is slow to load
+                import yt_dlp
+
+                ydl_opts = {'quiet': True, 'no_warnings': True, 'skip_download': True}
+                try:
+                    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                        return VideoDownloader._metadata_from_info(ydl.extract_info(url, download=False))
+                except Exception as e:
+                    if "tiktok.com" not in url:
+                        raise
+                    print(f"⚠️ yt-dlp metadata failed: {e}. Reading page meta tags...")
+                    FALLBACKS.inc(kind='ytdlp_metadata_scrape')
+                    return VideoDownloader._scrape_metadata(url)
+
+            @staticmethod
+            def _metadata_from_info(info: dict) -> dict:
+                return {
+                    'title': info.get('title', 'N/A'),
+                    'description': info.get('description', 'N/A'),
+                    'uploader': info.get('uploader', 'N/A'),
+                    'tags': info.get('tags', []),
+                    'duration': info.get('duration'),
+                }
+
+            @staticmethod
+            def _scrape_metadata(url: str) -> dict:
+                metadata = {'title': 'TikTok Video', 'description': 'N/A', 'uploader': 'N/A', 'tags': [], 'duration': None}
+
+                async def scrape(context):
+                    page = await context.new_page()
+                    await page.goto(url, timeout=60000, wait_until='domcontentloaded')
+                    metadata['title'] = await page.title()
+                    for selector in ('meta[property="og:description"]', 'meta[name="description"]'):
+                        desc = await page.query_selector(selector)
+                        if desc:
+                            metadata['description'] = await desc.get_attribute('content')
+                            break
+                    return metadata
+
+                return BrowserPool.shared().run(scrape, timeout=60)
+        
+            @staticmethod
+            def _download_with_ytdlp(url: str, output_path: str, window: tuple[float, float] | None = None,
+                                     middle_seconds: float | None = None) -> tuple[str, dict]:
                 print(f"⬇️ Downloading via yt-dlp...")
+                import yt_dlp
                 
                 # Setup ffmpeg: copy to temp dir as ffmpeg.exe to ensure yt-dlp finds it
                 import shutil
@@ -58,13 +153,20 @@ class VideoDownloader:
         
                 try:
                     with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                        info = ydl.extract_info(url, download=True)
-                        metadata = {
-                            'title': info.get('title', 'N/A'),
-                            'description': info.get('description', 'N/A'),
-                            'uploader': info.get('uploader', 'N/A'),
-                            'tags': info.get('tags', [])
-                        }
+                        if window is None and middle_seconds is None:
+                            info = ydl.extract_info(url, download=True)
+                        else:
+                            # Probe first, then download only the needed range from the same info
+                            info = ydl.extract_info(url, download=False)
+                            if window is None:
+                                window = VideoDownloader.middle_window(info.get('duration'), middle_seconds)
+                            if window is not None:
+                                print(f"✂️ Fetching segment {window[0]:.1f}s-{window[1]:.1f}s of {info.get('duration')}s")
+                                ydl.params['download_ranges'] = yt_dlp.utils.download_range_func(None, [window])
+                            info = ydl.process_ie_result(info, download=True)
+                        metadata = VideoDownloader._metadata_from_info(info)
+                        if window is not None:
+                            metadata['segment'] = window
                     
                     final_path = output_path
                     if not os.path.exists(final_path):
@@ -80,65 +182,53 @@ class VideoDownloader:
             @staticmethod
             def _download_with_playwright(url: str, output_path: str) -> tuple[str, dict]:
                 print(f"⬇️ Downloading via Playwright...")
-                metadata = {'title': 'TikTok Video', 'description': 'N/A', 'uploader': 'N/A', 'tags': []}
-                try:
-                    with sync_playwright() as p:
-                        browser = p.chromium.launch(
-                            headless=True, 
-                            args=[
-                                "--disable-blink-features=AutomationControlled",
-                                "--no-sandbox",
-                                "--disable-setuid-sandbox"
-                            ]
-                        )
-                        context = browser.new_context(
-                            user_agent='Mozilla/5.0 (iPhone; CPU iPhone OS 14_8 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/14.1.2 Mobile/15E148 Safari/604.1',
-                            viewport={'width': 375, 'height': 812}
-                        )
-                        page = context.new_page()
-                        page.goto(url, timeout=60000, wait_until='domcontentloaded')
-                        
-                        # Extract Metadata
-                        try:
-                            metadata['title'] = page.title()
-                            # Try to find description in meta tags
-                            desc = page.query_selector('meta[name="description"]')
-                            if desc:
-                                metadata['description'] = desc.get_attribute('content')
-                        except:
-                            pass
+                metadata = {'title': 'TikTok Video', 'description': 'N/A', 'uploader': 'N/A', 'tags': [], 'duration': None}
+
+                async def scrape(context):
+                    page = await context.new_page()
+                    await page.goto(url, timeout=60000, wait_until='domcontentloaded')
+                    
+                    # Extract Metadata
+                    try:
+                        metadata['title'] = await page.title()
+                        # Try to find description in meta tags
+                        desc = await page.query_selector('meta[name="description"]')
+                        if desc:
+                            metadata['description'] = await desc.get_attribute('content')
+                    except:
+                        pass
         
-                        # Find video
-                        video_url = None
-                        for _ in range(3):
-                            videos = page.query_selector_all('video')
-                            for v in videos:
-                                src = v.get_attribute('src')
-                                if src and src.startswith('http'):
-                                    video_url = src
-                                    break
-                            if video_url: break
-                            page.wait_for_timeout(2000)
-                        
-                        if not video_url:
-                            content = page.content()
-                            import re
-                            matches = re.search(r'"playAddr":"(https?://[^"]+)"', content)
-                            if matches:
-                                video_url = matches.group(1).encode('utf-8').decode('unicode_escape')
-                        
-                        if not video_url:
-                            raise Exception("Video URL not found.")
-                        
-                        # Download
-                        cookies = {c['name']: c['value'] for c in context.cookies()}
-                        headers = {'User-Agent': 'Mozilla/5.0...', 'Referer': 'https://www.tiktok.com/'}
-                        with requests.get(video_url, headers=headers, cookies=cookies, stream=True) as r:
-                            r.raise_for_status()
-                            with open(output_path, 'wb') as f:
-                                for chunk in r.iter_content(chunk_size=8192): f.write(chunk)
-                                    
-                        browser.close()
+                    # Find video
+                    video_url = None
+                    for _ in range(3):
+                        videos = await page.query_selector_all('video')
+                        for v in videos:
+                            src = await v.get_attribute('src')
+                            if src and src.startswith('http'):
+                                video_url = src
+                                break
+                        if video_url: break
+                        await page.wait_for_timeout(2000)
+                    
+                    if not video_url:
+                        content = await page.content()
+                        matches = re.search(r'"playAddr":"(https?://[^"]+)"', content)
+                        if matches:
+                            video_url = matches.group(1).encode('utf-8').decode('unicode_escape')
+                    
+                    if not video_url:
+                        raise Exception("Video URL not found.")
+
+                    cookies = {c['name']: c['value'] for c in await context.cookies()}
+                    return video_url, cookies
+
+                try:
+                    # The page is only held while scraping; the file itself is fetched outside the browser
+                    video_url, cookies = BrowserPool.shared().run(scrape, timeout=120)
+                    
+                    # Download with the same User-Agent the cookies were issued to
+                    headers = {'User-Agent': MOBILE_CONTEXT['user_agent'], 'Referer': 'https://www.tiktok.com/'}
+                    HttpFetcher.shared().fetch(video_url, output_path, headers=headers, cookies=cookies)
                         
                     return output_path, metadata
                 except Exception as e:
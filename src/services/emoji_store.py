@@ -0,0 +1,200 @@
+"""
+Local emoji sprites for Pilmoji, so overlays render offline and identically on every run.
+
+Sprites live in Config.EMOJI_DIR as <style>/<codepoints>.png and are fetched once with
+
+    python -m services.emoji_store --styles apple twitter
+
+which fetches the emojis listed in Config.EMOJI_PREFETCH_LIST (`--all` for every emoji).
+"""
+import os
+import sys
+import argparse
+import threading
+from io import BytesIO
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+from pilmoji.source import BaseSource, AppleEmojiSource, TwitterEmojiSource
+
+from config import Config
+from services.text_utils import emoji_pattern
+from services.metrics import FALLBACKS
+
+# Preferred style first; a style without the sprite falls through to the next
+DEFAULT_STYLES = ('apple', 'twitter')
+
+REMOTE_SOURCES = {
+    'apple': AppleEmojiSource,
+    'twitter': TwitterEmojiSource,
+}
+
+# Variation selector 16: present or not depending on where the text came from
+_VS16 = 0xFE0F
+
+# Seconds per sprite request (Pilmoji's own requests have no timeout)
+FETCH_TIMEOUT = 10
+# Fetched first by prefetch(); when even this fails the CDN is treated as unreachable
+_CANARY = '😀'
+
+
+def sprite_name(emoji: str) -> str:
+    """'❤️' -> '2764.png', '👍🏽' -> '1f44d-1f3fd.png' (VS16 dropped so both spellings share a file)."""
+    return '-'.join(f"{ord(c):x}" for c in emoji if ord(c) != _VS16) + '.png'
+
+
+class EmojiStore:
+    """Reads sprites from disk once and keeps their bytes in an LRU shared by every source."""
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, root: str | None = None, cache_size: int | None = None, remote_fill: bool | None = None):
+        self.root = root or Config.EMOJI_DIR
+        self.cache_size = Config.EMOJI_CACHE_SIZE if cache_size is None else cache_size
+        self.remote_fill = Config.EMOJI_REMOTE_FILL if remote_fill is None else remote_fill
+        self._sprites = OrderedDict()
+        self._remotes = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls) -> 'EmojiStore':
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def path(self, style: str, emoji: str) -> str:
+        return os.path.join(self.root, style, sprite_name(emoji))
+
+    def get(self, style: str, emoji: str) -> bytes | None:
+        """PNG bytes of the sprite, or None when this style has none (misses are remembered too)."""
+        key = (style, sprite_name(emoji))
+        with self._lock:
+            if key in self._sprites:
+                self._sprites.move_to_end(key)
+                return self._sprites[key]
+
+        data = self._read(style, emoji)
+        if data is None and self.remote_fill:
+            data = self.fetch(style, emoji)
+
+        with self._lock:
+            self._sprites[key] = data
+            while len(self._sprites) > self.cache_size:
+                self._sprites.popitem(last=False)
+        return data
+
+    def _read(self, style: str, emoji: str) -> bytes | None:
+        try:
+            with open(self.path(style, emoji), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def fetch(self, style: str, emoji: str) -> bytes | None:
+        """Downloads one sprite from the emoji CDN and saves it; None if the CDN has no image for it."""
+        with self._lock:
+            if style not in self._remotes:
+                remote = REMOTE_SOURCES[style]()
+                if getattr(remote, '_requests_session', None) is not None:
+                    remote.REQUEST_KWARGS = {**remote.REQUEST_KWARGS, 'timeout': FETCH_TIMEOUT}
+                self._remotes[style] = remote
+            remote = self._remotes[style]
+        try:
+            stream = remote.get_emoji(emoji)
+            data = stream.getvalue() if stream else b''
+            # The CDN answers unknown emojis with an error page rather than a status code
+            with Image.open(BytesIO(data)) as image:
+                image.verify()
+        except Exception:
+            return None
+
+        path = self.path(style, emoji)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return data
+
+
+class LocalEmojiSource(BaseSource):
+    """
+    Pilmoji source resolving each emoji against the local sprites, style by style
+    (Apple, then Twitter). Emojis without a sprite are drawn as plain text by Pilmoji.
+    """
+
+    def __init__(self, styles: tuple[str, ...] = DEFAULT_STYLES, store: EmojiStore | None = None):
+        self.styles = styles
+        self.store = store or EmojiStore.shared()
+
+    def get_emoji(self, emoji: str, /) -> BytesIO | None:
+        # Pilmoji may ask for the same emoji several times per overlay; fallbacks are counted in count_fallbacks()
+        for style in self.styles:
+            data = self.store.get(style, emoji)
+            if data:
+                return BytesIO(data)
+        return None
+
+    def get_discord_emoji(self, id: int, /) -> BytesIO | None:
+        return None
+
+    def fingerprint(self, text: str) -> tuple:
+        """Which style (or None) each emoji in `text` resolves to; part of the overlay cache key."""
+        return tuple(
+            (e, next((style for style in self.styles if self.store.get(style, e)), None))
+            for e in emoji_pattern().findall(text)
+        )
+
+    def count_fallbacks(self, text: str) -> None:
+        """Counts each emoji of `text` drawn in a fallback style (or as plain text), once per occurrence."""
+        for _, style in self.fingerprint(text):
+            if style != self.styles[0]:
+                FALLBACKS.inc(kind=f'emoji_{style}' if style else 'emoji_text')
+
+
+def prefetch(styles: tuple[str, ...], emojis, store: EmojiStore, workers: int = 4) -> dict:
+    """Downloads every sprite not on disk yet; returns {style: (fetched, missing)}."""
+    report = {}
+    for style in styles:
+        todo = sorted({sprite_name(e): e for e in emojis
+                       if not os.path.exists(store.path(style, e))}.values())
+        if todo and not os.path.exists(store.path(style, _CANARY)) and not store.fetch(style, _CANARY):
+            # Offline builder or CDN outage: don't wait out a timeout per sprite
+            report[style] = (0, len(todo))
+            print(f"⚠️ {style}: emoji CDN unreachable, {len(todo)} sprites not fetched")
+            continue
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(lambda e: store.fetch(style, e), todo))
+        fetched = sum(1 for data in results if data)
+        report[style] = (fetched, len(todo) - fetched)
+        print(f"😀 {style}: {fetched} sprites fetched, {len(todo) - fetched} unavailable")
+    return report
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Download emoji sprites for offline overlay rendering.")
+    parser.add_argument('--styles', nargs='+', default=list(DEFAULT_STYLES), choices=sorted(REMOTE_SOURCES))
+    parser.add_argument('--text', default=Config.EMOJI_PREFETCH_LIST, help="Fetch the emojis found in this file")
+    parser.add_argument('--all', action='store_true', help="Fetch every known emoji (~9k per style) instead")
+    parser.add_argument('--dir', default=Config.EMOJI_DIR, help="Sprite directory")
+    parser.add_argument('--workers', type=int, default=4, help="Parallel downloads")
+    args = parser.parse_args(argv)
+
+    if args.all:
+        import emoji
+        emojis = set(emoji.EMOJI_DATA)
+    else:
+        with open(args.text, 'r', encoding='utf-8') as f:
+            emojis = set(emoji_pattern().findall(f.read()))
+
+    store = EmojiStore(root=args.dir, remote_fill=False)
+    report = prefetch(tuple(args.styles), emojis, store, args.workers)
+    # Nothing fetched at all means the CDN was unreachable
+    return 1 if any(fetched == 0 and missing for fetched, missing in report.values()) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
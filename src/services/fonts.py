@@ -0,0 +1,85 @@
+import threading
+from collections import OrderedDict
+
+from PIL import ImageFont
+
+from config import Config
+
+
+class AdvanceTable:
+    """
+    Memoized advance widths for one loaded font.
+    Line widths are summed from cached word widths instead of re-measuring
+    every candidate string.
+    """
+
+    def __init__(self, font: ImageFont.FreeTypeFont, max_entries: int = 4096):
+        self.font = font
+        self.max_entries = max_entries
+        self._widths = OrderedDict()
+        self._lock = threading.Lock()
+        self.space_width = self.width(' ')
+
+    def width(self, text: str) -> float:
+        with self._lock:
+            cached = self._widths.get(text)
+            if cached is not None:
+                self._widths.move_to_end(text)
+                return cached
+
+        value = self.font.getlength(text)
+
+        with self._lock:
+            self._widths[text] = value
+            if len(self._widths) > self.max_entries:
+                self._widths.popitem(last=False)
+        return value
+
+    def line_width(self, words: list[str]) -> float:
+        if not words:
+            return 0.0
+        return sum(self.width(w) for w in words) + self.space_width * (len(words) - 1)
+
+
+class FontRegistry:
+    """
+    Process-wide LRU of FreeType fonts keyed on (path, size).
+    Each TTF/size pair is parsed once and shared by every render thread.
+    """
+
+    _entries = OrderedDict()
+    _lock = threading.Lock()
+    max_entries = Config.FONT_CACHE_SIZE
+
+    @classmethod
+    def _entry(cls, path: str, size: int) -> tuple:
+        key = (path, int(size))
+        with cls._lock:
+            entry = cls._entries.get(key)
+            if entry is not None:
+                cls._entries.move_to_end(key)
+                return entry
+
+        # Parse outside the lock; a duplicate load on a race is harmless.
+        font = ImageFont.truetype(path, int(size))
+        entry = (font, AdvanceTable(font))
+
+        with cls._lock:
+            entry = cls._entries.setdefault(key, entry)
+            cls._entries.move_to_end(key)
+            while len(cls._entries) > cls.max_entries:
+                cls._entries.popitem(last=False)
+        return entry
+
+    @classmethod
+    def get(cls, path: str, size: int) -> ImageFont.FreeTypeFont:
+        return cls._entry(path, size)[0]
+
+    @classmethod
+    def advances(cls, path: str, size: int) -> AdvanceTable:
+        return cls._entry(path, size)[1]
+
+    @classmethod
+    def clear(cls) -> None:
+        with cls._lock:
+            cls._entries.clear()
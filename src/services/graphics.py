@@ -1,7 +1,11 @@
 import os
+import re
+import json
 import textwrap
-from PIL import Image, ImageDraw, ImageFont, ImageFilter, ImageChops, features
-import numpy as np
+import threading
+import subprocess
+from collections import OrderedDict
+from PIL import Image, ImageDraw, ImageFilter, ImageChops, features
 
 # --- MONKEY PATCHES ---
 if not hasattr(Image, 'ANTIALIAS'):
@@ -13,27 +17,73 @@ try:
 except Exception:
     RAQM_SUPPORT = False
 
-from moviepy.editor import (
-    ImageClip,
-    CompositeVideoClip,
-    vfx,
-    VideoFileClip,
-    ColorClip
-)
 from config import Config
 from services.text_utils import TextUtils
+from services.fonts import FontRegistry
+from services.layout import TextLayout
+from services.render_cache import RenderCache
+from services.render_pool import RenderScheduler
+from services.metrics import FALLBACKS
 
 # --- PILMOJI IMPORTS (Smart Fallback Logic) ---
 try:
     from pilmoji import Pilmoji
-    from pilmoji.source import AppleEmojiSource, TwitterEmojiSource
+    from services.emoji_store import LocalEmojiSource
     PILMOJI_AVAILABLE = True
 except ImportError:
     PILMOJI_AVAILABLE = False
     print("Warning: pilmoji not installed. Emojis may not render correctly.")
 
+# Bump whenever the prepared-asset bundle layout changes
+ASSET_BUNDLE_VERSION = 1
+
+# Bump whenever the ffmpeg filter graph or encoder settings change,
+# so cached renders from the previous graph are not reused.
+FILTER_GRAPH_VERSION = 2
+
+# Encode settings per output kind. 'draft' is a quick low-res preview sent
+# before the full-quality 'final' render; it jumps the render queue.
+RENDER_PROFILES = {
+    'final': {
+        'size': (1080, 1920),
+        'preset': 'medium',
+        'rate_control': ['-b:v', '2500k'],
+        'priority': None,
+    },
+    'draft': {
+        'size': (540, 960),
+        'preset': 'ultrafast',
+        'rate_control': ['-crf', '30'],
+        'priority': 0,
+    },
+}
+
+# Colour/texture grading shared by every layout, applied after its geometry
+GRADE_FILTERS = (
+    "eq=gamma=1.03:saturation=1.05:contrast=1.02,"
+    "noise=alls=1.5:allf=t,"
+    "vignette=PI/20,"
+    "unsharp=3:3:0.5"
+)
+
+AUDIO_FILTERS = (
+    "atempo=1.05,"
+    "volume=0.98,"
+    "highpass=f=15,"
+    "lowpass=f=19000"
+)
+
 class GraphicsEngine:
-    def __init__(self):
+    # Length of the window 'lower' layout cuts from the middle of the source
+    LOWER_CLIP_SECONDS = 5
+
+    # Text drop shadow: blur radius and offset in pixels
+    SHADOW_BLUR = 3
+    SHADOW_OFFSET = 3
+    # Room above/below the laid-out text for strokes, emoji offsets and the shadow
+    TEXT_BAND_PADDING = 64
+
+    def __init__(self, scheduler: RenderScheduler | None = None):
         try:
             print(f"[INFO] PIL Raqm support: {RAQM_SUPPORT}")
         except Exception as e:
@@ -44,6 +94,8 @@ class GraphicsEngine:
         self.sign_height = 400    
         
         self._load_assets()
+        self.render_cache = RenderCache()
+        self.scheduler = scheduler or RenderScheduler.shared()
 
     def _load_assets(self):
         overlay_path = getattr(Config, "READY_OVERLAY_PATH", os.path.join(Config.ASSETS_DIR, "overlay_template.png"))
@@ -52,110 +104,170 @@ class GraphicsEngine:
         if not os.path.exists(overlay_path):
              print(f"[WARN] Overlay template not found. Using fallback.")
              overlay_path = Config.WOOD_IMAGE_PATH
-        
-        self.overlay_base = Image.open(overlay_path).convert("RGBA")
-        
-        target_width = Config.VIDEO_SIZE[0]
-        if self.overlay_base.width != target_width:
-            aspect_ratio = self.overlay_base.height / self.overlay_base.width
-            new_height = int(target_width * aspect_ratio)
-            self.overlay_base = self.overlay_base.resize((target_width, new_height), Image.Resampling.LANCZOS)
+
+        # The decoded + resized template is kept in a bundle, valid while the source files are unchanged
+        bundle_key = RenderCache.key(
+            ASSET_BUNDLE_VERSION,
+            Config.VIDEO_SIZE[0],
+            *(self._file_signature(path) for path in (overlay_path, Config.FONT_BOLD, Config.FONT_REGULAR)),
+        )
+        if not self._load_bundle(bundle_key):
+            self.overlay_base = Image.open(overlay_path).convert("RGBA")
+            
+            target_width = Config.VIDEO_SIZE[0]
+            if self.overlay_base.width != target_width:
+                aspect_ratio = self.overlay_base.height / self.overlay_base.width
+                new_height = int(target_width * aspect_ratio)
+                self.overlay_base = self.overlay_base.resize((target_width, new_height), Image.Resampling.LANCZOS)
+
+            # Identifies the template/font combination in overlay cache keys
+            self.asset_digest = RenderCache.key(
+                RenderCache.file_digest(overlay_path),
+                RenderCache.file_digest(Config.FONT_BOLD),
+                RenderCache.file_digest(Config.FONT_REGULAR),
+            )
+            self._save_bundle(bundle_key)
             
         self.overlay_height = self.overlay_base.height
 
         try:
-            self.title_font = ImageFont.truetype(Config.FONT_BOLD, 105) 
-            self.body_font = ImageFont.truetype(Config.FONT_REGULAR, 60)
+            self.title_font = FontRegistry.get(Config.FONT_BOLD, 105)
+            self.body_font = FontRegistry.get(Config.FONT_REGULAR, 60)
         except OSError as e:
             raise FileNotFoundError(f"Fonts not found: {e}")
 
-    def _create_overlay(self, headline: str, body: str) -> str:
+    @staticmethod
+    def _file_signature(path: str) -> str:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return f"{path}:missing"
+        return f"{os.path.abspath(path)}:{st.st_size}:{st.st_mtime_ns}"
+
+    def _load_bundle(self, bundle_key: str) -> bool:
+        """Bundle file: one JSON header line, then the template's raw RGBA pixels."""
+        try:
+            with open(Config.ASSET_BUNDLE_PATH, 'rb') as f:
+                header = json.loads(f.readline())
+                if header.get('key') != bundle_key:
+                    return False
+                pixels = f.read()
+            self.overlay_base = Image.frombytes('RGBA', tuple(header['size']), pixels)
+        except (OSError, ValueError, KeyError):
+            return False
+        self.asset_digest = header['asset_digest']
+        print("[INFO] Loaded prepared assets from bundle.")
+        return True
+
+    def _save_bundle(self, bundle_key: str) -> None:
+        header = {'key': bundle_key, 'size': list(self.overlay_base.size), 'asset_digest': self.asset_digest}
+        tmp_path = f"{Config.ASSET_BUNDLE_PATH}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(Config.ASSET_BUNDLE_PATH), exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                f.write(json.dumps(header).encode('utf-8') + b"\n")
+                f.write(self.overlay_base.tobytes())
+            os.replace(tmp_path, Config.ASSET_BUNDLE_PATH)
+        except OSError as e:
+            print(f"[WARN] Could not write asset bundle: {e}")
+
+    # (path, size, mtime) -> duration in seconds, shared by every engine
+    _durations = OrderedDict()
+    _durations_lock = threading.Lock()
+
+    @classmethod
+    def probe_duration(cls, input_path: str) -> float:
+        """
+        Returns the container duration of `input_path`.
+        Results are memoized per file version, so repeated renders of the same
+        source don't spawn another probe process. Falls back to parsing
+        `ffmpeg -i` when ffprobe isn't installed.
+        """
+        st = os.stat(input_path)
+        key = (os.path.abspath(input_path), st.st_size, st.st_mtime_ns)
+        with cls._durations_lock:
+            if key in cls._durations:
+                cls._durations.move_to_end(key)
+                return cls._durations[key]
+
+        try:
+            cmd = [
+                'ffprobe',
+                '-v', 'error',
+                '-show_entries', 'format=duration',
+                '-of', 'default=noprint_wrappers=1:nokey=1',
+                input_path
+            ]
+            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+            duration = float(result.stdout)
+        except FileNotFoundError:
+            import imageio_ffmpeg
+            result = subprocess.run([imageio_ffmpeg.get_ffmpeg_exe(), '-hide_banner', '-i', input_path],
+                                    stdin=subprocess.DEVNULL, capture_output=True, text=True)
+            match = re.search(r"Duration:\s*(\d+):(\d+):(\d+(?:\.\d+)?)", result.stderr)
+            if not match:
+                raise ValueError(f"Could not read duration of {input_path}")
+            hours, minutes, seconds = match.groups()
+            duration = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+        with cls._durations_lock:
+            cls._durations[key] = duration
+            while len(cls._durations) > 256:
+                cls._durations.popitem(last=False)
+        return duration
+
+    def _overlay_key(self, headline: str, body: str) -> str:
+        emojis = LocalEmojiSource().fingerprint(headline + body) if PILMOJI_AVAILABLE else ()
+        return RenderCache.key(self.asset_digest, self.text_start_y, self.sign_height, headline, body, emojis)
+
+    def _create_overlay(self, headline: str, body: str, work_dir: str | None = None, filename: str = "overlay.png") -> str:
+        overlay_path = os.path.join(work_dir or Config.TEMP_DIR, filename)
+        overlay_key = self._overlay_key(headline, body)
+
+        cached = self.render_cache.get('overlays', overlay_key)
+        if cached:
+            print("[INFO] Overlay cache hit.")
+            return RenderCache.materialize(cached, overlay_path)
+
         canvas = self.overlay_base.copy()
-        text_layer = Image.new('RGBA', canvas.size, (0, 0, 0, 0))
-        
-        # Initialize Pilmoji with APPLE source
-        if PILMOJI_AVAILABLE:
-            text_pilmoji = Pilmoji(text_layer, source=AppleEmojiSource)
-        else:
-            text_pilmoji = None
-            
         center_x = canvas.width // 2
         safe_width = int(canvas.width * 0.8)
         sign_y = self.text_start_y
         
         # --- HEADLINE PREP ---
-        title_font = self.title_font
-        
-        headline_processed = TextUtils.process_hebrew(headline, reorder_content=not RAQM_SUPPORT)
-        
-        while title_font.getlength(headline_processed) > safe_width and title_font.size > 40:
-            title_font = ImageFont.truetype(Config.FONT_BOLD, title_font.size - 5)
+        layout = TextLayout(reorder_content=not RAQM_SUPPORT)
+        title_font, headline_processed = layout.fit_headline(
+            headline, Config.FONT_BOLD, max_size=self.title_font.size, min_size=40, step=5, max_width=safe_width
+        )
             
         headline_pos = (center_x, sign_y + 80) 
         
         # --- BODY PREP ---
-        def wrap_paragraph(text, font, max_width):
-            lines = []
-            words = text.split()
-            current_line = []
-            for word in words:
-                test_line_words = current_line + [word]
-                raw_test_line = ' '.join(test_line_words)
-                
-                test_line_visual = TextUtils.process_hebrew(raw_test_line, reorder_content=not RAQM_SUPPORT)
-                
-                if font.getlength(test_line_visual) <= max_width:
-                    current_line.append(word)
-                else:
-                    if current_line:
-                        lines.append(' '.join(current_line))
-                        current_line = [word]
-                    else:
-                        lines.append(word)
-                        current_line = []
-            if current_line:
-                lines.append(' '.join(current_line))
-            return lines
-
-        def process_body_text(body_text, font, max_width):
-            paragraphs = body_text.split('\n')
-            final_lines = []
-            for p in paragraphs:
-                if not p.strip():
-                    final_lines.append("") 
-                    continue
-                wrapped = wrap_paragraph(p, font, max_width)
-                final_lines.extend(wrapped)
-            return final_lines
-
         body_start_y = sign_y + 150
         max_body_y = sign_y + self.sign_height - 45 
         max_available_height = max_body_y - body_start_y
         
-        current_body_size = 60
-        min_body_size = 25
-        final_body_font = None
-        final_body_lines = []
-        
-        while current_body_size >= min_body_size:
-            temp_font = ImageFont.truetype(Config.FONT_REGULAR, current_body_size)
-            lines = process_body_text(body, temp_font, safe_width)
-            
-            ascent, descent = temp_font.getmetrics()
-            line_height = ascent + descent + 4 
-            total_height = len(lines) * line_height
-            
-            if total_height <= max_available_height or current_body_size == min_body_size:
-                final_body_font = temp_font
-                final_body_lines = lines
-                break
-            current_body_size -= 2
-            
-        if final_body_font is None:
-            final_body_font = ImageFont.truetype(Config.FONT_REGULAR, min_body_size)
-            final_body_lines = process_body_text(body, final_body_font, safe_width)
+        final_body_font, final_body_lines = layout.fit_body(
+            body, Config.FONT_REGULAR, max_size=60, min_size=25, step=2,
+            max_width=safe_width, max_height=max_available_height
+        )
+        line_height = TextLayout.line_height(final_body_font)
+
+        # Text is drawn on a full-width band around the laid-out lines instead of the whole canvas
+        band_top = max(0, min(headline_pos[1] - title_font.size, body_start_y) - self.TEXT_BAND_PADDING)
+        band_bottom = min(canvas.height, max(headline_pos[1] + title_font.size,
+                                             body_start_y + line_height * len(final_body_lines)) + self.TEXT_BAND_PADDING)
+        text_layer = Image.new('RGBA', (canvas.width, band_bottom - band_top), (0, 0, 0, 0))
+
+        # One Pilmoji for every line; each emoji resolves against the local Apple, then Twitter sprites
+        if PILMOJI_AVAILABLE:
+            emoji_source = LocalEmojiSource()
+            emoji_source.count_fallbacks(headline + body)
+            text_pilmoji = Pilmoji(text_layer, source=emoji_source)
+        else:
+            text_pilmoji = None
 
-        # --- DRAWING (Apple -> Twitter Fallback) ---
+        # --- DRAWING (Apple -> Twitter -> plain text) ---
         def draw_centered(manager, layer, position, text, font, fill, stroke_width, stroke_fill):
             if PILMOJI_AVAILABLE and manager:
                 try:
@@ -164,172 +276,326 @@ class GraphicsEngine:
                     start_y = position[1] - (h // 2) + 5 
                     manager.text((start_x, start_y), text, font=font, fill=fill, 
                                  stroke_width=stroke_width, stroke_fill=stroke_fill)
+                    return
                 except Exception as e:
-                    print(f"🍎 Apple Emoji failed for '{text}'. Switching to Twitter.")
-                    try:
-                        with Pilmoji(layer, source=TwitterEmojiSource) as fallback_manager:
-                            w, h = fallback_manager.getsize(text, font=font)
-                            start_x = position[0] - (w // 2)
-                            start_y = position[1] - (h // 2) + 5
-                            fallback_manager.text((start_x, start_y), text, font=font, fill=fill, 
-                                                  stroke_width=stroke_width, stroke_fill=stroke_fill)
-                    except Exception as e2:
-                        d = ImageDraw.Draw(layer)
-                        d.text(position, text, font=font, fill=fill, anchor="mm", 
-                               stroke_width=stroke_width, stroke_fill=stroke_fill)
-            else:
-                d = ImageDraw.Draw(layer)
-                d.text(position, text, font=font, fill=fill, anchor="mm", 
-                       stroke_width=stroke_width, stroke_fill=stroke_fill)
-
-        draw_centered(text_pilmoji, text_layer, headline_pos, headline_processed, title_font, "white", 3, "black")
+                    print(f"[WARN] Emoji rendering failed for '{text}': {e}. Drawing plain text.")
+                    FALLBACKS.inc(kind='emoji_draw_error')
+            d = ImageDraw.Draw(layer)
+            d.text(position, text, font=font, fill=fill, anchor="mm", 
+                   stroke_width=stroke_width, stroke_fill=stroke_fill)
+
+        draw_centered(text_pilmoji, text_layer, (headline_pos[0], headline_pos[1] - band_top),
+                      headline_processed, title_font, "white", 3, "black")
         
-        current_y = body_start_y
-        ascent, descent = final_body_font.getmetrics()
-        line_height = ascent + descent + 4
+        current_y = body_start_y - band_top
         
-        for line in final_body_lines:
-             processed_line = TextUtils.process_hebrew(line, reorder_content=not RAQM_SUPPORT)
-             
+        processed_lines = TextUtils.process_hebrew_lines(final_body_lines, reorder_content=not RAQM_SUPPORT)
+        for processed_line in processed_lines:
              line_center_y = int(current_y + line_height/2)
              pos = (center_x, line_center_y)
              draw_centered(text_pilmoji, text_layer, pos, processed_line, final_body_font, "#f0f0f0", 3, "black")
              current_y += line_height
 
-        def make_shadow(layer, blur_radius):
-            if layer.getbbox():
-                alpha = layer.split()[3]
-                shadow = Image.new("RGBA", canvas.size, (0, 0, 0, 0))
-                shadow.paste((0, 0, 0, 255), (0, 0), mask=alpha)
-                return shadow.filter(ImageFilter.GaussianBlur(radius=blur_radius))
-            return None
-
-        text_shadow = make_shadow(text_layer, blur_radius=3)
-        if text_shadow:
-            canvas.paste(text_shadow, (3, 3), text_shadow)
-        canvas.paste(text_layer, (0, 0), text_layer)
+        self._composite_text(canvas, text_layer, (0, band_top))
         
-        overlay_path = os.path.join(Config.TEMP_DIR, "overlay.png")
-        canvas.save(overlay_path)
+        # Unlink first: the previous file may be a hard link into the cache
+        if os.path.exists(overlay_path):
+            os.remove(overlay_path)
+        # Lossless either way; the overlay is read once by the local ffmpeg, so favour speed over size
+        canvas.save(overlay_path, compress_level=1)
+        self.render_cache.put('overlays', overlay_key, overlay_path)
         return overlay_path
 
-    def render_video(self, input_path: str, headline: str, body: str, layout_mode: str = 'lower', progress_callback=None) -> str:
+    @classmethod
+    def _composite_text(cls, canvas: Image.Image, text_layer: Image.Image, origin: tuple[int, int] = (0, 0)) -> None:
+        """
+        Pastes `text_layer` (placed at `origin` on `canvas`) with its blurred drop shadow.
+        Only the text's bounding box plus the blur's reach is processed; the shadow is
+        (0, 0, 0, blur(alpha)), exactly what blurring a full-canvas shadow layer gives.
+        """
+        bbox = text_layer.getbbox()
+        if not bbox:
+            return
+        # Wider than the support of PIL's 3-pass box-blur approximation. Clamped at the
+        # layer edges, where both versions replicate the (transparent) edge pixels.
+        margin = 4 * cls.SHADOW_BLUR + 2
+        box = (
+            max(0, bbox[0] - margin),
+            max(0, bbox[1] - margin),
+            min(text_layer.width, bbox[2] + margin),
+            min(text_layer.height, bbox[3] + margin),
+        )
+        region = text_layer.crop(box)
+        blurred_alpha = region.getchannel('A').filter(ImageFilter.GaussianBlur(radius=cls.SHADOW_BLUR))
+        black = Image.new('L', region.size, 0)
+        shadow = Image.merge('RGBA', (black, black, black, blurred_alpha))
+
+        x, y = origin[0] + box[0], origin[1] + box[1]
+        canvas.paste(shadow, (x + cls.SHADOW_OFFSET, y + cls.SHADOW_OFFSET), shadow)
+        canvas.paste(region, (x, y), region)
+
+    def prepare_overlay(self, headline: str, body: str, work_dir: str | None = None) -> str:
+        """Builds the sign overlay ahead of the render (it only needs the text, not the video)."""
+        return self._create_overlay(headline, body, work_dir=work_dir)
+
+    def render_video(self, input_path: str, headline: str, body: str, layout_mode: str = 'lower', progress_callback=None,
+                     work_dir: str | None = None, priority: int | None = None, profile: str = 'final',
+                     cancel_event: threading.Event | None = None, overlay_path: str | None = None,
+                     on_start=None) -> str:
         """
         Renders the final video using FFmpeg with advanced Anti-Detection filters.
+        When `work_dir` is given, the overlay and output are written there instead of the shared dirs.
+        The encode runs on the shared render pool; a lower `priority` value is scheduled first.
+        `profile` selects a RENDER_PROFILES entry ('draft' is a fast low-res preview).
+        Setting `cancel_event` stops the encode and raises RenderCancelled.
+        `overlay_path` reuses an overlay from prepare_overlay() for the same text.
+        `progress_callback(progress)` receives out_time/fps/speed plus percent and eta
+        (seconds) while ffmpeg runs; it is called from a render worker thread.
+        `on_start(ticket)` runs on the render worker right before ffmpeg starts (see RenderScheduler.submit).
         """
-        import subprocess
-        import json
-        import imageio_ffmpeg
-        
-        ffmpeg_exe = imageio_ffmpeg.get_ffmpeg_exe()
+        print(f"[INFO] Rendering video ({layout_mode}, {profile})...")
+
+        output_filename = f"{profile}_{os.path.basename(input_path)}"
+        variant = {
+            'layout': layout_mode,
+            'headline': headline,
+            'body': body,
+            'overlay_path': overlay_path,
+            'output_path': os.path.join(work_dir or Config.OUTPUT_DIR, output_filename),
+        }
+        return self._render(input_path, [variant], work_dir, profile, priority, progress_callback, cancel_event,
+                            on_start)[0]
+
+    def render_variants(self, input_path: str, variants: list[tuple[str, str, str]], progress_callback=None,
+                        work_dir: str | None = None, priority: int | None = None, profile: str = 'final',
+                        cancel_event: threading.Event | None = None, on_start=None) -> list[str]:
+        """
+        Renders several (layout_mode, headline, body) variants of one input in a single ffmpeg run.
+        The source is decoded once; variants sharing a layout also share its geometry and
+        grading chain, which is then split into one overlay + encode branch per variant.
+        Returns the output paths in the order of `variants`. Other arguments as in render_video.
+        """
+        print(f"[INFO] Rendering {len(variants)} variants ({profile})...")
 
-        print(f"[INFO] Rendering video ({layout_mode})...")
-        
-        overlay_path = self._create_overlay(headline, body)
-        
         base_name = os.path.basename(input_path)
-        output_filename = f"final_{base_name}"
-        output_path = os.path.join(Config.OUTPUT_DIR, output_filename)
+        prepared = [
+            {
+                'layout': layout_mode,
+                'headline': headline,
+                'body': body,
+                'overlay_path': None,
+                'output_path': os.path.join(work_dir or Config.OUTPUT_DIR, f"{profile}_{i}_{layout_mode}_{base_name}"),
+            }
+            for i, (layout_mode, headline, body) in enumerate(variants)
+        ]
+        return self._render(input_path, prepared, work_dir, profile, priority, progress_callback, cancel_event,
+                            on_start)
 
-        if layout_mode == 'lower':
-            try:
-                # Get video duration
-                cmd = [
-                    'ffprobe',
-                    '-v', 'error',
-                    '-show_entries', 'format=duration',
-                    '-of', 'default=noprint_wrappers=1:nokey=1',
-                    input_path
-                ]
-                result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-                duration = float(result.stdout)
-                
-                # Calculate the middle of the video
-                clip_duration = 5 # seconds
-                start_time = max(0, (duration / 2) - (clip_duration / 2))
-
-                # Calculate shift: Middle of (Screen Bottom + Banner Bottom) - Middle of Screen
-                shift_y = int((self.text_start_y + self.sign_height) / 2)
-                
-                video_filters = (
-                    f"trim=start={start_time}:duration={clip_duration},setpts=PTS-STARTPTS,"
-                    "scale=1080:1920:force_original_aspect_ratio=increase,"
-                    "crop=1080:1920:(iw-ow)/2:(ih-oh)/2,"
-                    "eq=gamma=1.03:saturation=1.05:contrast=1.02,"
-                    "noise=alls=1.5:allf=t,"
-                    "vignette=PI/20,"
-                    "unsharp=3:3:0.5"
-                )
-            except (subprocess.CalledProcessError, FileNotFoundError):
-                 video_filters = (
-                    "setpts=PTS/1.05,"
-                    "crop=in_w*0.96:in_h*0.96,"
-                    "scale=1080:1920,"
-                    "eq=gamma=1.03:saturation=1.05:contrast=1.02,"
-                    "noise=alls=1.5:allf=t,"
-                    "vignette=PI/20,"
-                    "unsharp=3:3:0.5"
-                )
-        else:
-            shift_y = 0
-            video_filters = (
-                "setpts=PTS/1.05,"
-                "crop=in_w*0.96:in_h*0.96,"
-                "scale=1080:1920,"
-                "eq=gamma=1.03:saturation=1.05:contrast=1.02,"
-                "noise=alls=1.5:allf=t,"
-                "vignette=PI/20,"
-                "unsharp=3:3:0.5"
+    def _layout_source(self, input_path: str, layout_mode: str, out_w: int, out_h: int):
+        """
+        How a layout reads the source: (window, geometry filters, expected output seconds).
+        `window` is the (start, length) cut for 'lower', or None when the whole clip is used.
+        """
+        try:
+            # Memoized per file
+            duration = self.probe_duration(input_path)
+        except (subprocess.CalledProcessError, FileNotFoundError, ValueError):
+            duration = None
+
+        if layout_mode == 'lower' and duration is not None:
+            # The middle LOWER_CLIP_SECONDS of the video
+            clip_duration = self.LOWER_CLIP_SECONDS
+            start_time = max(0, (duration / 2) - (clip_duration / 2))
+            geometry = (
+                f"scale={out_w}:{out_h}:force_original_aspect_ratio=increase,"
+                f"crop={out_w}:{out_h}:(iw-ow)/2:(ih-oh)/2"
             )
-        
-        audio_filters = (
-            "atempo=1.05,"
-            "volume=0.98,"
-            "highpass=f=15,"
-            "lowpass=f=19000"
+            return (start_time, clip_duration), geometry, min(clip_duration, max(0.0, duration - start_time))
+
+        geometry = (
+            "setpts=PTS/1.05,"
+            "crop=in_w*0.96:in_h*0.96,"
+            f"scale={out_w}:{out_h}"
         )
-        
-        # Apply shift only for 'lower' mode logic (which is captured by shift_y > 0 if derived from layout)
-        # However, layout_mode determines shift. 
-        # Re-evaluating shift based on mode for clarity in main_transform construction
+        # setpts=PTS/1.05 speeds the whole clip up
+        return None, geometry, (duration / 1.05 if duration else None)
+
+    @staticmethod
+    def _fan_out(graph: list[str], label: str, split_filter: str, prefix: str, count: int) -> list[str]:
+        """Splits `label` into `count` branches (no-op for one) and returns their labels."""
+        if count == 1:
+            return [label]
+        labels = [f"[{prefix}{n}]" for n in range(count)]
+        graph.append(f"{label}{split_filter}={count}{''.join(labels)}")
+        return labels
+
+    def _compose_filters(self, source: str, overlay_label: str, out_label: str, layout_mode: str,
+                         out_w: int, out_h: int, px, tag: str) -> str:
+        mask_h = px(self.text_start_y + 70)
+
+        # 'lower' pushes the video down: Middle of (Screen Bottom + Banner Bottom) - Middle of Screen
         if layout_mode == 'lower':
-             shift_val = int((self.text_start_y + self.sign_height) / 2)
-             main_transform = f"pad=1080:{1920+shift_val}:0:{shift_val}:black,crop=1080:1920:0:0,"
+             shift_val = px(int((self.text_start_y + self.sign_height) / 2))
+             main_transform = f"pad={out_w}:{out_h + shift_val}:0:{shift_val}:black,crop={out_w}:{out_h}:0:0,"
         else:
              main_transform = ""
 
+        return (
+            f"{source}split[v_to_main{tag}][v_copy{tag}];" +
+            f"[v_to_main{tag}]{main_transform}drawbox=0:0:{out_w}:{mask_h}:color=black:t=fill[v_masked{tag}];" +
+            f"[v_copy{tag}]crop={out_w}:{mask_h}:0:(in_h-{mask_h})/2+{px(300)},format=rgba,colorchannelmixer=aa=0.25[v_filler{tag}];" +
+            f"[v_masked{tag}][v_filler{tag}]overlay=0:0[v_staged{tag}];" +
+            f"[v_staged{tag}]{overlay_label}overlay=(main_w-overlay_w)/2:(main_h-overlay_h)/2{out_label}"
+        )
+
+    def _render(self, input_path: str, variants: list[dict], work_dir: str | None, profile: str,
+                priority: int | None, progress_callback, cancel_event: threading.Event | None,
+                on_start=None) -> list[str]:
+        import imageio_ffmpeg
+
+        ffmpeg_exe = imageio_ffmpeg.get_ffmpeg_exe()
+        settings = RENDER_PROFILES[profile]
+        if priority is None:
+            priority = settings['priority']
+
+        pending = []
+        input_digest = RenderCache.file_digest(input_path) if self.render_cache.enabled else None
+        for variant in variants:
+            variant['cache_key'] = None
+            if input_digest:
+                variant['cache_key'] = RenderCache.key(
+                    input_digest,
+                    self._overlay_key(variant['headline'], variant['body']),
+                    variant['layout'],
+                    profile,
+                    FILTER_GRAPH_VERSION,
+                )
+                cached = self.render_cache.get('videos', variant['cache_key'])
+                if cached:
+                    print("[INFO] Render cache hit, skipping encode.")
+                    RenderCache.materialize(cached, variant['output_path'])
+                    continue
+            pending.append(variant)
+        if not pending:
+            return [variant['output_path'] for variant in variants]
+
+        # One overlay (and ffmpeg input) per distinct text
+        overlays = {}
+        for variant in pending:
+            if variant['overlay_path'] is None:
+                overlay_key = self._overlay_key(variant['headline'], variant['body'])
+                if overlay_key not in overlays:
+                    filename = "overlay.png" if len(pending) == 1 else f"overlay_{len(overlays)}.png"
+                    overlays[overlay_key] = self._create_overlay(variant['headline'], variant['body'],
+                                                                 work_dir=work_dir, filename=filename)
+                variant['overlay_path'] = overlays[overlay_key]
+            # Unlink first: the previous file may be a hard link into the cache
+            if os.path.exists(variant['output_path']):
+                os.remove(variant['output_path'])
+
+        # All pixel constants below are laid out for VIDEO_SIZE and scaled to the profile
+        out_w, out_h = settings['size']
+        scale = out_w / Config.VIDEO_SIZE[0]
+
+        def px(value):
+            return int(value * scale)
+
+        # Variants whose layout reads the source the same way share its filter chain
+        groups = OrderedDict()
+        for n, variant in enumerate(pending):
+            window, geometry, expected = self._layout_source(input_path, variant['layout'], out_w, out_h)
+            groups.setdefault((window, geometry), {'expected': expected, 'members': []})['members'].append(n)
+        expected_duration = max((g['expected'] for g in groups.values() if g['expected']), default=None)
+
+        input_args = ['-i', input_path]
+        seek_input = len(groups) == 1 and next(iter(groups))[0] is not None
+        if seek_input:
+            # Input-side seek: ffmpeg jumps to the keyframe before the window and
+            # decodes only from there (accurate_seek drops frames up to the exact
+            # start). -t bounds both the video and audio streams.
+            start_time, clip_duration = next(iter(groups))[0]
+            input_args = ['-ss', f"{start_time:.3f}", '-t', str(clip_duration), '-i', input_path]
+
+        graph = []
+        video_sources = self._fan_out(graph, "[0:v]", "split", "v_src", len(groups))
+        audio_sources = self._fan_out(graph, "[0:a]", "asplit", "a_src", len(groups))
+        video_branches, audio_branches = {}, {}
+        for g, ((window, geometry), group) in enumerate(groups.items()):
+            trim = atrim = ""
+            if window is not None and not seek_input:
+                # Mixed layouts decode the whole source once; 'lower' cuts its window in the graph
+                start_time, clip_duration = window
+                trim = f"trim=start={start_time:.3f}:duration={clip_duration},setpts=PTS-STARTPTS,"
+                atrim = f"atrim=start={start_time:.3f}:duration={clip_duration},asetpts=PTS-STARTPTS,"
+            graph.append(f"{video_sources[g]}{trim}{geometry},{GRADE_FILTERS}[v_proc{g}]")
+            graph.append(f"{audio_sources[g]}{atrim}{AUDIO_FILTERS}[a_proc{g}]")
+
+            members = group['members']
+            video_labels = self._fan_out(graph, f"[v_proc{g}]", "split", f"v_proc{g}_", len(members))
+            audio_labels = self._fan_out(graph, f"[a_proc{g}]", "asplit", f"a_proc{g}_", len(members))
+            for n, video_label, audio_label in zip(members, video_labels, audio_labels):
+                video_branches[n], audio_branches[n] = video_label, audio_label
+
+        overlay_inputs = []
+        outputs = []
+        for n, variant in enumerate(pending):
+            if variant['overlay_path'] not in overlay_inputs:
+                overlay_inputs.append(variant['overlay_path'])
+            overlay_label = f"[{overlay_inputs.index(variant['overlay_path']) + 1}:v]"
+            # The overlay PNG is drawn at VIDEO_SIZE width
+            if scale != 1:
+                graph.append(f"{overlay_label}scale={out_w}:-1[ovl{n}]")
+                overlay_label = f"[ovl{n}]"
+            graph.append(self._compose_filters(video_branches[n], overlay_label, f"[out{n}]",
+                                               variant['layout'], out_w, out_h, px, str(n)))
+            outputs += [
+                '-map', f"[out{n}]",
+                '-map', audio_branches[n],
+                '-c:v', 'libx264',
+                '-c:a', 'aac',
+                '-preset', settings['preset'],
+                *settings['rate_control'],
+                '-pix_fmt', 'yuv420p',
+                '-movflags', '+faststart',
+                '-map_metadata', '-1',
+                '-threads', RenderScheduler.THREADS,
+                variant['output_path'],
+            ]
+
         ffmpeg_cmd = [
             ffmpeg_exe,
-            '-i', input_path,
-            '-i', overlay_path,
-            '-filter_complex',
-            f"[0:v]{video_filters}[v_proc];" +
-            f"[0:a]{audio_filters}[a_proc];" +
-            f"[v_proc]split[v_to_main][v_copy];" +
-            f"[v_to_main]{main_transform}drawbox=0:0:1080:{self.text_start_y + 70}:color=black:t=fill[v_masked];" +
-            f"[v_copy]crop=1080:{self.text_start_y + 70}:0:(in_h-{self.text_start_y + 70})/2+300,format=rgba,colorchannelmixer=aa=0.25[v_filler];" +
-            f"[v_masked][v_filler]overlay=0:0[v_staged];" +
-            f"[v_staged][1:v]overlay=(main_w-overlay_w)/2:(main_h-overlay_h)/2[out]",
-            '-map', '[out]',
-            '-map', '[a_proc]',
-            '-c:v', 'libx264',
-            '-c:a', 'aac',
-            '-preset', 'medium',
-            '-b:v', '2500k',
-            '-pix_fmt', 'yuv420p',
-            '-movflags', '+faststart',
-            '-map_metadata', '-1',
-            '-y', 
-            output_path
+            '-y',
+            *input_args,
+            *[arg for path in overlay_inputs for arg in ('-i', path)],
+            '-filter_complex', ";".join(graph),
+            *outputs,
         ]
 
+        def report(progress):
+            out_time = progress['out_time']
+            if out_time is None and not progress['ended']:
+                return  # ffmpeg reports N/A while flushing
+            out_time = out_time or 0.0
+            percent = eta = None
+            if expected_duration:
+                percent = min(100.0, 100.0 * out_time / expected_duration)
+                if progress['speed']:
+                    eta = max(0.0, (expected_duration - out_time) / progress['speed'])
+            if progress['ended']:
+                percent, eta = 100.0, 0.0
+            progress_callback({**progress, 'percent': percent, 'eta': eta, 'profile': profile})
+
         try:
-            print(f"[INFO] Saving video to: {output_path}")
-            subprocess.run(ffmpeg_cmd, check=True)
-            return output_path
+            for variant in pending:
+                print(f"[INFO] Saving video to: {variant['output_path']}")
+            self.scheduler.run(ffmpeg_cmd, priority=priority, cancel_event=cancel_event,
+                               progress_callback=report if progress_callback else None, on_start=on_start)
+            for variant in pending:
+                if variant['cache_key']:
+                    self.render_cache.put('videos', variant['cache_key'], variant['output_path'])
         except FileNotFoundError:
             print("[WARN] ffmpeg not found. Video not rendered.")
-            return output_path
         except subprocess.CalledProcessError as e:
             print(f"Error in render_video: {e}")
-            raise e
\ No newline at end of file
+            raise e
+        return [variant['output_path'] for variant in variants]
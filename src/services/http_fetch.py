@@ -0,0 +1,206 @@
+import os
+import re
+import time
+import random
+import threading
+from email.utils import parsedate_to_datetime
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import Config
+
+DEFAULT_USER_AGENT = (
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+    '(KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36'
+)
+
+# Server errors a CDN recovers from; 429 only when it says when to come back (Retry-After)
+RETRYABLE_STATUSES = {500, 502, 503, 504}
+# Longest Retry-After honoured, in seconds
+MAX_RETRY_AFTER = 30.0
+
+
+class RetryableStatus(requests.HTTPError):
+    """A 5xx (or 429 with Retry-After) answer; `retry_after` is the server's requested delay in seconds."""
+
+    def __init__(self, message: str, retry_after: float | None = None, **kwargs):
+        super().__init__(message, **kwargs)
+        self.retry_after = retry_after
+
+
+# Errors worth retrying: dropped connections, timeouts, truncated bodies and temporary server errors
+TRANSIENT_ERRORS = (
+    requests.ConnectionError,
+    requests.Timeout,
+    requests.exceptions.ChunkedEncodingError,
+    RetryableStatus,
+)
+
+
+class IncompleteDownload(IOError):
+    """The server closed the stream before the expected number of bytes arrived."""
+
+
+def _retry_after(value: str | None) -> float | None:
+    """Seconds from a Retry-After header (delta-seconds or an HTTP date), None when absent or unreadable."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def raise_for_status(response: requests.Response) -> None:
+    """response.raise_for_status(), raising RetryableStatus for answers worth another attempt."""
+    retry_after = _retry_after(response.headers.get('Retry-After'))
+    if response.status_code in RETRYABLE_STATUSES or (response.status_code == 429 and retry_after is not None):
+        raise RetryableStatus(f"{response.status_code} {response.reason} for {response.url}",
+                              retry_after=retry_after, response=response)
+    response.raise_for_status()
+
+
+class HttpFetcher:
+    """
+    Downloads direct media URLs over a pooled session.
+    Large files are split into concurrent HTTP Range requests when the server
+    supports them, otherwise streamed in one request. Single-stream downloads
+    go to `<output>.part` and resume from its size after a dropped connection
+    (also across calls); each parallel range resumes from its own progress.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, max_workers: int | None = None, part_size: int | None = None, retries: int | None = None,
+                 min_parallel_size: int | None = None, buffer_size: int = 1024 * 1024, timeout: float = 30,
+                 read_size: int = 64 * 1024):
+        self.max_workers = max_workers or Config.FETCH_WORKERS
+        self.part_size = part_size or Config.FETCH_PART_SIZE
+        self.retries = Config.FETCH_RETRIES if retries is None else retries
+        self.min_parallel_size = Config.FETCH_MIN_PARALLEL_SIZE if min_parallel_size is None else min_parallel_size
+        # Writes are buffered in large blocks; socket reads stay small so a
+        # dropped connection loses at most `read_size` unwritten bytes
+        self.buffer_size = buffer_size
+        self.read_size = read_size
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=8, pool_maxsize=self.max_workers * 2)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers['User-Agent'] = DEFAULT_USER_AGENT
+
+    @classmethod
+    def shared(cls) -> 'HttpFetcher':
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def _retry(self, attempt: int, error: Exception) -> None:
+        if attempt >= self.retries:
+            raise error
+        delay = min(8.0, 0.5 * 2 ** attempt) * random.uniform(0.5, 1.5)
+        if getattr(error, 'retry_after', None) is not None:
+            delay = min(MAX_RETRY_AFTER, error.retry_after)
+        print(f"⚠️ Fetch interrupted ({error}); retrying in {delay:.1f}s...")
+        time.sleep(delay)
+
+    def _probe(self, url: str, headers: dict, cookies: dict | None) -> tuple[int | None, bool]:
+        """Returns (total size, whether byte ranges are supported)."""
+        with self.session.get(url, headers={**headers, 'Range': 'bytes=0-0'}, cookies=cookies,
+                              stream=True, timeout=self.timeout) as r:
+            raise_for_status(r)
+            if r.status_code == 206:
+                match = re.search(r'/(\d+)$', r.headers.get('Content-Range', ''))
+                return (int(match.group(1)) if match else None), match is not None
+            length = r.headers.get('Content-Length')
+            return (int(length) if length else None), False
+
+    def fetch(self, url: str, output_path: str, headers: dict | None = None, cookies: dict | None = None) -> str:
+        headers = dict(headers or {})
+        part_path = output_path + '.part'
+
+        attempt = 0
+        while True:
+            try:
+                total, ranged = self._probe(url, headers, cookies)
+                break
+            except TRANSIENT_ERRORS as e:
+                self._retry(attempt, e)
+                attempt += 1
+
+        if ranged and total and total >= self.min_parallel_size and self.max_workers > 1:
+            self._fetch_ranges(url, part_path, total, headers, cookies)
+        else:
+            self._fetch_stream(url, part_path, total, ranged, headers, cookies)
+
+        os.replace(part_path, output_path)
+        return output_path
+
+    def _fetch_stream(self, url: str, part_path: str, total: int | None, ranged: bool,
+                      headers: dict, cookies: dict | None) -> None:
+        attempt = 0
+        while True:
+            offset = os.path.getsize(part_path) if ranged and os.path.exists(part_path) else 0
+            if total is not None and offset >= total:
+                return
+            request_headers = dict(headers)
+            if offset:
+                request_headers['Range'] = f'bytes={offset}-'
+            try:
+                with self.session.get(url, headers=request_headers, cookies=cookies,
+                                      stream=True, timeout=self.timeout) as r:
+                    raise_for_status(r)
+                    if offset and r.status_code != 206:
+                        offset = 0  # Server ignored the range; start over
+                    with open(part_path, 'ab' if offset else 'wb', buffering=self.buffer_size) as f:
+                        written = offset
+                        for chunk in r.iter_content(chunk_size=self.read_size):
+                            f.write(chunk)
+                            written += len(chunk)
+                if total is not None and written < total:
+                    raise IncompleteDownload(f"got {written} of {total} bytes")
+                return
+            except TRANSIENT_ERRORS + (IncompleteDownload,) as e:
+                self._retry(attempt, e)
+                attempt += 1
+
+    def _fetch_ranges(self, url: str, part_path: str, total: int, headers: dict, cookies: dict | None) -> None:
+        with open(part_path, 'wb') as f:
+            f.truncate(total)
+
+        ranges = [(start, min(start + self.part_size, total) - 1) for start in range(0, total, self.part_size)]
+        print(f"⚡ Fetching {total / 1e6:.1f} MB in {len(ranges)} ranges ({self.max_workers} connections)")
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="fetch") as pool:
+            for future in [pool.submit(self._fetch_range, url, part_path, start, end, headers, cookies)
+                           for start, end in ranges]:
+                future.result()
+
+    def _fetch_range(self, url: str, part_path: str, start: int, end: int, headers: dict, cookies: dict | None) -> None:
+        position = start
+        attempt = 0
+        with open(part_path, 'r+b', buffering=0) as f:
+            while position <= end:
+                try:
+                    with self.session.get(url, headers={**headers, 'Range': f'bytes={position}-{end}'},
+                                          cookies=cookies, stream=True, timeout=self.timeout) as r:
+                        raise_for_status(r)
+                        if r.status_code != 206:
+                            raise requests.HTTPError(f"Range request answered with {r.status_code}")
+                        for chunk in r.iter_content(chunk_size=self.read_size):
+                            chunk = chunk[:end + 1 - position]
+                            os.pwrite(f.fileno(), chunk, position)
+                            position += len(chunk)
+                    if position <= end:
+                        raise IncompleteDownload(f"range {start}-{end} stopped at {position}")
+                except TRANSIENT_ERRORS + (IncompleteDownload,) as e:
+                    self._retry(attempt, e)
+                    attempt += 1
@@ -0,0 +1,141 @@
+import os
+import re
+import time
+import hmac
+import asyncio
+import ipaddress
+import threading
+
+from config import Config
+from services.jobs import Job, LAYOUTS
+from services.render_cache import RenderCache
+
+# Jobs submitted over HTTP all run under one pseudo user (its slots come from USER_JOB_LIMITS / MAX_JOBS_PER_USER)
+API_USER_ID = 0
+
+_JOB_ID = re.compile(r'^[0-9a-f]{12}$')
+
+
+class JobApiError(Exception):
+    """A request the API refuses; `status` is the HTTP status to answer with."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class JobApi:
+    """
+    Submits render jobs from the HTTP server's threads onto the bot's event loop,
+    through the same JobManager and pipeline as Telegram jobs.
+    Finished videos are copied out of the job workspace so they can be
+    downloaded for `output_ttl` seconds.
+    """
+
+    def __init__(self, job_manager, output_dir: str | None = None, output_ttl: float | None = None,
+                 token: str | None = None):
+        self.job_manager = job_manager
+        self.output_dir = output_dir or Config.JOB_API_OUTPUT_DIR
+        self.output_ttl = Config.JOB_API_OUTPUT_TTL if output_ttl is None else output_ttl
+        self.token = Config.JOB_API_TOKEN if token is None else token
+        self.loop = None
+        self._lock = threading.Lock()
+
+    def attach(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Binds the event loop jobs run on; submissions are refused until then."""
+        self.loop = loop
+
+    def authorized(self, header: str | None) -> bool:
+        return not self.token or hmac.compare_digest(header or '', f"Bearer {self.token}")
+
+    def servable_on(self, host: str) -> bool:
+        """Without a token the API fetches any URL for anyone who can reach it, so it only listens on loopback."""
+        if self.token:
+            return True
+        if host == 'localhost':
+            return True
+        try:
+            return ipaddress.ip_address(host).is_loopback
+        except ValueError:
+            return False
+
+    def submit(self, payload: dict, timeout: float = 10) -> dict:
+        """Validates {url, title, body, layout}, queues the job and returns its status."""
+        if not isinstance(payload, dict):
+            raise JobApiError(400, "Expected a JSON object")
+        url = str(payload.get('url') or '').strip()
+        if not url.startswith(('http://', 'https://')):
+            raise JobApiError(400, "'url' must be an http(s) link")
+        layout = str(payload.get('layout') or 'lower').strip().lower()
+        if layout not in LAYOUTS:
+            raise JobApiError(400, f"'layout' must be one of {', '.join(LAYOUTS)}")
+        if self.loop is None or self.loop.is_closed():
+            raise JobApiError(503, "The job runner is not ready yet")
+
+        job = Job(API_USER_ID, None, url, str(payload.get('title') or '').strip(),
+                  str(payload.get('body') or '').strip(), layout)
+        self._prune_outputs()
+
+        async def queue():
+            self.job_manager.submit(job, on_done=self._keep_output)
+
+        asyncio.run_coroutine_threadsafe(queue(), self.loop).result(timeout)
+        print(f"🌐 API job {job.id} queued for {url}")
+        return self.status(job.id)
+
+    def output_path(self, job_id: str) -> str | None:
+        """The finished video of `job_id`, if it is still kept."""
+        if not _JOB_ID.match(job_id):
+            return None
+        path = os.path.join(self.output_dir, f"{job_id}.mp4")
+        return path if os.path.exists(path) else None
+
+    def status(self, job_id: str) -> dict:
+        job = self.job_manager.get(job_id) if _JOB_ID.match(job_id) else None
+        if job is None:
+            if self.output_path(job_id):
+                # Dropped from the manager's history, but the video is still here
+                return {'id': job_id, 'status': 'done', 'video': f"/jobs/{job_id}/video"}
+            raise JobApiError(404, "Unknown job")
+
+        progress = job.progress or {}
+        result = {
+            'id': job.id,
+            'status': job.status,
+            'stage': job.stage,
+            'url': job.url,
+            'layout': job.layout_mode,
+            'progress': {key: progress.get(key) for key in ('profile', 'percent', 'eta', 'speed', 'out_time')},
+            'timings': dict(job.stats.get('timings', {})),
+            'error': job.error,
+            'created_at': job.created_at,
+            'finished_at': job.finished_at,
+        }
+        if job.status == 'done' and self.output_path(job.id):
+            result['caption'] = job.result[1]
+            result['video'] = f"/jobs/{job.id}/video"
+        return result
+
+    async def _keep_output(self, job) -> None:
+        """on_done hook: the workspace is removed after it, so keep the video outside."""
+        if job.status != 'done':
+            return
+        final_path, _ = job.result
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = RenderCache.materialize(final_path, os.path.join(self.output_dir, f"{job.id}.mp4"))
+        # May be a hard link to an old cache entry; the TTL counts from now
+        os.utime(path, None)
+
+    def _prune_outputs(self) -> None:
+        cutoff = time.time() - self.output_ttl
+        with self._lock:
+            try:
+                entries = list(os.scandir(self.output_dir))
+            except FileNotFoundError:
+                return
+            for entry in entries:
+                try:
+                    if entry.is_file() and entry.stat().st_mtime < cutoff:
+                        os.remove(entry.path)
+                except OSError:
+                    pass
@@ -0,0 +1,164 @@
+import os
+import time
+import uuid
+import shutil
+import asyncio
+import threading
+
+from config import Config
+from services.metrics import JOBS, JOB_SECONDS, ERRORS
+
+# Video placements a job can ask for
+LAYOUTS = ('lower', 'standard')
+
+
+class Job:
+    """
+    One render request: source link, sign text and layout.
+    Every job owns a private scratch directory so concurrent jobs never
+    share overlay, download or output paths.
+    """
+
+    def __init__(self, user_id: int, chat_id: int, url: str, headline: str = "", body: str = "",
+                 layout_mode: str = 'lower', job_id: str | None = None):
+        self.id = job_id or uuid.uuid4().hex[:12]
+        self.user_id = user_id
+        self.chat_id = chat_id
+        self.url = url
+        self.headline = headline
+        self.body = body
+        self.layout_mode = layout_mode
+        self.workspace = os.path.join(Config.JOBS_DIR, self.id)
+
+        # Optional pre-started download (asyncio.Task returning (path, metadata))
+        self.download_task = None
+        # (path, metadata) of the downloaded source once available
+        self.source = None
+        # Source metadata read ahead of the download (see JobPipeline.start_download), reused for the caption
+        self.metadata = None
+
+        # When set, a low-res draft is rendered first and passed to `on_draft(job, path)`
+        self.want_draft = False
+        self.on_draft = None
+        # Set on cancel so blocking stages (ffmpeg) stop as well
+        self.cancel_event = threading.Event()
+
+        # Latest render progress (see GraphicsEngine.render_video) and an
+        # optional `on_progress(job, progress)` hook called on the event loop
+        self.progress = None
+        self.on_progress = None
+        # Per-job measurements, e.g. encode speed for capacity planning
+        self.stats = {}
+
+        self.status = 'pending'   # pending -> queued -> running -> done | failed | cancelled
+        self.stage = None
+        self.error = None
+        self.result = None        # (final_video_path, description) once done
+        self.created_at = time.time()
+        self.finished_at = None
+
+    def create_workspace(self) -> str:
+        os.makedirs(self.workspace, exist_ok=True)
+        return self.workspace
+
+    def cleanup(self) -> None:
+        if self.download_task and not self.download_task.done():
+            self.download_task.cancel()
+        shutil.rmtree(self.workspace, ignore_errors=True)
+
+
+class JobManager:
+    """
+    In-process job runner.
+    Submitted jobs run as background asyncio tasks; each user gets a fixed
+    number of concurrent slots and further jobs wait for one to free up.
+    """
+
+    # Finished jobs kept around for status lookups
+    HISTORY_SIZE = 200
+
+    def __init__(self, runner, default_limit: int | None = None, user_limits: dict | None = None):
+        self.runner = runner  # async callable(job) -> result
+        self.default_limit = default_limit or Config.MAX_JOBS_PER_USER
+        self.user_limits = Config.USER_JOB_LIMITS if user_limits is None else user_limits
+        self.jobs = {}
+        self._slots = {}
+        self._running = {}
+        self._tasks = {}
+
+    def limit_for(self, user_id: int) -> int:
+        return max(1, self.user_limits.get(user_id, self.default_limit))
+
+    def _slot(self, user_id: int) -> asyncio.Semaphore:
+        if user_id not in self._slots:
+            self._slots[user_id] = asyncio.Semaphore(self.limit_for(user_id))
+        return self._slots[user_id]
+
+    def running_count(self, user_id: int) -> int:
+        return self._running.get(user_id, 0)
+
+    def has_free_slot(self, user_id: int) -> bool:
+        return self.running_count(user_id) < self.limit_for(user_id)
+
+    def get(self, job_id: str) -> Job | None:
+        return self.jobs.get(job_id)
+
+    def submit(self, job: Job, on_done=None) -> asyncio.Task:
+        """Queues the job and returns immediately. `on_done(job)` is awaited once it finishes."""
+        self.jobs[job.id] = job
+        job.status = 'queued'
+        task = asyncio.create_task(self._run(job, on_done))
+        self._tasks[job.id] = task
+        self._prune()
+        return task
+
+    def cancel(self, job_id: str) -> bool:
+        job = self.jobs.get(job_id)
+        if job:
+            job.cancel_event.set()
+        task = self._tasks.get(job_id)
+        if task and not task.done():
+            task.cancel()
+            return True
+        return False
+
+    async def _run(self, job: Job, on_done) -> None:
+        try:
+            async with self._slot(job.user_id):
+                self._running[job.user_id] = self._running.get(job.user_id, 0) + 1
+                job.status = 'running'
+                try:
+                    job.result = await self.runner(job)
+                    job.status = 'done'
+                except asyncio.CancelledError:
+                    job.status = 'cancelled'
+                    raise
+                except Exception as e:
+                    print(f"❌ Job {job.id} failed: {e}")
+                    job.status = 'failed'
+                    job.error = str(e)
+                finally:
+                    job.finished_at = time.time()
+                    self._running[job.user_id] -= 1
+                    JOBS.inc(status=job.status)
+                    JOB_SECONDS.observe(job.finished_at - job.created_at, status=job.status)
+
+            if on_done:
+                try:
+                    await on_done(job)
+                except Exception as e:
+                    print(f"⚠️ Job {job.id} delivery failed: {e}")
+                    ERRORS.inc(stage='delivery')
+        finally:
+            if job.status == 'queued':
+                job.status = 'cancelled'
+            job.cleanup()
+            self._tasks.pop(job.id, None)
+
+    def _prune(self) -> None:
+        finished = [j for j in self.jobs.values() if j.finished_at is not None]
+        if len(finished) <= self.HISTORY_SIZE:
+            return
+        finished.sort(key=lambda j: j.finished_at)
+        for job in finished[:len(finished) - self.HISTORY_SIZE]:
+            self.jobs.pop(job.id, None)
@@ -0,0 +1,116 @@
+from PIL import ImageFont
+
+from services.fonts import FontRegistry, AdvanceTable
+from services.text_utils import TextUtils
+
+
+class TextLayout:
+    """
+    Fits the headline and body into the sign area.
+    Font sizes are binary-searched and paragraphs are wrapped incrementally
+    from cached word widths; the greedy break rule is the same as measuring
+    each candidate line in full.
+    """
+
+    # Kerning/bidi slack per word boundary (fraction of the font size).
+    # Candidates whose summed width falls inside this band are re-measured
+    # exactly so line breaks never drift from the full-line measurement.
+    BOUNDARY_SLACK = 0.1
+
+    def __init__(self, reorder_content: bool = True):
+        self.reorder_content = reorder_content
+
+    def visual(self, text: str) -> str:
+        return TextUtils.process_hebrew(text, reorder_content=self.reorder_content)
+
+    @staticmethod
+    def largest_fitting(sizes: list[int], fits) -> int | None:
+        """
+        Returns the largest size in `sizes` (descending) for which `fits(size)` holds.
+        Assumes fitting is monotonic in the size.
+        """
+        lo, hi = 0, len(sizes) - 1
+        best = None
+        while lo <= hi:
+            mid = (lo + hi) // 2
+            if fits(sizes[mid]):
+                best = sizes[mid]
+                hi = mid - 1
+            else:
+                lo = mid + 1
+        return best
+
+    def fit_headline(self, headline: str, font_path: str, max_size: int, min_size: int,
+                     step: int, max_width: int) -> tuple[ImageFont.FreeTypeFont, str]:
+        processed = self.visual(headline)
+        sizes = list(range(max_size, min_size - 1, -step))
+
+        def fits(size):
+            return FontRegistry.advances(font_path, size).width(processed) <= max_width
+
+        size = self.largest_fitting(sizes, fits) or sizes[-1]
+        return FontRegistry.get(font_path, size), processed
+
+    def wrap_paragraph(self, text: str, advances: AdvanceTable, max_width: float) -> list[str]:
+        slack = advances.font.size * self.BOUNDARY_SLACK
+        lines = []
+        current_line = []
+        current_width = 0.0
+        for word in text.split():
+            word_width = advances.width(self.visual(word))
+            if current_line:
+                candidate = current_width + advances.space_width + word_width
+            else:
+                candidate = word_width
+
+            if abs(candidate - max_width) <= slack * (len(current_line) + 1):
+                exact = advances.width(self.visual(' '.join(current_line + [word])))
+                fits = exact <= max_width
+            else:
+                fits = candidate <= max_width
+
+            if fits:
+                current_line.append(word)
+                current_width = candidate
+            elif current_line:
+                lines.append(' '.join(current_line))
+                current_line = [word]
+                current_width = word_width
+            else:
+                lines.append(word)
+        if current_line:
+            lines.append(' '.join(current_line))
+        return lines
+
+    def wrap_body(self, body: str, advances: AdvanceTable, max_width: float) -> list[str]:
+        final_lines = []
+        for p in body.split('\n'):
+            if not p.strip():
+                final_lines.append("")
+                continue
+            final_lines.extend(self.wrap_paragraph(p, advances, max_width))
+        return final_lines
+
+    @staticmethod
+    def line_height(font: ImageFont.FreeTypeFont, spacing: int = 4) -> int:
+        ascent, descent = font.getmetrics()
+        return ascent + descent + spacing
+
+    def fit_body(self, body: str, font_path: str, max_size: int, min_size: int, step: int,
+                 max_width: int, max_height: int) -> tuple[ImageFont.FreeTypeFont, list[str]]:
+        sizes = list(range(max_size, min_size - 1, -step))
+        wrapped = {}
+
+        def lines_for(size):
+            if size not in wrapped:
+                wrapped[size] = self.wrap_body(body, FontRegistry.advances(font_path, size), max_width)
+            return wrapped[size]
+
+        def fits(size):
+            font = FontRegistry.get(font_path, size)
+            return len(lines_for(size)) * self.line_height(font) <= max_height
+
+        size = self.largest_fitting(sizes, fits)
+        if size is None:
+            size = min_size
+        return FontRegistry.get(font_path, size), lines_for(size)
@@ -0,0 +1,131 @@
+import os
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+
+from config import Config
+
+MB = 1024 * 1024
+
+# cgroup v1 reports "no limit" as a huge page-rounded number
+_UNLIMITED_V1 = 1 << 60
+
+
+def container_memory_limit(cgroup_root: str = "/sys/fs/cgroup") -> int | None:
+    """Memory limit of the current container (cgroup v2, then v1), or None when unlimited."""
+    candidates = (
+        os.path.join(cgroup_root, "memory.max"),
+        os.path.join(cgroup_root, "memory", "memory.limit_in_bytes"),
+    )
+    for path in candidates:
+        try:
+            with open(path, "r") as f:
+                raw = f.read().strip()
+        except OSError:
+            continue
+        if raw == "max":
+            return None
+        try:
+            limit = int(raw)
+        except ValueError:
+            continue
+        return None if limit >= _UNLIMITED_V1 else limit
+    return None
+
+
+def physical_memory() -> int | None:
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def process_rss() -> int:
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+class MemoryBudget:
+    """
+    Admission control for memory-heavy stages.
+    Each stage reserves its estimated RSS before running; stages run side by side
+    while the reservations fit under the container limit (minus the bot's own
+    baseline and a safety headroom) and wait in line otherwise. A stage that is
+    bigger than the whole budget still runs, alone.
+    """
+
+    # Rough peak RSS per stage, measured on the 1080x1920 pipeline
+    STAGE_ESTIMATES = {
+        'encode': 450 * MB,    # ffmpeg final encode (x264 medium, filter graph)
+        'draft': 150 * MB,     # ffmpeg draft encode (540x960 ultrafast)
+        'browser': 300 * MB,   # Chromium page scraping TikTok
+        'download': 60 * MB,   # yt-dlp / HTTP fetch and mux
+        'ai': 80 * MB,         # Gemini request with metadata
+    }
+
+    def __init__(self, limit: int | None = None, estimates: dict | None = None, headroom: float | None = None,
+                 baseline: int | None = None):
+        if limit is None:
+            limit = Config.MEMORY_LIMIT_BYTES or container_memory_limit() or physical_memory() or 0
+        headroom = Config.MEMORY_HEADROOM if headroom is None else headroom
+        baseline = process_rss() if baseline is None else baseline
+
+        self.limit = limit
+        self.capacity = max(0, int(limit * (1 - headroom)) - baseline) if limit else None
+        self.estimates = {**self.STAGE_ESTIMATES, **Config.STAGE_MEMORY_ESTIMATES, **(estimates or {})}
+        self.reserved = 0
+        self.active = {}
+        self._changed = None
+
+    def estimate(self, stage: str) -> int:
+        return self.estimates.get(stage, 0)
+
+    def fits(self, stage: str) -> bool:
+        if self.capacity is None or not self.reserved:
+            return True
+        return self.reserved + self.estimate(stage) <= self.capacity
+
+    @asynccontextmanager
+    async def reserve(self, stage: str):
+        """Waits until `stage` fits in the budget and holds its reservation for the block."""
+        if self._changed is None:
+            self._changed = asyncio.Condition()
+        need = self.estimate(stage)
+
+        async with self._changed:
+            if not self.fits(stage):
+                print(f"⏸️ Holding {stage} stage: {self.reserved // MB} MB of {self.capacity // MB} MB reserved")
+                await self._changed.wait_for(lambda: self.fits(stage))
+            self.reserved += need
+            self.active[stage] = self.active.get(stage, 0) + 1
+        try:
+            yield
+        finally:
+            # Released before taking the lock so a cancelled waiter can't leak the reservation
+            self.reserved -= need
+            self.active[stage] -= 1
+            async with self._changed:
+                self._changed.notify_all()
+
+    def reserve_from_thread(self, stage: str, loop: asyncio.AbstractEventLoop, should_stop=None):
+        """
+        reserve() for worker threads: blocks until `stage` fits and returns a callable releasing it.
+        Returns None without reserving when `should_stop()` turns true while waiting.
+        """
+        reserved = threading.Event()
+
+        async def hold():
+            async with self.reserve(stage):
+                reserved.set()
+                # Held until the task is cancelled
+                await asyncio.Event().wait()
+
+        future = asyncio.run_coroutine_threadsafe(hold(), loop)
+        while not reserved.wait(0.25):
+            if future.done() or (should_stop and should_stop()):
+                future.cancel()
+                return None
+        return future.cancel
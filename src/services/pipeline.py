@@ -0,0 +1,229 @@
+import os
+import time
+import asyncio
+import subprocess
+from contextlib import asynccontextmanager, AsyncExitStack
+
+from services.download_cache import DownloadCache
+from services.downloader import VideoDownloader
+from services.memory_budget import MemoryBudget
+from services.metrics import STAGE_SECONDS, ERRORS
+
+
+class JobPipeline:
+    """
+    The download -> AI caption -> render flow for a single Job.
+    Shared by every entry point so they all produce the same output.
+    Stages run as a small task graph, each starting once its inputs exist:
+    metadata -> caption, overlay (text only), download -> probe -> render.
+    Memory-heavy stages reserve their share of the container's memory first,
+    so AI, downloads and encodes overlap whenever they fit. `stage_limits`
+    optionally caps how many jobs may be inside a stage at once, e.g. {'download': 3}.
+    """
+
+    def __init__(self, graphics_engine, ai_generator, download_cache=None, memory=None,
+                 stage_limits: dict | None = None):
+        self.graphics_engine = graphics_engine
+        self.ai_generator = ai_generator
+        self.download_cache = download_cache or DownloadCache.shared()
+        self.memory = memory or MemoryBudget()
+        self.stage_limits = dict(stage_limits or {})
+        self._stage_slots = {}
+
+    @asynccontextmanager
+    async def _stage(self, job, name: str, memory_stage: str | None = None):
+        """
+        Holds the stage's concurrency slot and memory reservation; records its run time
+        in job.stats['timings'] and the stage metrics.
+        """
+        async with AsyncExitStack() as stack:
+            if self.stage_limits.get(name):
+                if name not in self._stage_slots:
+                    self._stage_slots[name] = asyncio.Semaphore(self.stage_limits[name])
+                await stack.enter_async_context(self._stage_slots[name])
+            if memory_stage:
+                await stack.enter_async_context(self.memory.reserve(memory_stage))
+            started = time.monotonic()
+            try:
+                yield
+            except Exception:
+                ERRORS.inc(stage=name)
+                raise
+            finally:
+                elapsed = time.monotonic() - started
+                job.stats.setdefault('timings', {})[name] = round(elapsed, 3)
+                STAGE_SECONDS.observe(elapsed, stage=name)
+
+    async def run(self, job) -> tuple[str, str]:
+        """Returns (final_video_path, description). All files are written inside job.workspace."""
+        job.create_workspace()
+
+        # Text-only stages start right away, alongside the download
+        caption = asyncio.create_task(self.caption(job))
+        overlay = asyncio.create_task(self.overlay(job))
+        try:
+            job.stage = 'download'
+            video_path = await self.download(job)
+
+            job.stage = 'probe'
+            await self.probe(job, video_path)
+            overlay_path = await overlay
+
+            draft_delivery = None
+            if job.want_draft:
+                job.stage = 'draft'
+                print("🎨 Rendering draft...")
+                draft_path = await self.render(job, video_path, profile='draft', overlay_path=overlay_path)
+                if job.on_draft:
+                    draft_delivery = asyncio.create_task(job.on_draft(job, draft_path))
+
+            job.stage = 'render'
+            print("🎨 Starting video render...")
+            final_video_path = await self.render(job, video_path, profile='final', overlay_path=overlay_path)
+            print(f"✅ Rendering complete: {os.path.basename(final_video_path)}")
+
+            job.stage = 'ai'
+            description = await caption
+
+            if draft_delivery:
+                try:
+                    await draft_delivery
+                except Exception as e:
+                    print(f"⚠️ Draft delivery failed: {e}")
+            return final_video_path, description
+        finally:
+            for task in (caption, overlay):
+                if not task.done():
+                    task.cancel()
+
+    @staticmethod
+    def _fetch_memory_stage(url: str) -> str:
+        # TikTok pages are scraped with Chromium
+        return 'browser' if "tiktok.com" in url else 'download'
+
+    # Sources longer than this many LOWER_CLIP_SECONDS wait for the layout before downloading
+    DEFER_DOWNLOAD_FACTOR = 3
+
+    def start_download(self, job) -> asyncio.Task:
+        """
+        Starts fetching the whole source in the background (e.g. while the user is still typing)
+        as job.download_task, which download() then awaits. Holds the same memory reservation.
+        Long clips that can be cut are not pre-fetched: the task only reads their metadata
+        (kept in job.metadata) and returns None, so download() fetches just the middle for 'lower'.
+        """
+        async def fetch():
+            stage = self._fetch_memory_stage(job.url)
+            if VideoDownloader.can_fetch_segment(job.url):
+                try:
+                    async with self.memory.reserve(stage):
+                        job.metadata = await self.download_cache.metadata(job.url)
+                except Exception as e:
+                    print(f"⚠️ Metadata fetch failed, downloading the whole source: {e}")
+                duration = (job.metadata or {}).get('duration') or 0
+                if duration > self.DEFER_DOWNLOAD_FACTOR * self.graphics_engine.LOWER_CLIP_SECONDS:
+                    print(f"⏸️ {duration:.0f}s source: download waits for the layout choice")
+                    return None
+            async with self.memory.reserve(stage):
+                return await self.download_cache.fetch(job.url, job.workspace)
+
+        job.download_task = asyncio.create_task(fetch())
+        return job.download_task
+
+    async def download(self, job) -> str:
+        # Reuse the pre-started task when there is one (None: it left the download to us)
+        prefetched = None
+        if job.download_task:
+            print("⏳ Awaiting background download task...")
+            async with self._stage(job, 'download'):
+                prefetched = await job.download_task
+        if prefetched:
+            video_path, video_info = prefetched
+        else:
+            # 'lower' only uses the middle of the clip, so only that part is fetched
+            middle_seconds = self.graphics_engine.LOWER_CLIP_SECONDS if job.layout_mode == 'lower' else None
+            async with self._stage(job, 'download', self._fetch_memory_stage(job.url)):
+                video_path, video_info = await self.download_cache.fetch(job.url, job.workspace, middle_seconds)
+        print(f"✅ Video ready at: {os.path.basename(video_path)}")
+        job.source = (video_path, video_info)
+        return video_path
+
+    async def probe(self, job, video_path: str) -> None:
+        # Memoized by the engine, so the render reuses it
+        try:
+            async with self._stage(job, 'probe'):
+                job.stats['source_duration'] = await asyncio.to_thread(self.graphics_engine.probe_duration, video_path)
+        except (subprocess.CalledProcessError, FileNotFoundError, ValueError) as e:
+            # The render falls back to the standard filter chain without a duration
+            print(f"⚠️ Could not probe source: {e}")
+
+    async def overlay(self, job) -> str:
+        async with self._stage(job, 'overlay'):
+            return await asyncio.to_thread(self.graphics_engine.prepare_overlay, job.headline, job.body, job.workspace)
+
+    async def caption(self, job) -> str:
+        try:
+            # May scrape the page with Chromium, or ask yt-dlp
+            async with self._stage(job, 'metadata', self._fetch_memory_stage(job.url)):
+                video_info = dict(job.metadata) if job.metadata else await self.download_cache.metadata(job.url)
+        except Exception as e:
+            print(f"⚠️ Metadata fetch failed (captioning from the text only): {e}")
+            video_info = {}
+        # Add URL to info so it can be passed to AI
+        video_info['url'] = job.url
+        return await self.describe(job, video_info)
+
+    async def render(self, job, video_path: str, profile: str, overlay_path: str | None = None) -> str:
+        loop = asyncio.get_running_loop()
+
+        def on_progress(progress):
+            # Called from the render worker thread; hop back onto the loop
+            loop.call_soon_threadsafe(self._record_progress, job, progress)
+
+        memory_stage = 'encode' if profile == 'final' else 'draft'
+
+        def reserve_memory(ticket):
+            # Taken once a render worker is free, so jobs waiting in the render queue hold no memory
+            return self.memory.reserve_from_thread(memory_stage, loop, lambda: ticket.cancel_requested)
+
+        stage = 'render' if profile == 'final' else profile
+        async with self._stage(job, stage):
+            path = await asyncio.to_thread(
+                self.graphics_engine.render_video,
+                video_path,
+                job.headline,
+                job.body,
+                job.layout_mode,
+                on_progress,
+                work_dir=job.workspace,
+                profile=profile,
+                cancel_event=job.cancel_event,
+                overlay_path=overlay_path,
+                on_start=reserve_memory,
+            )
+        speed = job.stats.get(f'{profile}_encode_speed')
+        if speed:
+            print(f"📈 Job {job.id} {profile} encode: {speed:.2f}x realtime, {job.stats.get(f'{profile}_encode_fps') or 0:.1f} fps")
+        return path
+
+    @staticmethod
+    def _record_progress(job, progress: dict) -> None:
+        job.progress = progress
+        if progress.get('speed'):
+            job.stats[f"{progress['profile']}_encode_speed"] = progress['speed']
+        if progress.get('fps'):
+            job.stats[f"{progress['profile']}_encode_fps"] = progress['fps']
+        if job.on_progress:
+            try:
+                job.on_progress(job, progress)
+            except Exception as e:
+                print(f"⚠️ Progress hook failed: {e}")
+
+    async def describe(self, job, video_info: dict) -> str:
+        print("🧠 Generating AI description...")
+        context_prompt = f"Video Title (User): {job.headline}\nVideo Body (User): {job.body}"
+        fallback = f"{job.headline}\n\n{job.body}"
+        async with self._stage(job, 'caption', 'ai'):
+            # Never raises: errors and missed deadlines come back as the fallback
+            description = await self.ai_generator.caption(context_prompt, video_info, fallback)
+        print("✅ AI Description ready.")
+        return description
@@ -0,0 +1,115 @@
+import os
+import shutil
+import hashlib
+import threading
+
+from config import Config
+from services.metrics import CACHE_LOOKUPS
+
+
+class RenderCache:
+    """
+    Content-addressed cache for rendered artifacts.
+    Two levels live under Config.RENDER_CACHE_DIR: 'overlays' (PNG) and
+    'videos' (MP4). Each level has its own byte budget and is evicted
+    least-recently-used first (entries are touched on every hit).
+    """
+
+    LEVELS = {
+        'overlays': '.png',
+        'videos': '.mp4',
+    }
+
+    def __init__(self, root: str | None = None, budgets: dict | None = None, enabled: bool | None = None):
+        self.root = root or Config.RENDER_CACHE_DIR
+        self.budgets = budgets or {
+            'overlays': Config.OVERLAY_CACHE_BYTES,
+            'videos': Config.VIDEO_CACHE_BYTES,
+        }
+        self.enabled = Config.RENDER_CACHE_ENABLED if enabled is None else enabled
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(*parts) -> str:
+        h = hashlib.sha256()
+        for part in parts:
+            h.update(str(part).encode('utf-8'))
+            h.update(b'\x00')
+        return h.hexdigest()
+
+    @staticmethod
+    def file_digest(path: str, chunk_size: int = 1024 * 1024) -> str:
+        h = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                h.update(chunk)
+        return h.hexdigest()
+
+    @staticmethod
+    def materialize(src: str, dst: str) -> str:
+        """Places `src` at `dst`, hard-linking when possible so the cache entry can be evicted safely."""
+        if os.path.exists(dst):
+            os.remove(dst)
+        try:
+            os.link(src, dst)
+        except OSError:
+            shutil.copy2(src, dst)
+        return dst
+
+    def _path(self, level: str, key: str) -> str:
+        return os.path.join(self.root, level, key + self.LEVELS[level])
+
+    def get(self, level: str, key: str) -> str | None:
+        if not self.enabled:
+            return None
+        path = self._path(level, key)
+        try:
+            os.utime(path, None)
+        except FileNotFoundError:
+            CACHE_LOOKUPS.inc(cache=level, result='miss')
+            return None
+        CACHE_LOOKUPS.inc(cache=level, result='hit')
+        return path
+
+    def put(self, level: str, key: str, src_path: str) -> str | None:
+        if not self.enabled or not os.path.exists(src_path):
+            return None
+        path = self._path(level, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            self.materialize(src_path, tmp_path)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"[WARN] Render cache write failed ({level}): {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return None
+        self._evict(level)
+        return path
+
+    def _evict(self, level: str) -> None:
+        budget = self.budgets[level]
+        level_dir = os.path.join(self.root, level)
+        with self._lock:
+            entries = []
+            total = 0
+            for entry in os.scandir(level_dir):
+                if not entry.name.endswith(self.LEVELS[level]):
+                    continue
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, entry.path))
+                total += st.st_size
+
+            entries.sort()
+            for _, size, path in entries:
+                if total <= budget:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except FileNotFoundError:
+                    pass
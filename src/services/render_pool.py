@@ -0,0 +1,298 @@
+import os
+import time
+import heapq
+import itertools
+import threading
+import subprocess
+
+from config import Config
+
+
+class RenderCancelled(Exception):
+    """Raised by RenderTicket.wait() when the encode was cancelled."""
+
+
+def parse_progress(block: dict) -> dict:
+    """
+    Converts one `-progress` key=value block into numbers:
+    out_time (s), fps, speed (x realtime), frame and whether the encode ended.
+    """
+    def number(key):
+        value = block.get(key, '').strip().rstrip('x')
+        try:
+            return float(value)
+        except ValueError:
+            return None
+
+    out_time_us = number('out_time_us')
+    if out_time_us is None:
+        out_time_us = number('out_time_ms')  # older ffmpeg reports microseconds here too
+    return {
+        'out_time': max(0.0, out_time_us / 1_000_000) if out_time_us is not None else None,
+        'fps': number('fps'),
+        'speed': number('speed'),
+        'frame': number('frame'),
+        'ended': block.get('progress') == 'end',
+    }
+
+
+class RenderTicket:
+    """A queued ffmpeg encode and, once picked up, the resources it was given."""
+
+    def __init__(self, cmd: list[str], priority: int, seq: int, progress_callback=None, on_start=None):
+        self.cmd = cmd
+        self.progress_callback = progress_callback
+        self.on_start = on_start
+        self.progress = None
+        self.priority = priority
+        self.seq = seq
+        self.status = 'queued'    # queued -> running -> done | failed | cancelled
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.threads = None
+        self.cpus = None
+        self.returncode = None
+        self.error = None
+        self.proc = None
+        self.cancel_requested = False
+        self._done = threading.Event()
+
+    def __lt__(self, other):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+    def cancel(self) -> None:
+        """Drops a queued encode or terminates a running one."""
+        self.cancel_requested = True
+        proc = self.proc
+        if proc and proc.poll() is None:
+            proc.terminate()
+
+    def wait(self, cancel_event: threading.Event | None = None) -> int:
+        """
+        Blocks until the encode finishes; re-raises launch errors and non-zero exits.
+        Setting `cancel_event` while waiting cancels the encode.
+        """
+        while not self._done.wait(0.25):
+            if cancel_event is not None and cancel_event.is_set() and not self.cancel_requested:
+                self.cancel()
+        if self.status == 'cancelled':
+            raise RenderCancelled(self.cmd[-1])
+        if self.error:
+            raise self.error
+        if self.returncode:
+            raise subprocess.CalledProcessError(self.returncode, self.cmd)
+        return self.returncode
+
+
+class RenderScheduler:
+    """
+    Bounded pool of ffmpeg workers.
+    The machine's cores are split evenly between workers and every encode
+    is told its share explicitly (-threads / -filter_complex_threads), so
+    concurrent renders don't oversubscribe the CPU. Jobs run FIFO; a lower
+    `priority` value jumps the queue.
+    """
+
+    DEFAULT_PRIORITY = 10
+    # Stand-in for the per-worker thread count in commands with several outputs
+    THREADS = '{threads}'
+    # Assumed encode duration until real ones have been observed
+    INITIAL_ESTIMATE = 60.0
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, workers: int | None = None, pin_cpus: bool | None = None, nice: int | None = None):
+        try:
+            self.cpus = sorted(os.sched_getaffinity(0))
+        except AttributeError:
+            self.cpus = list(range(os.cpu_count() or 1))
+
+        self.workers = max(1, min(workers or Config.RENDER_WORKERS or max(1, len(self.cpus) // 4), len(self.cpus)))
+        self.threads_per_worker = max(1, len(self.cpus) // self.workers)
+        self.pin_cpus = Config.RENDER_PIN_CPUS if pin_cpus is None else pin_cpus
+        self.nice = Config.RENDER_NICE if nice is None else nice
+
+        self._queue = []
+        self._running = {}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._avg_duration = self.INITIAL_ESTIMATE
+        self._threads = []
+
+    @classmethod
+    def shared(cls) -> 'RenderScheduler':
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def _ensure_started(self) -> None:
+        if self._threads:
+            return
+        for slot in range(self.workers):
+            t = threading.Thread(target=self._worker, args=(slot,), name=f"render-worker-{slot}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        print(f"[INFO] Render pool: {self.workers} worker(s) x {self.threads_per_worker} thread(s)")
+
+    def _cpus_for(self, slot: int) -> list[int]:
+        start = slot * self.threads_per_worker
+        return self.cpus[start:start + self.threads_per_worker] or self.cpus
+
+    def _with_thread_limits(self, cmd: list[str], threads: int) -> list[str]:
+        # Global options go right after the binary; -threads is an output
+        # option, so it must precede the output path (last argument), unless
+        # the command places THREADS before each of several outputs itself.
+        # Progress is reported machine-readably on stdout.
+        head = (
+            cmd[:1]
+            + ['-progress', 'pipe:1', '-nostats']
+            + ['-filter_threads', str(threads), '-filter_complex_threads', str(threads)]
+        )
+        if self.THREADS in cmd:
+            return head + [str(threads) if arg == self.THREADS else arg for arg in cmd[1:]]
+        return head + cmd[1:-1] + ['-threads', str(threads), cmd[-1]]
+
+    def _preexec(self, cpus: list[int]):
+        pin = self.pin_cpus and hasattr(os, 'sched_setaffinity')
+        nice = self.nice
+
+        def apply():
+            if nice:
+                os.nice(nice)
+            if pin:
+                os.sched_setaffinity(0, cpus)
+        return apply if (pin or nice) and os.name == 'posix' else None
+
+    def submit(self, cmd: list[str], priority: int | None = None, progress_callback=None,
+               on_start=None) -> RenderTicket:
+        """
+        Queues an ffmpeg command. The last element of `cmd` must be the output path.
+        `progress_callback(progress)` is called from the worker thread with parse_progress() dicts.
+        `on_start(ticket)` is called from the worker once it picks the ticket up, before ffmpeg
+        starts; it may block (e.g. for a memory reservation) and return a callable run after the encode.
+        """
+        self._ensure_started()
+        ticket = RenderTicket(cmd, self.DEFAULT_PRIORITY if priority is None else priority, next(self._seq),
+                              progress_callback=progress_callback, on_start=on_start)
+        with self._cond:
+            heapq.heappush(self._queue, ticket)
+            self._cond.notify()
+        return ticket
+
+    def run(self, cmd: list[str], priority: int | None = None,
+            cancel_event: threading.Event | None = None, progress_callback=None, on_start=None) -> RenderTicket:
+        """Submits and blocks until the encode finishes (or `cancel_event` is set)."""
+        ticket = self.submit(cmd, priority, progress_callback, on_start)
+        ticket.wait(cancel_event)
+        return ticket
+
+    def _worker(self, slot: int) -> None:
+        cpus = self._cpus_for(slot)
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                ticket = heapq.heappop(self._queue)
+                if ticket.cancel_requested:
+                    ticket.status = 'cancelled'
+                    ticket.finished_at = time.time()
+                    ticket._done.set()
+                    continue
+                ticket.status = 'running'
+                ticket.started_at = time.time()
+                ticket.threads = self.threads_per_worker
+                ticket.cpus = cpus
+                self._running[slot] = ticket
+
+            release = None
+            try:
+                if ticket.on_start:
+                    release = ticket.on_start(ticket)
+                if ticket.cancel_requested:
+                    # Cancelled while on_start was waiting
+                    raise RenderCancelled(ticket.cmd[-1])
+                ticket.started_at = time.time()
+                ticket.proc = subprocess.Popen(
+                    self._with_thread_limits(ticket.cmd, ticket.threads),
+                    preexec_fn=self._preexec(cpus),
+                    # ffmpeg reads interactive keys from stdin; never let it share ours
+                    stdin=subprocess.DEVNULL,
+                    stdout=subprocess.PIPE,
+                    text=True,
+                )
+                if ticket.cancel_requested:
+                    ticket.proc.terminate()
+                self._read_progress(ticket)
+                ticket.returncode = ticket.proc.wait()
+                if ticket.cancel_requested:
+                    ticket.status = 'cancelled'
+                else:
+                    ticket.status = 'done' if ticket.returncode == 0 else 'failed'
+            except RenderCancelled:
+                ticket.status = 'cancelled'
+            except Exception as e:
+                ticket.error = e
+                ticket.status = 'failed'
+            finally:
+                if release:
+                    try:
+                        release()
+                    except Exception as e:
+                        print(f"[WARN] Render release hook failed: {e}")
+                ticket.finished_at = time.time()
+                with self._cond:
+                    self._running.pop(slot, None)
+                    if ticket.status == 'done':
+                        elapsed = ticket.finished_at - ticket.started_at
+                        self._avg_duration = 0.7 * self._avg_duration + 0.3 * elapsed
+                ticket._done.set()
+
+    @staticmethod
+    def _read_progress(ticket: RenderTicket) -> None:
+        block = {}
+        for line in ticket.proc.stdout:
+            key, sep, value = line.strip().partition('=')
+            if not sep:
+                continue
+            block[key] = value
+            if key != 'progress':
+                continue
+            ticket.progress = parse_progress(block)
+            block = {}
+            if ticket.progress_callback:
+                try:
+                    ticket.progress_callback(ticket.progress)
+                except Exception as e:
+                    print(f"[WARN] Render progress callback failed: {e}")
+
+    def queue_depth(self) -> int:
+        with self._cond:
+            return sum(1 for t in self._queue if not t.cancel_requested)
+
+    def running_count(self) -> int:
+        with self._cond:
+            return len(self._running)
+
+    def estimate_start(self, ticket: RenderTicket | None = None) -> float:
+        """
+        Seconds from now until `ticket` (or a newly submitted job) should start,
+        assuming every encode takes the running average duration.
+        """
+        now = time.time()
+        with self._cond:
+            avg = self._avg_duration
+            free_at = [max(0.0, avg - (now - t.started_at)) for t in self._running.values()]
+            free_at += [0.0] * (self.workers - len(free_at))
+            ahead = sorted(t for t in self._queue if not t.cancel_requested)
+            if ticket is not None:
+                if ticket.status != 'queued':
+                    return 0.0
+                ahead = [t for t in ahead if t < ticket]
+
+        heapq.heapify(free_at)
+        for _ in ahead:
+            heapq.heappush(free_at, heapq.heappop(free_at) + avg)
+        return free_at[0]
@@ -0,0 +1,103 @@
+import os
+import json
+import time
+import asyncio
+import threading
+from pathlib import Path
+
+from telegram.error import BadRequest
+
+from config import Config
+from services.metrics import CACHE_LOOKUPS
+from services.render_cache import RenderCache
+
+
+class VideoUploader:
+    """
+    Sends videos to Telegram, uploading each distinct file once per bot.
+    The file_id Telegram returns is stored by content hash, so the same video sent
+    again (a repeat delivery, another chat) goes out instantly without re-uploading.
+    With a local Bot API server (`local_mode`) files are passed as paths instead of being streamed.
+    """
+
+    # Entries kept in the JSON index before the oldest are dropped
+    MAX_ENTRIES = 5000
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, index_path: str | None = None, local_mode: bool | None = None):
+        self.index_path = index_path or Config.TELEGRAM_FILE_ID_CACHE
+        self.local_mode = bool(Config.TELEGRAM_API_URL) if local_mode is None else local_mode
+        self._lock = threading.Lock()
+        self._entries = None
+
+    @classmethod
+    def shared(cls) -> 'VideoUploader':
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def _load(self) -> dict:
+        if self._entries is None:
+            try:
+                with open(self.index_path, 'r', encoding='utf-8') as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError):
+                self._entries = {}
+        return self._entries
+
+    def _save(self) -> None:
+        os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+        tmp_path = f"{self.index_path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._entries, f)
+        os.replace(tmp_path, self.index_path)
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            entry = self._load().get(key)
+            return entry['file_id'] if entry else None
+
+    def put(self, key: str, file_id: str) -> None:
+        with self._lock:
+            entries = self._load()
+            entries[key] = {'file_id': file_id, 'saved_at': time.time()}
+            if len(entries) > self.MAX_ENTRIES:
+                for old in sorted(entries, key=lambda k: entries[k]['saved_at'])[:len(entries) - self.MAX_ENTRIES]:
+                    del entries[old]
+            self._save()
+
+    def forget(self, key: str) -> None:
+        with self._lock:
+            if self._load().pop(key, None) is not None:
+                self._save()
+
+    async def send_video(self, bot, chat_id, path: str, **kwargs):
+        """bot.send_video for a file on disk, reusing an earlier upload of the same content."""
+        # file_ids only work for the bot that uploaded the file
+        key = f"{bot.id}:{await asyncio.to_thread(RenderCache.file_digest, path)}"
+
+        file_id = self.get(key)
+        if file_id:
+            try:
+                message = await bot.send_video(chat_id=chat_id, video=file_id, **kwargs)
+                CACHE_LOOKUPS.inc(cache='telegram', result='hit')
+                print("♻️ Sent video by file_id, no upload needed.")
+                return message
+            except BadRequest as e:
+                print(f"⚠️ Cached file_id rejected ({e}); uploading again.")
+                self.forget(key)
+        CACHE_LOOKUPS.inc(cache='telegram', result='miss')
+
+        if self.local_mode:
+            # The local Bot API server reads the file itself
+            message = await bot.send_video(chat_id=chat_id, video=Path(os.path.abspath(path)), **kwargs)
+        else:
+            with open(path, 'rb') as video_file:
+                message = await bot.send_video(chat_id=chat_id, video=video_file, **kwargs)
+
+        if message.video:
+            self.put(key, message.video.file_id)
+        return message
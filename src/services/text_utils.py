@@ -1,39 +1,63 @@
+import re
+from functools import lru_cache
+
 from bidi.algorithm import get_display
 import emoji
 
-def process_hebrew_with_emojis(text: str, reorder_content: bool = True) -> str:
+# Processed strings kept per (text, reorder_content); layout re-processes the
+# same words and candidate lines for every font size it tries
+SEGMENT_CACHE_SIZE = 8192
+
+# Segment kinds returned by segment_emojis
+TEXT, EMOJI = 0, 1
+
+
+@lru_cache(maxsize=1)
+def emoji_pattern() -> re.Pattern:
     """
-    Processes a string containing both Hebrew text and emojis.
-    Only the Hebrew parts are processed for RTL display, while emojis are preserved.
+    Matches every emoji in emoji.EMOJI_DATA, compiled once.
+    Longest sequences come first so ZWJ, flag and keycap sequences win over their parts.
     """
-    # Split the text into parts based on emojis
+    emojis = sorted(emoji.EMOJI_DATA, key=len, reverse=True)
+    return re.compile('(' + '|'.join(re.escape(e) for e in emojis) + ')')
+
+
+@lru_cache(maxsize=SEGMENT_CACHE_SIZE)
+def segment_emojis(text: str) -> tuple[tuple[int, str], ...]:
+    """Splits text into (TEXT | EMOJI, content) segments in logical order."""
     parts = []
     last_end = 0
-    for match in emoji.get_emoji_regexp().finditer(text):
+    for match in emoji_pattern().finditer(text):
         # Add the text part before the emoji
         if match.start() > last_end:
-            parts.append({'type': 'text', 'content': text[last_end:match.start()]})
-        # Add the emoji part
-        parts.append({'type': 'emoji', 'content': match.group()})
+            parts.append((TEXT, text[last_end:match.start()]))
+        parts.append((EMOJI, match.group()))
         last_end = match.end()
     # Add any remaining text part
     if last_end < len(text):
-        parts.append({'type': 'text', 'content': text[last_end:]})
-
-    # Process only the text parts
-    processed_parts = []
-    for part in parts:
-        if part['type'] == 'text':
-            if reorder_content:
-                processed_parts.append(get_display(part['content'], base_dir='R'))
-            else:
-                processed_parts.append(part['content'])
-        else:
-            processed_parts.append(part['content'])
-            
+        parts.append((TEXT, text[last_end:]))
+    return tuple(parts)
+
+
+@lru_cache(maxsize=SEGMENT_CACHE_SIZE)
+def process_hebrew_with_emojis(text: str, reorder_content: bool = True) -> str:
+    """
+    Processes a string containing both Hebrew text and emojis.
+    Only the Hebrew parts are processed for RTL display, while emojis are preserved.
+    """
+    processed_parts = [
+        get_display(content, base_dir='R') if kind == TEXT and reorder_content else content
+        for kind, content in segment_emojis(text)
+    ]
     # Re-join the parts in reverse order for RTL visual rendering
     return ''.join(reversed(processed_parts))
 
+
+def process_hebrew_lines(lines, reorder_content: bool = True) -> tuple[str, ...]:
+    """Batch form of process_hebrew_with_emojis for all lines of a paragraph."""
+    return tuple(process_hebrew_with_emojis(line, reorder_content) for line in lines)
+
+
 class TextUtils:
     @staticmethod
     def process_hebrew(text: str, reorder_content: bool = True) -> str:
@@ -43,4 +67,9 @@ class TextUtils:
         We force Pillow's Basic layout (by disabling Raqm in graphics.py),
         so we need full Visual text (reversed).
         """
-        return process_hebrew_with_emojis(text, reorder_content=reorder_content)
\ No newline at end of file
+        return process_hebrew_with_emojis(text, reorder_content)
+
+    @staticmethod
+    def process_hebrew_lines(lines, reorder_content: bool = True) -> tuple[str, ...]:
+        """Processes every line of a paragraph in one call (see process_hebrew)."""
+        return process_hebrew_lines(lines, reorder_content)
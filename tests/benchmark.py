@@ -0,0 +1,264 @@
+"""
+Benchmarks for text shaping, overlay creation and the ffmpeg render path.
+
+    python tests/benchmark.py --out bench.json
+    python tests/benchmark.py --suites render --durations 5 60 --compare bench.json
+
+Render cases use synthetic clips made with ffmpeg's lavfi sources (cached under
+temp/bench). Each case reports wall time, CPU time (including ffmpeg), peak RSS
+of the process tree and, for renders, encode fps. With --compare, cases that
+got slower (or fatter) than the baseline by more than --threshold are flagged
+and the exit code is 1.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import threading
+import statistics
+
+# Add src to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+import imageio_ffmpeg
+
+from config import Config
+from conftest import make_clip
+
+TEXTS = {
+    'short': ("מסיבה הלילה", "כולם מוזמנים"),
+    'long': (
+        "הפסטיבל הגדול של הקיץ חוזר לתל אביב",
+        "שלושה ימים של מוזיקה אלקטרונית, עשרות אמנים מהארץ ומהעולם, "
+        "שלוש במות, אזור אוכל ענק וחוף פרטי. כרטיסים מוקדמים במחיר מיוחד "
+        "עד סוף השבוע בלבד, אל תפספסו את האירוע של השנה!"
+    ),
+    'emoji': (
+        "🎉 מסיבה 🔥 הלילה 🎶",
+        "🍾 שמפניה 🕺 ריקודים 💃 עד הבוקר 🌅\n🚀 הכרטיסים נגמרים ❤️ 🎟️ 👉 קישור בביו",
+    ),
+}
+
+LAYOUTS = ('lower', 'standard')
+DEFAULT_DURATIONS = (5, 60, 600)
+
+# Metrics where a higher value is a regression, and where a lower one is
+HIGHER_IS_WORSE = ('wall_s', 'cpu_s', 'peak_rss_mb')
+LOWER_IS_WORSE = ('fps',)
+# Changes smaller than this (seconds / MB / fps) are noise, whatever the ratio
+NOISE_FLOOR = {'wall_s': 0.002, 'cpu_s': 0.002, 'peak_rss_mb': 5.0, 'fps': 0.5}
+
+
+def _rss_bytes(pid: int) -> int:
+    try:
+        with open(f'/proc/{pid}/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def _descendants(pid: int) -> list[int]:
+    children = []
+    try:
+        for tid in os.listdir(f'/proc/{pid}/task'):
+            with open(f'/proc/{pid}/task/{tid}/children') as f:
+                children.extend(int(c) for c in f.read().split())
+    except OSError:
+        return []
+    return children + [d for c in children for d in _descendants(c)]
+
+
+def tree_rss() -> int:
+    """RSS of this process plus its children (ffmpeg), 0 where /proc is unavailable."""
+    pid = os.getpid()
+    return sum(_rss_bytes(p) for p in [pid] + _descendants(pid))
+
+
+class Measurement:
+    """Wall/CPU time and peak RSS of the process tree over a `with` block."""
+
+    SAMPLE_SECONDS = 0.05
+
+    def __enter__(self):
+        self.peak_rss = tree_rss()
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._sample, daemon=True)
+        self._sampler.start()
+        self._cpu = time.process_time()
+        self._children = os.times()
+        self._wall = time.perf_counter()
+        return self
+
+    def _sample(self):
+        while not self._stop.wait(self.SAMPLE_SECONDS):
+            self.peak_rss = max(self.peak_rss, tree_rss())
+
+    def __exit__(self, *exc):
+        self.wall = time.perf_counter() - self._wall
+        # Children (ffmpeg) count once they have been waited for, which the render pool does
+        children = os.times()
+        self.cpu = (time.process_time() - self._cpu
+                    + children.children_user - self._children.children_user
+                    + children.children_system - self._children.children_system)
+        self._stop.set()
+        self._sampler.join()
+        self.peak_rss = max(self.peak_rss, tree_rss())
+        return False
+
+    def result(self, **extra) -> dict:
+        return {
+            'wall_s': round(self.wall, 4),
+            'cpu_s': round(self.cpu, 4),
+            'peak_rss_mb': round(self.peak_rss / (1024 * 1024), 1),
+            **extra,
+        }
+
+
+def median_result(runs: list[dict]) -> dict:
+    """Median of every numeric metric over repeated runs."""
+    merged = {}
+    for key, value in runs[0].items():
+        if isinstance(value, (int, float)):
+            merged[key] = round(statistics.median(run[key] for run in runs), 4)
+        else:
+            merged[key] = value
+    merged['runs'] = len(runs)
+    return merged
+
+
+def bench_text(repeat: int) -> dict:
+    from services import text_utils
+
+    results = {}
+    for name, (headline, body) in TEXTS.items():
+        lines = [headline] + body.split('\n')
+        runs = []
+        for _ in range(repeat):
+            # Cold: the memoized segments would otherwise make every run after the first free
+            text_utils.segment_emojis.cache_clear()
+            text_utils.process_hebrew_with_emojis.cache_clear()
+            with Measurement() as m:
+                for line in lines:
+                    text_utils.TextUtils.process_hebrew(line)
+            runs.append(m.result())
+        results[f'text/{name}'] = median_result(runs)
+    return results
+
+
+def bench_overlay(engine, work_dir: str, repeat: int) -> dict:
+    results = {}
+    for name, (headline, body) in TEXTS.items():
+        runs = []
+        for _ in range(repeat):
+            with Measurement() as m:
+                engine._create_overlay(headline, body, work_dir=work_dir, filename=f"overlay_{name}.png")
+            runs.append(m.result())
+        results[f'overlay/{name}'] = median_result(runs)
+    return results
+
+
+def bench_render(engine, work_dir: str, durations, profile: str) -> dict:
+    headline, body = TEXTS['emoji']
+    overlay_path = engine.prepare_overlay(headline, body, work_dir=work_dir)
+    results = {}
+    for duration in durations:
+        clip = make_clip(duration, os.path.join(Config.TEMP_DIR, 'bench', 'clips'))
+        for layout in LAYOUTS:
+            last = {}
+
+            def on_progress(progress):
+                last.update(progress)
+
+            with Measurement() as m:
+                engine.render_video(clip, headline, body, layout, progress_callback=on_progress,
+                                    work_dir=work_dir, profile=profile, overlay_path=overlay_path)
+            frames = last.get('frame') or 0
+            results[f'render/{profile}/{layout}/{duration}s'] = m.result(
+                frames=int(frames), fps=round(frames / m.wall, 2) if m.wall else 0.0)
+            print(f"⏱️ {layout} {duration}s: {m.wall:.1f}s wall, {frames / m.wall:.1f} fps")
+    return results
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list[str]:
+    """Human-readable regressions of `current` against `baseline` (both 'cases' dicts)."""
+    regressions = []
+    for case, metrics in sorted(current.items()):
+        base = baseline.get(case)
+        if not base:
+            continue
+        for key in HIGHER_IS_WORSE + LOWER_IS_WORSE:
+            if key not in metrics or not base.get(key):
+                continue
+            new, old = metrics[key], base[key]
+            change = (new - old) / old
+            if abs(new - old) < NOISE_FLOOR[key]:
+                continue
+            if (key in HIGHER_IS_WORSE and change > threshold) or (key in LOWER_IS_WORSE and change < -threshold):
+                regressions.append(f"{case} {key}: {old} -> {new} ({change:+.0%})")
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark text shaping, overlays and renders.")
+    parser.add_argument('--suites', nargs='+', default=['text', 'overlay', 'render'], choices=['text', 'overlay', 'render'])
+    parser.add_argument('--durations', nargs='+', type=int, default=list(DEFAULT_DURATIONS), help="Render clip lengths (s)")
+    parser.add_argument('--profile', default='final', help="Render profile (final or draft)")
+    parser.add_argument('--repeat', type=int, default=5, help="Runs per text/overlay case (median is kept)")
+    parser.add_argument('--out', help="Write results to this JSON file")
+    parser.add_argument('--compare', help="Baseline JSON from an earlier --out")
+    parser.add_argument('--threshold', type=float, default=0.10, help="Allowed relative slowdown")
+    args = parser.parse_args(argv)
+
+    Config.ensure_dirs()
+    work_dir = os.path.join(Config.TEMP_DIR, 'bench', 'work')
+    os.makedirs(work_dir, exist_ok=True)
+
+    cases = {}
+    if 'text' in args.suites:
+        cases.update(bench_text(max(args.repeat, 20)))
+    if 'overlay' in args.suites or 'render' in args.suites:
+        from services.graphics import GraphicsEngine
+        engine = GraphicsEngine()
+        # Measure the work itself, not cache hits
+        engine.render_cache.enabled = False
+        if 'overlay' in args.suites:
+            cases.update(bench_overlay(engine, work_dir, args.repeat))
+        if 'render' in args.suites:
+            cases.update(bench_render(engine, work_dir, args.durations, args.profile))
+
+    report = {
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'host': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'ffmpeg': imageio_ffmpeg.get_ffmpeg_version(),
+        },
+        'cases': cases,
+    }
+
+    for case, metrics in cases.items():
+        print(f"{case:32} " + "  ".join(f"{k}={v}" for k, v in metrics.items()))
+
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"💾 Results saved to {args.out}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(cases, baseline.get('cases', {}), args.threshold)
+        if regressions:
+            print(f"❌ {len(regressions)} regressions against {args.compare}:")
+            for line in regressions:
+                print(f"   {line}")
+            return 1
+        print(f"✅ No regressions against {args.compare} (threshold {args.threshold:.0%})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
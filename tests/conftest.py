@@ -0,0 +1,35 @@
+import os
+import subprocess
+
+import imageio_ffmpeg
+import pytest
+
+# Synthetic source: a typical vertical phone clip
+SOURCE_SIZE = (720, 1280)
+SOURCE_FPS = 30
+
+
+def make_clip(duration: int, clips_dir: str) -> str:
+    """Synthetic test pattern + tone clip of `duration` seconds, generated once per directory."""
+    path = os.path.join(clips_dir, f"clip_{duration}s.mp4")
+    if os.path.exists(path):
+        return path
+    os.makedirs(clips_dir, exist_ok=True)
+    width, height = SOURCE_SIZE
+    print(f"🎞️ Generating {duration}s test clip...")
+    tmp_path = path + '.tmp.mp4'
+    subprocess.run([
+        imageio_ffmpeg.get_ffmpeg_exe(), '-y', '-hide_banner', '-loglevel', 'error',
+        '-f', 'lavfi', '-i', f"testsrc2=size={width}x{height}:rate={SOURCE_FPS}:duration={duration}",
+        '-f', 'lavfi', '-i', f"sine=frequency=440:sample_rate=44100:duration={duration}",
+        '-c:v', 'libx264', '-preset', 'ultrafast', '-pix_fmt', 'yuv420p',
+        '-c:a', 'aac', '-shortest', tmp_path,
+    ], stdin=subprocess.DEVNULL, check=True)
+    os.replace(tmp_path, path)
+    return path
+
+
+@pytest.fixture
+def clip(tmp_path):
+    """make_clip(duration) writing into the test's tmp_path."""
+    return lambda duration: make_clip(duration, str(tmp_path / 'clips'))
@@ -0,0 +1,89 @@
+import os
+import sys
+import time
+import asyncio
+
+# Add the src directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from services.ai_generator import AIGenerator
+
+VIDEO_INFO = {'title': 'Rave', 'uploader': 'dj', 'tags': ['party'], 'description': 'crowd', 'url': 'https://x/1'}
+
+
+class _StubBackend:
+    """Answers after `delay` seconds; the first `failures` calls raise a transient error."""
+
+    transient_errors = (ConnectionError,)
+
+    def __init__(self, delay=0.0, failures=0):
+        self.delay = delay
+        self.failures = failures
+        self.calls = 0
+
+    async def generate(self, prompt):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.calls <= self.failures:
+            raise ConnectionError("connection reset")
+        return f"caption #{self.calls}"
+
+
+def _service(backend, tmp_path, **kwargs):
+    options = dict(deadline=2, retries=2, concurrency=2, cache_size=8, cache_dir=str(tmp_path / 'captions'))
+    options.update(kwargs)
+    return AIGenerator(backend=backend, **options)
+
+
+def test_identical_prompts_are_served_from_cache(tmp_path):
+    backend = _StubBackend()
+    service = _service(backend, tmp_path)
+
+    first = asyncio.run(service.caption("Title:  Big night", VIDEO_INFO, "fallback"))
+    # Whitespace differences normalize to the same key
+    second = asyncio.run(service.caption("Title: Big night ", VIDEO_INFO, "fallback"))
+    assert first == second == "caption #1"
+
+    # The disk cache survives a restart
+    restarted = _service(_StubBackend(), tmp_path)
+    assert asyncio.run(restarted.caption("Title: Big night", VIDEO_INFO, "fallback")) == "caption #1"
+    assert restarted.backend.calls == 0
+
+
+def test_transient_errors_are_retried(tmp_path):
+    backend = _StubBackend(failures=1)
+    service = _service(backend, tmp_path)
+
+    assert asyncio.run(service.caption("prompt", VIDEO_INFO, "fallback")) == "caption #2"
+    assert backend.calls == 2
+
+
+def test_deadline_falls_back_immediately(tmp_path):
+    service = _service(_StubBackend(delay=5), tmp_path, deadline=0.2)
+
+    started = time.monotonic()
+    result = asyncio.run(service.caption("prompt", VIDEO_INFO, "headline\n\nbody"))
+
+    assert result == "headline\n\nbody"
+    assert time.monotonic() - started < 1
+    # Fallbacks are not cached
+    assert service._cache_get(AIGenerator.cache_key("prompt", VIDEO_INFO)) is None
+
+
+def test_disk_cache_is_evicted_by_age_and_size(tmp_path):
+    service = _service(_StubBackend(), tmp_path, cache_ttl=3600, cache_bytes=80)
+    for i in range(6):
+        asyncio.run(service.caption(f"Title: night {i}", VIDEO_INFO, "fallback"))
+
+    files = os.listdir(tmp_path / 'captions')
+    total = sum(os.path.getsize(tmp_path / 'captions' / name) for name in files)
+    assert 0 < len(files) < 6
+    assert total <= 80
+
+    # Expired entries are misses and get removed
+    for name in files:
+        os.utime(tmp_path / 'captions' / name, (0, 0))
+    restarted = _service(_StubBackend(), tmp_path, cache_ttl=3600, cache_bytes=80)
+    asyncio.run(restarted.caption("Title: night 5", VIDEO_INFO, "fallback"))
+    assert restarted.backend.calls == 1
+    assert len(os.listdir(tmp_path / 'captions')) == 1
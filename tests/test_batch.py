@@ -0,0 +1,62 @@
+import os
+import sys
+import json
+import asyncio
+
+# Add the src directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from batch import read_manifest, run_batch
+
+
+class _FakePipeline:
+    def __init__(self):
+        self.runs = []
+
+    async def run(self, job):
+        job.create_workspace()
+        self.runs.append(job.url)
+        if 'broken' in job.url:
+            raise RuntimeError("download failed")
+        path = os.path.join(job.workspace, 'final.mp4')
+        with open(path, 'wb') as f:
+            f.write(b'video')
+        job.stats['timings'] = {'download': 0.1, 'render': 0.2}
+        return path, f"caption: {job.headline}"
+
+
+def test_manifest_formats(tmp_path):
+    csv_path = tmp_path / 'rows.csv'
+    csv_path.write_text("url,title,body,layout\nhttps://a/1,כותרת,גוף,standard\n,,,\nhttps://a/2,Two,,\n", encoding='utf-8')
+    jsonl_path = tmp_path / 'rows.jsonl'
+    jsonl_path.write_text('{"url": "https://a/1", "title": "כותרת", "body": "גוף", "layout": "standard"}\n\n'
+                          '{"url": "https://a/2", "title": "Two"}\n', encoding='utf-8')
+
+    assert read_manifest(str(csv_path)) == read_manifest(str(jsonl_path)) == [
+        {'url': 'https://a/1', 'title': 'כותרת', 'body': 'גוף', 'layout': 'standard'},
+        {'url': 'https://a/2', 'title': 'Two', 'body': '', 'layout': 'lower'},
+    ]
+
+
+def test_results_manifest_and_rerun_skips_finished_rows(tmp_path):
+    rows = [
+        {'url': 'https://a/1', 'title': 'One', 'body': '', 'layout': 'lower'},
+        {'url': 'https://a/broken', 'title': 'Two', 'body': '', 'layout': 'lower'},
+    ]
+    out_dir = str(tmp_path / 'out')
+
+    pipeline = _FakePipeline()
+    asyncio.run(run_batch(rows, pipeline, out_dir, parallel_jobs=2))
+
+    with open(os.path.join(out_dir, 'results.jsonl'), encoding='utf-8') as f:
+        results = {r['url']: r for r in map(json.loads, f)}
+    assert results['https://a/1']['status'] == 'done'
+    assert results['https://a/1']['timings'] == {'download': 0.1, 'render': 0.2}
+    with open(results['https://a/1']['caption'], encoding='utf-8') as f:
+        assert f.read() == "caption: One"
+    assert results['https://a/broken']['status'] == 'failed'
+
+    # Only the failed row runs again
+    rerun = _FakePipeline()
+    asyncio.run(run_batch(rows, rerun, out_dir, parallel_jobs=2))
+    assert rerun.runs == ['https://a/broken']
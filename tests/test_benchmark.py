@@ -0,0 +1,33 @@
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from benchmark import compare, median_result
+
+
+def test_compare_flags_only_real_regressions():
+    baseline = {
+        'overlay/short': {'wall_s': 0.20, 'cpu_s': 0.20, 'peak_rss_mb': 60.0},
+        'render/final/lower/5s': {'wall_s': 10.0, 'cpu_s': 9.0, 'peak_rss_mb': 300.0, 'fps': 30.0},
+        'text/short': {'wall_s': 0.0004, 'cpu_s': 0.0004, 'peak_rss_mb': 27.0},
+    }
+    current = {
+        'overlay/short': {'wall_s': 0.25, 'cpu_s': 0.21, 'peak_rss_mb': 62.0},
+        'render/final/lower/5s': {'wall_s': 10.5, 'cpu_s': 9.0, 'peak_rss_mb': 300.0, 'fps': 24.0},
+        # 50% slower but far below the noise floor
+        'text/short': {'wall_s': 0.0006, 'cpu_s': 0.0006, 'peak_rss_mb': 27.0},
+        'render/final/lower/60s': {'wall_s': 99.0, 'fps': 1.0},
+    }
+
+    regressions = compare(current, baseline, threshold=0.10)
+
+    assert regressions == [
+        "overlay/short wall_s: 0.2 -> 0.25 (+25%)",
+        "render/final/lower/5s fps: 30.0 -> 24.0 (-20%)",
+    ]
+
+
+def test_median_result():
+    runs = [{'wall_s': 3.0, 'fps': 10}, {'wall_s': 1.0, 'fps': 30}, {'wall_s': 2.0, 'fps': 20}]
+    assert median_result(runs) == {'wall_s': 2.0, 'fps': 20, 'runs': 3}
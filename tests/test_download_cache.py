@@ -0,0 +1,69 @@
+import os
+import sys
+import time
+import uuid
+import asyncio
+
+# Add the src directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from services.download_cache import DownloadCache, canonical_video_id
+
+
+def test_canonical_ids_ignore_tracking_and_url_shape():
+    assert canonical_video_id("https://www.tiktok.com/@user/video/7301234567890?is_from_webapp=1&sender=x") == "tiktok:7301234567890"
+    assert canonical_video_id("https://m.tiktok.com/v/7301234567890.html") is None
+    assert canonical_video_id("https://youtu.be/dQw4w9WgXcQ?si=abc") == "youtube:dQw4w9WgXcQ"
+    assert canonical_video_id("https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=10") == "youtube:dQw4w9WgXcQ"
+    assert canonical_video_id("https://youtube.com/shorts/dQw4w9WgXcQ") == "youtube:dQw4w9WgXcQ"
+    assert canonical_video_id("https://www.instagram.com/reel/C1a2B3c4D5e/?igsh=xyz") == "instagram:C1a2B3c4D5e"
+    assert canonical_video_id("https://example.com/clip") is None
+
+
+def _fake_downloader(calls):
+    def download(url, output_dir, window=None, middle_seconds=None):
+        calls.append(url)
+        time.sleep(0.05)
+        path = os.path.join(output_dir, f"{uuid.uuid4()}.mp4")
+        with open(path, 'wb') as f:
+            f.write(b'x' * 1000)
+        return path, {'title': url, 'duration': 10}
+    return download
+
+
+def test_concurrent_requests_share_one_download(tmp_path):
+    calls = []
+    cache = DownloadCache(root=str(tmp_path / 'cache'), ttl=60, budget=10**6, enabled=True,
+                          downloader=_fake_downloader(calls))
+    urls = [
+        "https://www.tiktok.com/@a/video/111?lang=en",
+        "https://www.tiktok.com/@b/video/111",
+    ]
+
+    async def scenario():
+        return await asyncio.gather(*(cache.fetch(url, str(tmp_path / f'job{i}')) for i, url in enumerate(urls)))
+
+    results = asyncio.run(scenario())
+
+    assert len(calls) == 1
+    assert results[0][0] != results[1][0]
+    assert all(os.path.getsize(path) == 1000 for path, _ in results)
+
+    # Later requests are served from disk, partial requests included
+    asyncio.run(cache.fetch(urls[0], str(tmp_path / 'job2'), middle_seconds=5))
+    assert len(calls) == 1
+
+
+def test_expired_and_over_budget_entries_are_dropped(tmp_path):
+    calls = []
+    cache = DownloadCache(root=str(tmp_path / 'cache'), ttl=60, budget=2500, enabled=True,
+                          downloader=_fake_downloader(calls))
+
+    for n in range(3):
+        asyncio.run(cache.fetch(f"https://youtu.be/video{n:06d}", str(tmp_path / 'job')))
+    # Only two 1000-byte entries fit the budget; the oldest went first
+    assert cache.lookup("youtube:video000000", 'full') is None
+    assert cache.lookup("youtube:video000002", 'full') is not None
+
+    cache.ttl = 0
+    assert cache.lookup("youtube:video000002", 'full') is None
@@ -0,0 +1,74 @@
+import os
+import sys
+
+from PIL import Image, ImageFont
+
+# Add the src directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from pilmoji import Pilmoji
+from config import Config
+from services.emoji_store import EmojiStore, LocalEmojiSource, prefetch, sprite_name
+from services.metrics import FALLBACKS
+
+
+def _sprite(root, style, emoji, color):
+    path = os.path.join(root, style, sprite_name(emoji))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    Image.new('RGBA', (64, 64), color).save(path)
+
+
+def test_styles_resolve_in_order_from_local_files(tmp_path):
+    root = str(tmp_path / 'emoji')
+    _sprite(root, 'apple', '❤️', (255, 0, 0, 255))
+    _sprite(root, 'twitter', '❤️', (0, 255, 0, 255))
+    _sprite(root, 'twitter', '🎉', (0, 0, 255, 255))
+    store = EmojiStore(root=root, cache_size=8, remote_fill=False)
+    source = LocalEmojiSource(store=store)
+
+    assert sprite_name('👍🏽') == '1f44d-1f3fd.png'
+    # With or without the variation selector, Apple wins over Twitter
+    for heart in ('❤️', '❤'):
+        assert Image.open(source.get_emoji(heart)).getpixel((0, 0)) == (255, 0, 0, 255)
+    assert Image.open(source.get_emoji('🎉')).getpixel((0, 0)) == (0, 0, 255, 255)
+    assert source.get_emoji('🚀') is None
+    assert source.fingerprint("party 🎉🚀") == (('🎉', 'twitter'), ('🚀', None))
+
+    # Served from memory once read
+    os.remove(store.path('twitter', '🎉'))
+    assert source.get_emoji('🎉') is not None
+
+
+def test_pilmoji_draws_local_sprites(tmp_path):
+    root = str(tmp_path / 'emoji')
+    _sprite(root, 'apple', '🎉', (255, 0, 0, 255))
+    source = LocalEmojiSource(store=EmojiStore(root=root, remote_fill=False))
+    font = ImageFont.truetype(Config.FONT_BOLD, 40)
+
+    text_fallbacks = FALLBACKS.value(kind='emoji_text')
+    layer = Image.new('RGBA', (200, 80), (0, 0, 0, 0))
+    source.count_fallbacks("🎉 🚀")
+    with Pilmoji(layer, source=source) as manager:
+        manager.getsize("🎉 🚀", font=font)
+        manager.text((10, 10), "🎉 🚀", font=font, fill="white")
+
+    # The sprite is pasted; the missing emoji falls back to plain text without raising
+    assert layer.getpixel((20, 20)) == (255, 0, 0, 255)
+    # Counted once, however often Pilmoji looked it up
+    assert FALLBACKS.value(kind='emoji_text') == text_fallbacks + 1
+
+
+def test_prefetch_gives_up_on_an_unreachable_cdn(tmp_path):
+    class _OfflineStore(EmojiStore):
+        calls = 0
+
+        def fetch(self, style, emoji):
+            self.calls += 1
+            return None
+
+    store = _OfflineStore(root=str(tmp_path), remote_fill=False)
+    report = prefetch(('apple',), {'🎉', '🔥', '❤️'}, store)
+
+    # Only the canary was requested
+    assert store.calls == 1
+    assert report == {'apple': (0, 3)}
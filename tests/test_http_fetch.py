@@ -0,0 +1,130 @@
+import os
+import re
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+# Add the src directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from services.http_fetch import HttpFetcher, RetryableStatus
+
+PAYLOAD = os.urandom(300 * 1024)
+
+
+class _MediaHandler(BaseHTTPRequestHandler):
+    """Serves PAYLOAD; honours Range unless disabled, and can drop the first response mid-body."""
+
+    protocol_version = "HTTP/1.1"
+    supports_range = True
+    drop_after = None
+    requests_seen = []
+    # (status, headers) answered instead of the payload, one per request
+    errors = []
+
+    def do_GET(self):  # noqa: N802 - http.server expects this name
+        type(self).requests_seen.append(self.headers.get('Range'))
+        if type(self).errors:
+            status, headers = type(self).errors.pop(0)
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        start, end = 0, len(PAYLOAD) - 1
+        match = re.match(r'bytes=(\d+)-(\d*)', self.headers.get('Range', ''))
+        if match and self.supports_range:
+            start = int(match.group(1))
+            end = int(match.group(2)) if match.group(2) else end
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{end}/{len(PAYLOAD)}')
+        else:
+            self.send_response(200)
+        body = PAYLOAD[start:end + 1]
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+
+        if type(self).drop_after is not None and len(body) > type(self).drop_after:
+            type(self).drop_after = None
+            self.wfile.write(body[:len(body) // 2])
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # noqa: A003 - match base signature
+        return
+
+
+@pytest.fixture
+def server():
+    _MediaHandler.supports_range = True
+    _MediaHandler.drop_after = None
+    _MediaHandler.requests_seen = []
+    _MediaHandler.errors = []
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), _MediaHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}/clip.mp4"
+    httpd.shutdown()
+
+
+def _fetcher(**kwargs):
+    options = dict(max_workers=4, part_size=64 * 1024, retries=3, min_parallel_size=128 * 1024)
+    options.update(kwargs)
+    return HttpFetcher(**options)
+
+
+def _read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def test_parallel_ranges_reassemble_file(server, tmp_path):
+    out = _fetcher().fetch(server, str(tmp_path / 'clip.mp4'))
+
+    assert _read(out) == PAYLOAD
+    assert sum(1 for r in _MediaHandler.requests_seen if r and r != 'bytes=0-0') == 5
+
+
+def test_falls_back_to_single_stream_without_range_support(server, tmp_path):
+    _MediaHandler.supports_range = False
+    out = _fetcher().fetch(server, str(tmp_path / 'clip.mp4'))
+
+    assert _read(out) == PAYLOAD
+
+
+def test_single_stream_resumes_after_dropped_connection(server, tmp_path):
+    _MediaHandler.drop_after = 1024
+    out = _fetcher(max_workers=1).fetch(server, str(tmp_path / 'clip.mp4'))
+
+    assert _read(out) == PAYLOAD
+    # The retry asked only for the missing tail
+    assert re.fullmatch(r'bytes=[1-9]\d*-', _MediaHandler.requests_seen[-1])
+
+
+def test_parallel_range_resumes_after_dropped_connection(server, tmp_path):
+    _MediaHandler.drop_after = 1024
+    out = _fetcher().fetch(server, str(tmp_path / 'clip.mp4'))
+
+    assert _read(out) == PAYLOAD
+
+
+def test_server_errors_are_retried(server, tmp_path):
+    _MediaHandler.errors = [(503, {}), (429, {'Retry-After': '0'}), (502, {})]
+    out = _fetcher().fetch(server, str(tmp_path / 'clip.mp4'))
+
+    assert _read(out) == PAYLOAD
+
+
+def test_client_errors_and_bare_429_fail_at_once(server, tmp_path):
+    for status in (404, 429):
+        _MediaHandler.errors = [(status, {})]
+        _MediaHandler.requests_seen = []
+        with pytest.raises(requests.HTTPError) as error:
+            _fetcher().fetch(server, str(tmp_path / 'clip.mp4'))
+        assert not isinstance(error.value, RetryableStatus)
+        assert len(_MediaHandler.requests_seen) == 1
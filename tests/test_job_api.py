@@ -0,0 +1,118 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import threading
+import urllib.request
+import urllib.error
+from http.server import ThreadingHTTPServer
+
+# Add the src directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from keep_alive import _HealthHandler, _byte_range, keep_alive
+from services.jobs import JobManager
+from services.job_api import JobApi
+
+VIDEO = bytes(range(256)) * 40
+
+
+async def _fake_pipeline(job):
+    job.create_workspace()
+    path = os.path.join(job.workspace, 'final.mp4')
+    with open(path, 'wb') as f:
+        f.write(VIDEO)
+    job.stats['timings'] = {'render': 0.1}
+    return path, f"caption for {job.headline}"
+
+
+def _request(base, path, method='GET', payload=None, headers=None):
+    data = json.dumps(payload).encode('utf-8') if payload is not None else None
+    request = urllib.request.Request(base + path, data=data, method=method, headers=headers or {})
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, dict(response.headers), response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, dict(e.headers), e.read()
+
+
+def test_byte_ranges():
+    assert _byte_range(None, 100) is None
+    assert _byte_range("bytes=10-19", 100) == (10, 19)
+    assert _byte_range("bytes=90-", 100) == (90, 99)
+    assert _byte_range("bytes=-5", 100) == (95, 99)
+    assert _byte_range("bytes=50-500", 100) == (50, 99)
+    for bad in ("bytes=100-", "bytes=20-10", "bytes=-0"):
+        try:
+            _byte_range(bad, 100)
+            assert False, bad
+        except ValueError:
+            pass
+
+
+def test_submit_poll_and_download(tmp_path):
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    api = JobApi(JobManager(_fake_pipeline, default_limit=2, user_limits={}),
+                 output_dir=str(tmp_path / 'api'), output_ttl=3600, token='secret')
+    api.attach(loop)
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _HealthHandler)
+    server.job_api = api
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    auth = {'Authorization': 'Bearer secret'}
+    try:
+        assert _request(base, '/jobs', 'POST', {'url': 'https://x/1'})[0] == 401
+        assert _request(base, '/jobs', 'POST', {'url': 'https://x/1', 'layout': 'sideways'}, auth)[0] == 400
+
+        status, _, body = _request(base, '/jobs', 'POST', {'url': 'https://x/1', 'title': 'Hi'}, auth)
+        assert status == 202
+        job_id = json.loads(body)['id']
+
+        deadline = time.monotonic() + 5
+        while True:
+            job = json.loads(_request(base, f'/jobs/{job_id}', headers=auth)[2])
+            if 'video' in job or time.monotonic() > deadline:
+                break
+            time.sleep(0.05)
+        assert job['status'] == 'done'
+        assert job['caption'] == "caption for Hi"
+        assert job['timings'] == {'render': 0.1}
+
+        status, headers, body = _request(base, job['video'], headers=auth)
+        assert status == 200 and body == VIDEO
+        status, headers, body = _request(base, job['video'], headers={**auth, 'Range': 'bytes=100-199'})
+        assert status == 206 and body == VIDEO[100:200]
+        assert headers['Content-Range'] == f"bytes 100-199/{len(VIDEO)}"
+        assert _request(base, job['video'], headers={**auth, 'Range': 'bytes=999999-'})[0] == 416
+
+        assert _request(base, '/jobs/000000000000', headers=auth)[0] == 404
+        # The health check is unaffected
+        assert _request(base, '/')[2] == b"ok"
+    finally:
+        server.shutdown()
+        loop.call_soon_threadsafe(loop.stop)
+
+
+def test_tokenless_api_only_served_on_loopback(monkeypatch, capsys):
+    manager = JobManager(_fake_pipeline, default_limit=2, user_limits={})
+    open_api = JobApi(manager, token='')
+    assert open_api.servable_on('127.0.0.1')
+    assert open_api.servable_on('::1')
+    assert open_api.servable_on('localhost')
+    assert not open_api.servable_on('0.0.0.0')
+    assert not open_api.servable_on('')
+    assert JobApi(manager, token='secret').servable_on('0.0.0.0')
+
+    served = []
+    monkeypatch.setattr('keep_alive._serve', lambda host, port, job_api=None: served.append(job_api))
+    monkeypatch.setenv('ENABLE_KEEP_ALIVE', '1')
+    monkeypatch.setenv('KEEP_ALIVE_HOST', '0.0.0.0')
+    keep_alive(open_api)
+    time.sleep(0.1)
+
+    # Health checks still run, without the job routes
+    assert served == [None]
+    assert "job API is not served" in capsys.readouterr().out
@@ -0,0 +1,43 @@
+import os
+import sys
+import asyncio
+
+# Add the src directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from services.jobs import Job, JobManager
+
+
+def test_jobs_get_isolated_workspaces_and_respect_user_limit():
+    running = []
+    peak = []
+    workspaces = []
+
+    async def runner(job):
+        job.create_workspace()
+        workspaces.append(job.workspace)
+        assert os.path.isdir(job.workspace)
+        running.append(job.id)
+        peak.append(len(running))
+        await asyncio.sleep(0.01)
+        running.remove(job.id)
+        return job.workspace, "caption"
+
+    async def scenario():
+        manager = JobManager(runner, default_limit=2, user_limits={7: 1})
+        delivered = []
+
+        async def on_done(job):
+            delivered.append(job.status)
+
+        tasks = [manager.submit(Job(7, 7, f"https://example.com/{i}"), on_done=on_done) for i in range(3)]
+        await asyncio.gather(*tasks)
+        return delivered
+
+    delivered = asyncio.run(scenario())
+
+    assert delivered == ['done', 'done', 'done']
+    assert max(peak) == 1
+    assert len(set(workspaces)) == 3
+    # Workspaces are removed once the job has been delivered
+    assert not any(os.path.exists(w) for w in workspaces)
@@ -0,0 +1,67 @@
+import os
+import sys
+
+# Add the src directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from config import Config
+from services.fonts import FontRegistry
+from services.layout import TextLayout
+from services.text_utils import TextUtils
+
+SAMPLES = [
+    "חוגגים לגיל 5! 🎂 המון מזל טוב, אושר, ועושר. שתהיה לך שנה נפלאה ומתוקה. 💖 אוהבים, כל המשפחה. 👨‍👩‍👧‍👦",
+    "זוהי בדיקה עם אימוג'י בסוף שורה 🚀\nשורות נוספות כאן.",
+    "מסיבת הסילבסטר הגדולה של השנה 🎉🎉🎉 עם DJ אורח, 3 רחבות, ובר פתוח עד הבוקר!!!\n\nכרטיסים בלינק בביו 🔥",
+    "מילהארוכהמאודשלאנכנסתבשורהאחתבכללמילהארוכהמאודשלאנכנסתבשורהאחת קצר",
+]
+
+
+def reference_wrap(text, font, max_width, reorder_content):
+    """The original full-line measuring wrap, kept as the oracle."""
+    lines = []
+    current_line = []
+    for word in text.split():
+        raw_test_line = ' '.join(current_line + [word])
+        visual = TextUtils.process_hebrew(raw_test_line, reorder_content=reorder_content)
+        if font.getlength(visual) <= max_width:
+            current_line.append(word)
+        elif current_line:
+            lines.append(' '.join(current_line))
+            current_line = [word]
+        else:
+            lines.append(word)
+            current_line = []
+    if current_line:
+        lines.append(' '.join(current_line))
+    return lines
+
+
+def test_incremental_wrap_matches_full_line_measurement():
+    for reorder in (True, False):
+        layout = TextLayout(reorder_content=reorder)
+        for size in range(60, 24, -2):
+            font = FontRegistry.get(Config.FONT_REGULAR, size)
+            advances = FontRegistry.advances(Config.FONT_REGULAR, size)
+            for sample in SAMPLES:
+                for paragraph in sample.split('\n'):
+                    if not paragraph.strip():
+                        continue
+                    for max_width in (300, 864):
+                        expected = reference_wrap(paragraph, font, max_width, reorder)
+                        assert layout.wrap_paragraph(paragraph, advances, max_width) == expected
+
+
+def test_binary_search_matches_linear_scan():
+    layout = TextLayout()
+    for sample in SAMPLES:
+        font, lines = layout.fit_body(sample, Config.FONT_REGULAR, 60, 25, 2, 864, 160)
+
+        expected_size = 25
+        for size in range(60, 24, -2):
+            candidate = FontRegistry.get(Config.FONT_REGULAR, size)
+            wrapped = layout.wrap_body(sample, FontRegistry.advances(Config.FONT_REGULAR, size), 864)
+            if len(wrapped) * TextLayout.line_height(candidate) <= 160:
+                expected_size = size
+                break
+        assert font.size == expected_size
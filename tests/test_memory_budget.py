@@ -0,0 +1,81 @@
+import os
+import sys
+import asyncio
+
+# Add the src directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from services.memory_budget import MemoryBudget, container_memory_limit
+
+
+def test_reads_cgroup_v2_and_v1_limits(tmp_path):
+    v2 = tmp_path / 'v2'
+    v2.mkdir()
+    (v2 / 'memory.max').write_text('536870912\n')
+    assert container_memory_limit(str(v2)) == 536870912
+
+    (v2 / 'memory.max').write_text('max\n')
+    assert container_memory_limit(str(v2)) is None
+
+    v1 = tmp_path / 'v1'
+    (v1 / 'memory').mkdir(parents=True)
+    (v1 / 'memory' / 'memory.limit_in_bytes').write_text('9223372036854771712\n')
+    assert container_memory_limit(str(v1)) is None
+
+    assert container_memory_limit(str(tmp_path / 'missing')) is None
+
+
+def _peak_concurrency(budget, stages):
+    active = []
+    peak = [0]
+
+    async def stage(name):
+        async with budget.reserve(name):
+            active.append(name)
+            peak[0] = max(peak[0], len(active))
+            await asyncio.sleep(0.02)
+            active.remove(name)
+
+    async def scenario():
+        await asyncio.gather(*(stage(name) for name in stages))
+
+    asyncio.run(scenario())
+    assert budget.reserved == 0
+    return peak[0]
+
+
+def test_stages_overlap_only_while_they_fit():
+    estimates = {'encode': 600, 'ai': 100, 'huge': 5000}
+
+    # Encode + AI fit together; two encodes don't
+    assert _peak_concurrency(MemoryBudget(limit=1000, estimates=estimates, headroom=0, baseline=0), ['encode', 'ai']) == 2
+    assert _peak_concurrency(MemoryBudget(limit=1000, estimates=estimates, headroom=0, baseline=0), ['encode', 'encode']) == 1
+
+    # Plenty of room: no serialization at all
+    assert _peak_concurrency(MemoryBudget(limit=10000, estimates=estimates, headroom=0, baseline=0), ['encode'] * 3) == 3
+
+    # Oversized stages still run, one at a time
+    assert _peak_concurrency(MemoryBudget(limit=1000, estimates=estimates, headroom=0, baseline=0), ['huge', 'huge']) == 1
+
+
+def test_worker_threads_reserve_through_the_loop():
+    budget = MemoryBudget(limit=1000, estimates={'encode': 600}, headroom=0, baseline=0)
+
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        release = await asyncio.to_thread(budget.reserve_from_thread, 'encode', loop)
+        assert budget.reserved == 600
+
+        # A second encode doesn't fit; it gives up once told to stop
+        stop = [False]
+        waiting = asyncio.create_task(asyncio.to_thread(budget.reserve_from_thread, 'encode', loop, lambda: stop[0]))
+        await asyncio.sleep(0.3)
+        assert budget.reserved == 600
+        stop[0] = True
+        assert await waiting is None
+
+        release()
+        await asyncio.sleep(0.05)
+
+    asyncio.run(scenario())
+    assert budget.reserved == 0
@@ -0,0 +1,55 @@
+import os
+import sys
+import threading
+import urllib.request
+from http.server import HTTPServer
+
+# Add the src directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from services.metrics import MetricsRegistry
+from keep_alive import _HealthHandler
+
+
+def test_prometheus_text_format():
+    registry = MetricsRegistry()
+    stages = registry.histogram('test_stage_seconds', "Stage time.", ('stage',), buckets=(0.1, 1))
+    fallbacks = registry.counter('test_fallbacks_total', "Fallbacks.", ('kind',))
+
+    stages.observe(0.05, stage='overlay')
+    stages.observe(0.1, stage='overlay')
+    stages.observe(3, stage='overlay')
+    fallbacks.inc(kind='gemini "timeout"')
+
+    assert registry.render().splitlines() == [
+        '# HELP test_fallbacks_total Fallbacks.',
+        '# TYPE test_fallbacks_total counter',
+        'test_fallbacks_total{kind="gemini \\"timeout\\""} 1',
+        '# HELP test_stage_seconds Stage time.',
+        '# TYPE test_stage_seconds histogram',
+        'test_stage_seconds_bucket{stage="overlay",le="0.1"} 2',
+        'test_stage_seconds_bucket{stage="overlay",le="1"} 2',
+        'test_stage_seconds_bucket{stage="overlay",le="+Inf"} 3',
+        'test_stage_seconds_sum{stage="overlay"} 3.15',
+        'test_stage_seconds_count{stage="overlay"} 3',
+    ]
+    # Same name, same metric; a different kind is refused
+    assert registry.counter('test_fallbacks_total', "Fallbacks.", ('kind',)) is fallbacks
+    try:
+        registry.histogram('test_fallbacks_total', "Fallbacks.")
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+
+
+def test_metrics_route_next_to_health_check():
+    server = HTTPServer(('127.0.0.1', 0), _HealthHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        assert urllib.request.urlopen(base + "/").read() == b"ok"
+        body = urllib.request.urlopen(base + "/metrics").read().decode('utf-8')
+        assert '# TYPE parties_stage_seconds histogram' in body
+        assert '# TYPE parties_fallbacks_total counter' in body
+    finally:
+        server.shutdown()
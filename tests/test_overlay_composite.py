@@ -0,0 +1,54 @@
+import os
+import sys
+
+from PIL import Image, ImageChops, ImageDraw, ImageFilter
+
+# Add the src directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from config import Config
+from services.fonts import FontRegistry
+from services.graphics import GraphicsEngine
+
+
+def reference_composite(canvas, text_layer):
+    """The original full-canvas shadow + paste, kept as the oracle."""
+    if text_layer.getbbox():
+        alpha = text_layer.split()[3]
+        shadow = Image.new("RGBA", canvas.size, (0, 0, 0, 0))
+        shadow.paste((0, 0, 0, 255), (0, 0), mask=alpha)
+        shadow = shadow.filter(ImageFilter.GaussianBlur(radius=3))
+        canvas.paste(shadow, (3, 3), shadow)
+    canvas.paste(text_layer, (0, 0), text_layer)
+
+
+def _background(size):
+    # Non-uniform, partly transparent background so every blend term matters
+    canvas = Image.linear_gradient('L').resize(size)
+    return Image.merge('RGBA', (canvas, canvas.transpose(Image.Transpose.FLIP_LEFT_RIGHT), canvas, canvas.rotate(90)))
+
+
+def test_bbox_composite_is_pixel_identical():
+    size = (540, 960)
+    font = FontRegistry.get(Config.FONT_BOLD, 60)
+    # Text in the middle, at the very edges, and nothing at all
+    placements = [[(270, 300)], [(2, 2), (520, 940)], []]
+
+    for positions in placements:
+        full_layer = Image.new('RGBA', size, (0, 0, 0, 0))
+        draw = ImageDraw.Draw(full_layer)
+        for position in positions:
+            draw.text(position, "שלום", font=font, fill="white", anchor="mm", stroke_width=3, stroke_fill="black")
+
+        expected = _background(size)
+        reference_composite(expected, full_layer)
+
+        # Same text drawn on a band that starts 200px down, as _create_overlay does
+        actual = _background(size)
+        if positions == [(270, 300)]:
+            band = full_layer.crop((0, 200, size[0], 420))
+            GraphicsEngine._composite_text(actual, band, (0, 200))
+        else:
+            GraphicsEngine._composite_text(actual, full_layer)
+
+        assert ImageChops.difference(expected, actual).getbbox() is None
@@ -0,0 +1,145 @@
+import os
+import sys
+import time
+import asyncio
+import subprocess
+from types import SimpleNamespace
+
+# Add the src directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from services.jobs import Job
+from services.memory_budget import MemoryBudget
+from services.pipeline import JobPipeline
+
+
+class _FakeCache:
+    def __init__(self, events):
+        self.events = events
+
+    async def fetch(self, url, output_dir, middle_seconds=None):
+        await asyncio.sleep(0.2)
+        self.events.append('downloaded')
+        return os.path.join(output_dir, 'source.mp4'), {'title': 'full'}
+
+    async def metadata(self, url):
+        self.events.append('metadata')
+        return {'title': 'Clip title'}
+
+
+class _FakeAI:
+    def __init__(self, events):
+        self.events = events
+
+    async def caption(self, prompt, video_info, fallback):
+        self.events.append('caption')
+        return f"caption for {video_info['title']}"
+
+
+class _FakeGraphics:
+    LOWER_CLIP_SECONDS = 5
+
+    def __init__(self, events):
+        self.events = events
+
+    def prepare_overlay(self, headline, body, work_dir=None):
+        self.events.append('overlay')
+        return os.path.join(work_dir, 'overlay.png')
+
+    def probe_duration(self, path):
+        return 12.0
+
+    def render_video(self, input_path, headline, body, layout_mode, progress_callback, work_dir=None,
+                     profile='final', cancel_event=None, overlay_path=None, on_start=None):
+        assert overlay_path == os.path.join(work_dir, 'overlay.png')
+        # What a render worker does once it picks the encode up
+        release = on_start(SimpleNamespace(cancel_requested=False))
+        time.sleep(0.05)
+        self.events.append(f'render:{profile}')
+        release()
+        return os.path.join(work_dir, f'{profile}.mp4')
+
+
+def test_caption_and_overlay_overlap_the_download():
+    events = []
+    pipeline = JobPipeline(_FakeGraphics(events), _FakeAI(events), download_cache=_FakeCache(events))
+    job = Job(1, 1, "https://www.tiktok.com/@a/video/1", headline="Title", body="Body")
+
+    path, description = asyncio.run(pipeline.run(job))
+    job.cleanup()
+
+    assert description == "caption for Clip title"
+    assert path.endswith('final.mp4')
+    assert job.stats['source_duration'] == 12.0
+    # The caption came from metadata and finished before the download did
+    assert events.index('caption') < events.index('downloaded')
+    assert events.index('overlay') < events.index('downloaded')
+    assert events[-1] == 'render:final'
+
+
+class _UnprobeableGraphics(_FakeGraphics):
+    def probe_duration(self, path):
+        raise subprocess.CalledProcessError(1, ['ffprobe', path])
+
+
+def test_failed_probe_still_renders():
+    events = []
+    pipeline = JobPipeline(_UnprobeableGraphics(events), _FakeAI(events), download_cache=_FakeCache(events))
+    job = Job(1, 1, "https://example.com/clip.mp4", headline="Title", body="Body")
+
+    path, _ = asyncio.run(pipeline.run(job))
+    job.cleanup()
+
+    assert path.endswith('final.mp4')
+    assert 'source_duration' not in job.stats
+    assert events[-1] == 'render:final'
+
+
+def test_prestarted_download_holds_its_memory_reservation():
+    events = []
+    budget = MemoryBudget(limit=10000, estimates={'browser': 300}, headroom=0, baseline=0)
+    pipeline = JobPipeline(_FakeGraphics(events), _FakeAI(events), download_cache=_FakeCache(events), memory=budget)
+    job = Job(1, 1, "https://www.tiktok.com/@a/video/1", headline="Title", body="Body")
+    job.create_workspace()
+
+    async def scenario():
+        pipeline.start_download(job)
+        await asyncio.sleep(0.05)
+        assert budget.active.get('browser') == 1
+        await job.download_task
+
+    asyncio.run(scenario())
+    job.cleanup()
+    assert budget.reserved == 0
+
+
+class _LongSourceCache(_FakeCache):
+    async def fetch(self, url, output_dir, middle_seconds=None):
+        self.events.append(f'fetch:{middle_seconds}')
+        return os.path.join(output_dir, 'source.mp4'), {'title': 'long'}
+
+    async def metadata(self, url):
+        self.events.append('metadata')
+        return {'title': 'Long clip', 'duration': 600}
+
+
+def test_long_prestarted_source_waits_for_the_layout():
+    events = []
+    pipeline = JobPipeline(_FakeGraphics(events), _FakeAI(events), download_cache=_LongSourceCache(events))
+    job = Job(1, 1, "https://www.youtube.com/watch?v=abc", headline="Title", body="Body")
+
+    async def scenario():
+        job.create_workspace()
+        pipeline.start_download(job)
+        assert await job.download_task is None
+        # The user picks 'lower' afterwards
+        job.layout_mode = 'lower'
+        return await pipeline.run(job)
+
+    _, description = asyncio.run(scenario())
+    job.cleanup()
+
+    # Only the middle was fetched, and the metadata was read once
+    assert events.count('fetch:5') == 1 and 'fetch:None' not in events
+    assert events.count('metadata') == 1
+    assert description == "caption for Long clip"
@@ -0,0 +1,45 @@
+import os
+import sys
+import time
+
+# Add the src directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from services.render_cache import RenderCache
+
+
+def _write(path, size):
+    with open(path, 'wb') as f:
+        f.write(b'\x00' * size)
+    return path
+
+
+def test_hit_returns_stored_entry(tmp_path):
+    cache = RenderCache(root=str(tmp_path / 'cache'), budgets={'overlays': 1000, 'videos': 1000}, enabled=True)
+    src = _write(str(tmp_path / 'overlay.png'), 10)
+    key = RenderCache.key('template', 'headline', 'body')
+
+    assert cache.get('overlays', key) is None
+    cache.put('overlays', key, src)
+
+    hit = cache.get('overlays', key)
+    assert hit is not None
+    out = RenderCache.materialize(hit, str(tmp_path / 'restored.png'))
+    assert os.path.getsize(out) == 10
+
+
+def test_lru_eviction_respects_byte_budget(tmp_path):
+    cache = RenderCache(root=str(tmp_path / 'cache'), budgets={'overlays': 1000, 'videos': 250}, enabled=True)
+
+    for name in ('a', 'b'):
+        cache.put('videos', name, _write(str(tmp_path / f'{name}.mp4'), 100))
+        time.sleep(0.01)
+
+    # Touch 'a' so 'b' becomes the least recently used entry
+    assert cache.get('videos', 'a')
+    time.sleep(0.01)
+    cache.put('videos', 'c', _write(str(tmp_path / 'c.mp4'), 100))
+
+    assert cache.get('videos', 'a') is not None
+    assert cache.get('videos', 'b') is None
+    assert cache.get('videos', 'c') is not None
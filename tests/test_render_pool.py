@@ -0,0 +1,61 @@
+import os
+import sys
+
+import imageio_ffmpeg
+
+# Add the src directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from services.render_pool import RenderScheduler
+
+
+def _null_encode(seconds):
+    return [imageio_ffmpeg.get_ffmpeg_exe(), '-v', 'error', '-f', 'lavfi', '-i', f'nullsrc=d={seconds}', '-f', 'null', '-']
+
+
+def test_priority_jumps_fifo_queue():
+    scheduler = RenderScheduler(workers=1, pin_cpus=False, nice=0)
+
+    first = scheduler.submit(_null_encode(0.5))
+    normal = scheduler.submit(_null_encode(0.1))
+    urgent = scheduler.submit(_null_encode(0.1), priority=1)
+
+    assert scheduler.estimate_start(urgent) <= scheduler.estimate_start(normal)
+
+    for ticket in (first, normal, urgent):
+        ticket.wait()
+
+    assert urgent.started_at < normal.started_at
+    assert first.threads == scheduler.threads_per_worker
+    assert scheduler.queue_depth() == 0
+
+
+def test_thread_limit_lands_before_every_output():
+    scheduler = RenderScheduler(workers=1, pin_cpus=False, nice=0)
+    single = scheduler._with_thread_limits(['ffmpeg', '-i', 'in.mp4', 'out.mp4'], 3)
+    multi = scheduler._with_thread_limits(
+        ['ffmpeg', '-i', 'in.mp4', '-threads', RenderScheduler.THREADS, 'a.mp4', '-threads', RenderScheduler.THREADS, 'b.mp4'], 3
+    )
+
+    assert single[-3:] == ['-threads', '3', 'out.mp4']
+    assert multi[-6:] == ['-threads', '3', 'a.mp4', '-threads', '3', 'b.mp4']
+    assert RenderScheduler.THREADS not in multi
+
+
+def test_on_start_runs_once_a_worker_is_free():
+    scheduler = RenderScheduler(workers=1, pin_cpus=False, nice=0)
+    events = []
+
+    def on_start(name):
+        def hook(ticket):
+            events.append(f'start:{name}')
+            return lambda: events.append(f'release:{name}')
+        return hook
+
+    first = scheduler.submit(_null_encode(0.3), on_start=on_start('first'))
+    second = scheduler.submit(_null_encode(0.1), on_start=on_start('second'))
+    for ticket in (first, second):
+        ticket.wait()
+
+    # The queued encode's hook only ran after the running one was released
+    assert events == ['start:first', 'release:first', 'start:second', 'release:second']
@@ -0,0 +1,29 @@
+import os
+import sys
+
+# Add the src directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from services.graphics import GraphicsEngine
+
+
+def test_variants_render_in_order_with_their_own_cuts(tmp_path, clip):
+    source = clip(8)
+    engine = GraphicsEngine()
+    engine.render_cache.enabled = False
+
+    # Mixed layouts (in-graph trim/atrim for 'lower') and two variants sharing the lower chain (split/asplit)
+    outputs = engine.render_variants(
+        source,
+        [('lower', "כותרת ראשונה", "גוף"), ('standard', "כותרת שנייה", "גוף"), ('lower', "כותרת שלישית", "גוף")],
+        work_dir=str(tmp_path),
+        profile='draft',
+    )
+
+    assert len(outputs) == 3
+    assert all(os.path.getsize(path) > 0 for path in outputs)
+    durations = [GraphicsEngine.probe_duration(path) for path in outputs]
+    # 'lower' keeps the middle LOWER_CLIP_SECONDS; 'standard' is the whole clip sped up 1.05x
+    assert abs(durations[0] - GraphicsEngine.LOWER_CLIP_SECONDS) < 0.3
+    assert abs(durations[1] - 8 / 1.05) < 0.3
+    assert abs(durations[2] - GraphicsEngine.LOWER_CLIP_SECONDS) < 0.3
@@ -0,0 +1,62 @@
+import os
+import sys
+import asyncio
+from pathlib import Path
+from types import SimpleNamespace
+
+from telegram.error import BadRequest
+
+# Add the src directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from services.telegram_uploads import VideoUploader
+
+
+class _FakeBot:
+    id = 42
+
+    def __init__(self, valid_ids=None):
+        self.sent = []
+        self.valid_ids = valid_ids
+
+    async def send_video(self, chat_id, video, **kwargs):
+        if isinstance(video, str):
+            if self.valid_ids is not None and video not in self.valid_ids:
+                raise BadRequest("Wrong file identifier")
+            self.sent.append(('file_id', video))
+            file_id = video
+        elif isinstance(video, Path):
+            self.sent.append(('path', str(video)))
+            file_id = f"id-{len(self.sent)}"
+        else:
+            self.sent.append(('upload', video.read()))
+            file_id = f"id-{len(self.sent)}"
+        return SimpleNamespace(video=SimpleNamespace(file_id=file_id))
+
+
+def test_same_content_is_uploaded_once(tmp_path):
+    index = str(tmp_path / 'file_ids.json')
+    first, copy = tmp_path / 'a.mp4', tmp_path / 'b.mp4'
+    first.write_bytes(b'video')
+    copy.write_bytes(b'video')
+
+    bot = _FakeBot()
+    uploader = VideoUploader(index_path=index, local_mode=False)
+    asyncio.run(uploader.send_video(bot, 1, str(first), caption="x"))
+    # Same bytes under another name, to another chat, after a restart
+    asyncio.run(VideoUploader(index_path=index, local_mode=False).send_video(bot, 2, str(copy)))
+    assert bot.sent == [('upload', b'video'), ('file_id', 'id-1')]
+
+    # A file_id Telegram no longer accepts is dropped and the video uploaded again
+    stale = _FakeBot(valid_ids=set())
+    asyncio.run(uploader.send_video(stale, 1, str(first)))
+    assert stale.sent == [('upload', b'video')]
+
+
+def test_local_mode_passes_the_path(tmp_path):
+    video = tmp_path / 'final.mp4'
+    video.write_bytes(b'video')
+    bot = _FakeBot()
+
+    asyncio.run(VideoUploader(index_path=str(tmp_path / 'ids.json'), local_mode=True).send_video(bot, 1, str(video)))
+    assert bot.sent == [('path', str(video))]
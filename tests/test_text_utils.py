@@ -0,0 +1,66 @@
+import os
+import sys
+import warnings
+
+import emoji
+from bidi.algorithm import get_display
+
+# Add the src directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from services.text_utils import EMOJI, TEXT, TextUtils, segment_emojis
+
+SAMPLES = [
+    "",
+    "שלום עולם",
+    "Hello world",
+    "חוגגים לגיל 5! 🎂 המון מזל טוב 💖 אוהבים, כל המשפחה. 👨‍👩‍👧‍👦",
+    "🎉🎉🎉 מסיבה 🔥",
+    "DJ אורח 🇮🇱 ב-3 רחבות 1️⃣2️⃣3️⃣",
+    "כוכב 👍🏽 ו-❤️‍🔥 וגם 🏳️‍🌈!",
+    "Mixed English ועברית (בסוגריים) 🚀 end.",
+    "👩🏻‍💻",
+]
+
+
+def reference_process(text, reorder_content=True):
+    """The original dict-based implementation, kept as the oracle."""
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        regexp = emoji.get_emoji_regexp()
+    parts = []
+    last_end = 0
+    for match in regexp.finditer(text):
+        if match.start() > last_end:
+            parts.append({'type': 'text', 'content': text[last_end:match.start()]})
+        parts.append({'type': 'emoji', 'content': match.group()})
+        last_end = match.end()
+    if last_end < len(text):
+        parts.append({'type': 'text', 'content': text[last_end:]})
+
+    processed_parts = []
+    for part in parts:
+        if part['type'] == 'text' and reorder_content:
+            processed_parts.append(get_display(part['content'], base_dir='R'))
+        else:
+            processed_parts.append(part['content'])
+    return ''.join(reversed(processed_parts))
+
+
+def test_matches_reference_implementation():
+    for reorder_content in (True, False):
+        for text in SAMPLES:
+            expected = reference_process(text, reorder_content)
+            assert TextUtils.process_hebrew(text, reorder_content=reorder_content) == expected
+            # Cached second call returns the same result
+            assert TextUtils.process_hebrew(text, reorder_content=reorder_content) == expected
+
+
+def test_zwj_sequences_stay_whole():
+    family = "👨‍👩‍👧‍👦"
+    assert segment_emojis(f"משפחה {family}!") == ((TEXT, "משפחה "), (EMOJI, family), (TEXT, "!"))
+
+
+def test_batch_matches_single_calls():
+    lines = [s for s in SAMPLES if s]
+    assert TextUtils.process_hebrew_lines(lines) == tuple(reference_process(line) for line in lines)
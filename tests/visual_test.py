@@ -1,7 +1,6 @@
 import os
 import sys
 import subprocess
-import shutil
 import imageio_ffmpeg
 
 # Add src to path
@@ -27,22 +26,21 @@ def run_visual_test():
     body = "זוהי בדיקה עם אימוג'י בסוף שורה 🚀\nשורות נוספות כאן."
     
     modes = ['lower', 'full']
-    
-    for mode in modes:
-        print(f"\n--- Testing Layout Mode: {mode} ---")
+
+    print(f"\n--- Rendering layout modes {', '.join(modes)} in one pass ---")
+    try:
+        # One decode of the input, one output per mode
+        output_paths = graphics.render_variants(input_video, [(mode, headline, body) for mode in modes])
+    except Exception as e:
+        print(f"An error occurred while rendering: {e}")
+        import traceback
+        traceback.print_exc()
+        return
+
+    for mode, output_path in zip(modes, output_paths):
+        print(f"\n--- Layout Mode: {mode} ---")
+        print(f"Video rendered to: {output_path}")
         try:
-            # Render
-            output_path = graphics.render_video(input_video, headline, body, layout_mode=mode)
-            print(f"Video rendered to: {output_path}")
-            
-            # Since render_video overwrites the same file for the same input, 
-            # we should rename it or process it immediately.
-            # We'll rename it to keep it.
-            base_name = os.path.basename(output_path)
-            mode_output_path = os.path.join(os.path.dirname(output_path), f"{mode}_{base_name}")
-            shutil.move(output_path, mode_output_path)
-            print(f"Moved to: {mode_output_path}")
-            
             # Take a screenshot at 00:00:02
             screenshot_path = os.path.join(os.path.dirname(__file__), f"test_result_{mode}.jpg")
             
@@ -50,7 +48,7 @@ def run_visual_test():
                 ffmpeg_exe,
                 '-y',
                 '-ss', '00:00:02',
-                '-i', mode_output_path,
+                '-i', output_path,
                 '-vframes', '1',
                 '-q:v', '2',
                 screenshot_path